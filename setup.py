@@ -30,9 +30,16 @@ with open_relative('README.rst') as f:
     readme = f.read()
 
 requires = [
+    # concurrent.futures, see NoSQLHandle.submit.
+    'futures; python_version < "3"',
     'requests'
 ]
 
+extras = {
+    # Columnar query results, see QueryRequest.set_columnar_results.
+    'numpy': ['numpy']
+}
+
 setup(
     name='borneo',
     url='https://nosql-python-sdk.readthedocs.io/en/latest/index.html',
@@ -75,5 +82,6 @@ setup(
 
     # What does your project relate to?
     keywords='database, nosql, cloud, development',
-    install_requires=requires
+    install_requires=requires,
+    extras_require=extras
 )
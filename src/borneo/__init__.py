@@ -7,15 +7,21 @@
 # appropriate download for a copy of the license and additional information.
 #
 
+from sys import version_info
+
 from . import idcs
 from .auth import AuthorizationProvider
+from .batch import BatchWriter
 from .common import (
     Consistency, FieldRange, PutOption, State, TableLimits, TimeToLive,
     TimeUnit, Version, IndexInfo, PreparedStatement)
-from .config import DefaultRetryHandler, NoSQLHandleConfig, RetryHandler
+from .config import (
+    DecorrelatedJitterRetryHandler, DefaultRetryHandler, NoSQLHandleConfig,
+    PolicyRetryHandler, RetryBudget, RetryHandler)
 from .driver import NoSQLHandle
 from .exception import (
-    BatchOperationNumberLimitException, IllegalArgumentException,
+    BatchOperationNumberLimitException, ConcurrencyLimitException,
+    IllegalArgumentException,
     IllegalStateException, IndexExistsException, IndexNotFoundException,
     InvalidAuthorizationException, NoSQLException, OperationThrottlingException,
     ReadThrottlingException, RequestTimeoutException, RetryableException,
@@ -24,24 +30,31 @@ from .exception import (
     ThrottlingException, WriteThrottlingException)
 from .operations import (
     DeleteRequest, DeleteResult, GetIndexesRequest, GetIndexesResult,
-    GetRequest, GetResult, GetTableRequest, ListTablesRequest, ListTablesResult,
+    GetManyResult, GetRequest, GetResult, GetTableRequest, ListTablesRequest,
+    ListTablesResult,
     MultiDeleteRequest, MultiDeleteResult, OperationResult,
     PrepareRequest, PrepareResult,
     PutRequest, PutResult, QueryRequest, QueryResult, Request, Result,
     TableRequest, TableResult,
     TableUsageRequest, TableUsageResult, WriteMultipleRequest,
     WriteMultipleResult)
+from .query import ParallelScan, QueryIterator
+from .serde import LazyRecord
 from .version import __version__
 
 __all__ = ['AuthorizationProvider',
            'BatchOperationNumberLimitException',
+           'BatchWriter',
+           'ConcurrencyLimitException',
            'Consistency',
+           'DecorrelatedJitterRetryHandler',
            'DefaultRetryHandler',
            'DeleteRequest',
            'DeleteResult',
            'FieldRange',
            'GetIndexesRequest',
            'GetIndexesResult',
+           'GetManyResult',
            'GetRequest',
            'GetResult',
            'GetTableRequest',
@@ -51,6 +64,7 @@ __all__ = ['AuthorizationProvider',
            'IndexInfo',
            'IndexNotFoundException',
            'InvalidAuthorizationException',
+           'LazyRecord',
            'ListTablesRequest',
            'ListTablesResult',
            'MultiDeleteRequest',
@@ -60,18 +74,22 @@ __all__ = ['AuthorizationProvider',
            'NoSQLHandleConfig',
            'OperationThrottlingException',
            'OperationResult',
+           'ParallelScan',
+           'PolicyRetryHandler',
            'PreparedStatement',
            'PrepareRequest',
            'PrepareResult',
            'PutOption',
            'PutRequest',
            'PutResult',
+           'QueryIterator',
            'QueryRequest',
            'QueryResult',
            'ReadThrottlingException',
            'Request',
            'RequestTimeoutException',
            'Result',
+           'RetryBudget',
            'RetryHandler',
            'RetryableException',
            'SecurityInfoNotReadyException',
@@ -93,3 +111,7 @@ __all__ = ['AuthorizationProvider',
            'WriteMultipleResult',
            'WriteThrottlingException',
            ]
+
+if version_info >= (3, 5):
+    from .aio import AsyncNoSQLHandle
+    __all__.append('AsyncNoSQLHandle')
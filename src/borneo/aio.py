@@ -0,0 +1,773 @@
+#
+# Copyright (C) 2018, 2019 Oracle and/or its affiliates. All rights reserved.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl
+#
+# Please see LICENSE.txt file included in the top-level directory of the
+# appropriate download for a copy of the license and additional information.
+#
+
+from asyncio import (
+    IncompleteReadError, Semaphore, TimeoutError as AsyncTimeoutError,
+    get_event_loop, open_connection, sleep, wait_for)
+from collections import deque
+from logging import DEBUG, FileHandler, WARNING, getLogger
+from os import mkdir, path, sep
+from platform import python_version
+from ssl import create_default_context
+from sys import argv
+from time import time
+
+from .common import (
+    ByteInputStream, ByteOutputStream, CheckValue, HttpConstants, LogUtils,
+    State)
+from .config import DefaultRetryHandler, NoSQLHandleConfig
+from .exception import (
+    IllegalArgumentException, IllegalStateException, NoSQLException,
+    RequestTimeoutException, RetryableException,
+    SecurityInfoNotReadyException, TableNotFoundException)
+from .http import RetryStats
+from .idcs import DefaultAccessTokenProvider
+from .operations import (
+    DeleteRequest, GetIndexesRequest, GetRequest, GetTableRequest,
+    ListTablesRequest, MultiDeleteRequest, PrepareRequest, PutRequest,
+    QueryRequest, TableRequest, TableResult, TableUsageRequest,
+    WriteMultipleRequest, WriteRequest)
+from .serde import BinaryProtocol, RecordEncoders
+from .version import __version__
+
+
+class AsyncClient(object):
+    """
+    The asyncio HTTP driver client, the counterpart of the Client of
+    :py:class:`NoSQLHandle`. Requests are serialized and their responses
+    deserialized by the same serializers, and retried the same way, but the
+    requests are posted by an :py:class:`AsyncHttpPool` and the delays between
+    retries don't block the event loop.
+    """
+
+    # The initial size of the buffer a request is serialized into.
+    _INITIAL_BUFFER_SIZE = 4096
+
+    def __init__(self, config, logger):
+        self.__logutils = LogUtils(logger)
+        self.__config = config
+        if config.get_proxy_host() is not None:
+            raise IllegalArgumentException(
+                'HTTP proxies are not supported by AsyncNoSQLHandle.')
+        if config.get_rate_limiting_enabled():
+            raise IllegalArgumentException(
+                'Rate limiting is not supported by AsyncNoSQLHandle.')
+        if config.get_adaptive_concurrency_enabled():
+            raise IllegalArgumentException(
+                'Adaptive concurrency limits are not supported by ' +
+                'AsyncNoSQLHandle.')
+        self.__path = '/' + HttpConstants.NOSQL_DATA_PATH
+        self.__max_request_id = 1
+        self.__retry_handler = config.get_retry_handler()
+        if self.__retry_handler is None:
+            self.__retry_handler = DefaultRetryHandler()
+        self.__retry_stats = RetryStats()
+        self.__sec_info_timeout = config.get_sec_info_timeout()
+        self.__auth_provider = config.get_authorization_provider()
+        if self.__auth_provider is None:
+            raise IllegalArgumentException(
+                'Must configure AuthorizationProvider.')
+        # The headers that are the same for all requests, copied for each one.
+        self.__headers = {'Host': config.get_host(),
+                          'Content-Type': 'application/octet-stream',
+                          'Connection': 'keep-alive',
+                          'Accept': 'application/octet-stream',
+                          'User-Agent': '%s/%s (Python %s)' % (
+                              'NoSQL-PythonSDK', __version__,
+                              python_version())}
+        self.__pool = AsyncHttpPool(
+            config.get_host(), config.get_port(),
+            config.get_protocol() == 'https', config.get_pool_maxsize())
+        # The plans the rows and keys of the tables are written with.
+        self.__encoders = RecordEncoders()
+        self.__shut_down = False
+
+    async def execute(self, request):
+        """
+        Execute the KV request and return the response, like the Client of
+        :py:class:`NoSQLHandle` does.
+
+        :param request: the request to be executed by the server.
+        :returns: the result of the request.
+        :raises IllegalArgumentException: raises the exception if request is
+            None or its results are streamed.
+        """
+        CheckValue.check_not_none(request, 'request')
+        request.set_defaults(self.__config)
+        request.validate()
+        if request.should_stream():
+            raise IllegalArgumentException(
+                'Streamed results are not supported by AsyncNoSQLHandle.')
+        timeout_ms = request.get_timeout()
+        # The provider may block to get a token, keep it off the loop.
+        auth_string = await get_event_loop().run_in_executor(
+            None, self.__auth_provider.get_authorization_string, request)
+        if auth_string is None:
+            raise IllegalArgumentException(
+                'Configured AuthorizationProvider acquired an unexpected ' +
+                'None authorization string.')
+        bos = ByteOutputStream(bytearray(AsyncClient._INITIAL_BUFFER_SIZE))
+        BinaryProtocol.write_serial_version(bos)
+        if isinstance(request, (GetRequest, MultiDeleteRequest,
+                                WriteMultipleRequest, WriteRequest)):
+            serializer = request.create_serializer(self.__encoders)
+        else:
+            serializer = request.create_serializer()
+        serializer.serialize(request, bos)
+        content_length = bos.get_offset()
+        BinaryProtocol.check_request_size_limit(request, content_length)
+        headers = self.__headers.copy()
+        headers['Authorization'] = auth_string
+        headers['Content-Length'] = str(content_length)
+        if self.__logutils.is_enabled_for(DEBUG):
+            self.__logutils.log_trace('Request: ' + request.__class__.__name__)
+        result = await self.__do_request(
+            request, headers, bos.get_content(), timeout_ms)
+        if isinstance(result, TableResult):
+            self.__encoders.set_schema(result.get_table_name(),
+                                       result.get_schema())
+        return result
+
+    def get_retry_stats(self):
+        # Returns the statistics of the retries of the requests.
+        return self.__retry_stats.get_stats()
+
+    def shut_down(self):
+        # Shutdown the client.
+        self.__logutils.log_info('Shutting down driver async http client')
+        if self.__shut_down:
+            return
+        self.__shut_down = True
+        if self.__auth_provider is not None:
+            self.__auth_provider.close()
+        self.__pool.close()
+
+    async def __do_request(self, request, headers, payload, timeout_ms):
+        start = time()
+        self.__retry_handler.on_request(request)
+        throttle_retried = 0
+        num_retried = 0
+        exception = None
+        while True:
+            # Each attempt is only given the time left before the deadline.
+            timeout_s = self.__time_left(start, timeout_ms, exception)
+            if num_retried > 0:
+                if timeout_s <= 0:
+                    break
+                self.__log_retried(num_retried, exception)
+            try:
+                self.__max_request_id += 1
+                headers['x-nosql-request-id'] = str(self.__max_request_id)
+                status, content = await self.__pool.post(
+                    self.__path, headers, payload, max(timeout_s, 0.001))
+                if self.__logutils.is_enabled_for(DEBUG):
+                    self.__logutils.log_trace(
+                        'Response: ' + request.__class__.__name__ +
+                        ', status: ' + str(status))
+                return self.__process_response(request, content, status)
+            except RetryableException as re:
+                self.__logutils.log_debug('Retryable exception: ' + str(re))
+                retried = self.__handle_retry(re, request, throttle_retried)
+                """
+                Don't count retries for security info not ready as throttle
+                retires.
+                """
+                if not isinstance(re, SecurityInfoNotReadyException):
+                    throttle_retried = retried
+                exception = re
+                num_retried += 1
+                if not await self.__delay_retry(
+                        retried, re, self.__time_left(start, timeout_ms, re)):
+                    self.__retry_handler.on_retry_dropped(request, retried, re)
+                    self.__retry_stats.record_deadline_exceeded()
+                    break
+                self.__retry_stats.record_retry(re)
+            except NoSQLException as nse:
+                self.__logutils.log_error(
+                    'Client execution NoSQLException: ' + str(nse))
+                raise nse
+            except AsyncTimeoutError as t:
+                self.__logutils.log_error('Timeout exception: ' + str(t))
+                break  # fall through to exception below
+            except (IOError, OSError) as ce:
+                self.__logutils.log_error(
+                    'HTTP request execution ConnectionError: ' + str(ce))
+                raise ce
+        actual_timeout = timeout_ms
+        if isinstance(exception, SecurityInfoNotReadyException):
+            actual_timeout = self.__sec_info_timeout
+        raise RequestTimeoutException(
+            'Request timed out after ' + str(num_retried) +
+            (' retry.' if num_retried == 0 or num_retried == 1
+             else ' retries.'), actual_timeout, exception)
+
+    def __handle_retry(self, re, request, throttle_retried):
+        throttle_retried += 1
+        msg = ('Retry for request ' + request.__class__.__name__ + ', num ' +
+               'retries: ' + str(throttle_retried) + ', exception: ' + str(re))
+        self.__logutils.log_debug(msg)
+        if not self.__retry_handler.do_retry(request, throttle_retried, re):
+            self.__logutils.log_debug(
+                'Operation not retry-able or too many retries.')
+            self.__retry_stats.record_rejected()
+            raise re
+        return throttle_retried
+
+    async def __delay_retry(self, num_retried, re, time_left_s):
+        # Waits for the delay of the retry handler before a retry, see
+        # RequestUtils.
+        handler = self.__retry_handler
+        delay_s = handler._get_delay_internal(num_retried, re)
+        if delay_s is None:
+            # The handler can only wait by blocking, keep it off the loop.
+            await get_event_loop().run_in_executor(
+                None, handler.delay, num_retried, re)
+            return True
+        if delay_s >= time_left_s:
+            return False
+        await sleep(delay_s)
+        return True
+
+    def __log_retried(self, num_retried, exception):
+        msg = ('Client, doing retry: ' + str(num_retried) +
+               ('' if exception is None else ', exception: ' + str(exception)))
+        if isinstance(exception, SecurityInfoNotReadyException):
+            self.__logutils.log_debug(msg)
+        else:
+            self.__logutils.log_info(msg)
+
+    def __process_response(self, request, content, status):
+        # Convert the response into a suitable return value, see RequestUtils.
+        if status == 200:
+            bis = ByteInputStream(content)
+            code = bis.read_byte()
+            if code == 0:
+                return request.create_deserializer().deserialize(bis)
+            """
+            Operation failed. Handle the failure and throw an appropriate
+            exception.
+            """
+            err = BinaryProtocol.read_string(bis)
+            raise BinaryProtocol.map_exception(code, err)
+        if status == 400:
+            raise NoSQLException(
+                'Error response: ' + (content.decode('utf-8', 'replace') if
+                                      len(content) > 0 else str(status)))
+        raise NoSQLException('Error response = ' + str(status))
+
+    def __time_left(self, start, request_timeout, exception):
+        # Returns the seconds left before the deadline of the request, see
+        # RequestUtils.
+        if isinstance(exception, SecurityInfoNotReadyException):
+            request_timeout = self.__sec_info_timeout
+        return start + request_timeout / 1000.0 - time()
+
+
+class AsyncHttpPool(object):
+    """
+    A pool of keep-alive HTTP/1.1 connections to one host, that posts requests
+    without blocking the event loop. At most max_size connections are open at
+    the same time, beyond that a request waits for a connection to be released.
+
+    The connections belong to the event loop they are opened in. If the pool is
+    used from another event loop, its idle connections are dropped and new ones
+    are opened. Once the pool is closed, the connections are closed when they
+    are released rather than kept.
+    """
+
+    def __init__(self, host, port, use_ssl, max_size):
+        self.__host = host
+        self.__port = port
+        self.__ssl = create_default_context() if use_ssl else None
+        self.__max_size = max_size
+        self.__loop = None
+        self.__semaphore = None
+        self.__closed = False
+        # The idle connections, as (reader, writer) pairs.
+        self.__idle = deque()
+
+    def close(self):
+        # Closes the idle connections, those in use are closed when released.
+        self.__closed = True
+        self.__drop_idle()
+        self.__loop = None
+
+    async def post(self, uri_path, headers, body, timeout_s):
+        """
+        Posts a request and returns the status code and content of its
+        response.
+
+        :param uri_path: the path of the request URI.
+        :param headers: the headers of the request.
+        :param body: the content of the request, a bytes-like object.
+        :param timeout_s: the timeout of the request, in seconds, including the
+            time to wait for a connection.
+        :returns: the status code and the content of the response.
+        :raises TimeoutError: raises the exception if the request times out.
+        :raises IOError: raises the exception if the connection fails.
+        """
+        loop = get_event_loop()
+        if self.__loop is not loop:
+            self.__drop_idle()
+            self.__loop = loop
+            self.__semaphore = Semaphore(self.__max_size)
+        head = ['POST ' + uri_path + ' HTTP/1.1\r\n']
+        for name in headers:
+            head.append(name + ': ' + headers[name] + '\r\n')
+        head.append('\r\n')
+        head = ''.join(head).encode('latin-1')
+        return await wait_for(self.__post(head, body), timeout_s)
+
+    async def __post(self, head, body):
+        loop = self.__loop
+        semaphore = self.__semaphore
+        await semaphore.acquire()
+        try:
+            while True:
+                reused = len(self.__idle) > 0
+                reader, writer = await self.__connect()
+                keep_alive = False
+                try:
+                    writer.write(head)
+                    writer.write(body)
+                    await writer.drain()
+                    line = await reader.readline()
+                    if not line and reused:
+                        # The server closed the idle connection, use another.
+                        continue
+                    status, keep_alive, content = await self.__read_response(
+                        line, reader)
+                    return status, content
+                except IncompleteReadError:
+                    raise IOError('Connection closed by the server before ' +
+                                  'the response was received.')
+                finally:
+                    # The connections of a closed pool or of another loop
+                    # aren't kept.
+                    if (keep_alive and not self.__closed and
+                            self.__loop is loop):
+                        self.__idle.append((reader, writer))
+                    else:
+                        writer.close()
+        finally:
+            semaphore.release()
+
+    def __drop_idle(self):
+        # Closes the idle connections.
+        while self.__idle:
+            self.__idle.pop()[1].close()
+
+    async def __connect(self):
+        # Returns an idle connection that is still open, or a new one.
+        idle = self.__idle
+        while idle:
+            reader, writer = idle.pop()
+            if not reader.at_eof() and not writer.transport.is_closing():
+                return reader, writer
+            writer.close()
+        return await open_connection(self.__host, self.__port, ssl=self.__ssl)
+
+    @staticmethod
+    async def __read_response(line, reader):
+        # Reads the response that starts with the status line, returns its
+        # status code, whether the connection can be kept and its content.
+        status_line = line.split(None, 2)
+        if len(status_line) < 2 or not status_line[0].startswith(b'HTTP/'):
+            raise IOError('Invalid HTTP response: ' + repr(line))
+        status = int(status_line[1])
+        keep_alive = status_line[0] == b'HTTP/1.1'
+        length = None
+        chunked = False
+        while True:
+            line = await reader.readline()
+            if not line:
+                raise IOError('Connection closed by the server before the ' +
+                              'response headers were received.')
+            if line == b'\r\n' or line == b'\n':
+                break
+            name, _, value = line.partition(b':')
+            name = name.strip().lower()
+            value = value.strip().lower()
+            if name == b'content-length':
+                length = int(value)
+            elif name == b'transfer-encoding':
+                chunked = b'chunked' in value
+            elif name == b'connection':
+                keep_alive = value == b'keep-alive' or (
+                    keep_alive and value != b'close')
+        if chunked:
+            chunks = list()
+            while True:
+                size = int(
+                    (await reader.readline()).split(b';', 1)[0].strip(), 16)
+                if size == 0:
+                    # Skip the trailers.
+                    while (await reader.readline()).strip():
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            content = b''.join(chunks)
+        elif length is not None:
+            content = await reader.readexactly(length)
+        else:
+            # The content ends when the connection is closed.
+            content = await reader.read()
+            keep_alive = False
+        return status, keep_alive, content
+
+
+class AsyncNoSQLHandle(object):
+    """
+    AsyncNoSQLHandle is the asyncio counterpart of :py:class:`NoSQLHandle`. Its
+    operations are coroutines, which take the same requests and return the
+    same results as those of NoSQLHandle, but wait for the responses, and
+    between retries, without blocking the event loop. This permits many
+    concurrent operations from a single thread, up to
+    :py:meth:`NoSQLHandleConfig.get_pool_maxsize` at a time over keep-alive
+    connections, beyond which operations wait for a connection.
+
+    For example::
+
+        handle = AsyncNoSQLHandle(config)
+        result = await handle.get(GetRequest().set_table_name(
+            'users').set_key({'id': 1}))
+        await handle.close()
+
+    An AsyncNoSQLHandle is also an asynchronous context manager that closes it
+    on exit. It must be used from one event loop at a time, and is not
+    thread-safe. HTTP proxies, streamed query results, the rate limiting of
+    :py:meth:`NoSQLHandleConfig.set_rate_limiting_enabled` and the adaptive
+    concurrency limit of
+    :py:meth:`NoSQLHandleConfig.set_adaptive_concurrency_enabled` are not
+    supported; the requests in flight are only limited by the size of the
+    pool of connections.
+    The :py:class:`AuthorizationProvider` is called from the event loop, so it
+    should return authorization strings without waiting, as the default
+    providers do once they have acquired them.
+
+    AsyncNoSQLHandle is only available with Python 3.5 or later.
+
+    :param config: an instance of NoSQLHandleConfig.
+    :raises IllegalArgumentException: raises the exception if config is not an
+        instance of NoSQLHandleConfig, or if it has an HTTP proxy, rate
+        limiting or an adaptive concurrency limit enabled.
+    """
+
+    def __init__(self, config):
+        if not isinstance(config, NoSQLHandleConfig):
+            raise IllegalArgumentException(
+                'config must be an instance of NoSQLHandleConfig.')
+        logger = self.__get_logger(config)
+        provider = config.get_authorization_provider()
+        if isinstance(provider, DefaultAccessTokenProvider):
+            if provider.get_logger() is None:
+                provider.set_logger(logger)
+        self.__client = AsyncClient(config, logger)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """
+        Close the AsyncNoSQLHandle.
+        """
+        self.__check_client()
+        self.__client.shut_down()
+        self.__client = None
+
+    async def delete(self, request):
+        """
+        Deletes a row from a table, see :py:meth:`NoSQLHandle.delete`.
+
+        :param request: the input parameters for the operation.
+        :returns: the result of the operation.
+        :raises IllegalArgumentException: raises the exception if request is not
+            an instance of :py:class:`DeleteRequest`.
+        :raises NoSQLException: raises the exception if the operation cannot be
+            performed for any other reason.
+        """
+        return await self.__execute(request, DeleteRequest)
+
+    async def get(self, request):
+        """
+        Gets the row associated with a primary key, see
+        :py:meth:`NoSQLHandle.get`.
+
+        :param request: the input parameters for the operation.
+        :returns: the result of the operation.
+        :raises IllegalArgumentException: raises the exception if request is not
+            an instance of :py:class:`GetRequest`.
+        :raises NoSQLException: raises the exception if the operation cannot be
+            performed for any other reason.
+        """
+        return await self.__execute(request, GetRequest)
+
+    async def get_indexes(self, request):
+        """
+        Returns information about and index, or indexes on a table, see
+        :py:meth:`NoSQLHandle.get_indexes`.
+
+        :param request: the input parameters for the operation.
+        :returns: the result of the operation.
+        :raises IllegalArgumentException: raises the exception if request is not
+            an instance of :py:class:`GetIndexesRequest`.
+        :raises NoSQLException: raises the exception if the operation cannot be
+            performed for any other reason.
+        """
+        return await self.__execute(request, GetIndexesRequest)
+
+    def get_retry_stats(self):
+        """
+        Returns the statistics of the retries of the requests of the handle,
+        see :py:meth:`NoSQLHandle.get_retry_stats`.
+
+        :returns: the statistics of the retries.
+        :rtype: dict
+        :raises IllegalStateException: raises the exception if the handle has
+            been closed.
+        """
+        self.__check_client()
+        return self.__client.get_retry_stats()
+
+    async def get_table(self, request):
+        """
+        Gets static information about the specified table, see
+        :py:meth:`NoSQLHandle.get_table`.
+
+        :param request: the input parameters for the operation.
+        :returns: the result of the operation.
+        :raises IllegalArgumentException: raises the exception if request is not
+            an instance of :py:class:`GetTableRequest`.
+        :raises TableNotFoundException: raises the exception if the specified
+            table does not exist.
+        :raises NoSQLException: raises the exception if the operation cannot be
+            performed for any other reason.
+        """
+        return await self.__execute(request, GetTableRequest)
+
+    async def get_table_usage(self, request):
+        """
+        Gets dynamic information about the specified table, see
+        :py:meth:`NoSQLHandle.get_table_usage`.
+
+        :param request: the input parameters for the operation.
+        :returns: the result of the operation.
+        :raises IllegalArgumentException: raises the exception if request is not
+            an instance of :py:class:`TableUsageRequest`.
+        :raises TableNotFoundException: raises the exception if the specified
+            table does not exist.
+        :raises NoSQLException: raises the exception if the operation cannot be
+            performed for any other reason.
+        """
+        return await self.__execute(request, TableUsageRequest)
+
+    async def list_tables(self, request):
+        """
+        Lists tables, returning table names, see
+        :py:meth:`NoSQLHandle.list_tables`.
+
+        :param request: the input parameters for the operation.
+        :returns: the result of the operation.
+        :raises IllegalArgumentException: raises the exception if request is not
+            an instance of :py:class:`ListTablesRequest`.
+        :raises NoSQLException: raises the exception if the operation cannot be
+            performed for any other reason.
+        """
+        return await self.__execute(request, ListTablesRequest)
+
+    async def multi_delete(self, request):
+        """
+        Deletes multiple rows from a table in an atomic operation, see
+        :py:meth:`NoSQLHandle.multi_delete`.
+
+        :param request: the input parameters for the operation.
+        :returns: the result of the operation.
+        :raises IllegalArgumentException: raises the exception if request is not
+            an instance of :py:class:`MultiDeleteRequest`.
+        :raises NoSQLException: raises the exception if the operation cannot be
+            performed for any other reason.
+        """
+        return await self.__execute(request, MultiDeleteRequest)
+
+    async def prepare(self, request):
+        """
+        Prepares a query for execution and reuse, see
+        :py:meth:`NoSQLHandle.prepare`.
+
+        :param request: the input parameters for the operation.
+        :returns: the result of the operation.
+        :raises IllegalArgumentException: raises the exception if request is not
+            an instance of :py:class:`PrepareRequest`.
+        :raises NoSQLException: raises the exception if the operation cannot be
+            performed for any other reason.
+        """
+        return await self.__execute(request, PrepareRequest)
+
+    async def put(self, request):
+        """
+        Puts a row into a table, see :py:meth:`NoSQLHandle.put`.
+
+        :param request: the input parameters for the operation.
+        :returns: the result of the operation.
+        :raises IllegalArgumentException: raises the exception if request is not
+            an instance of :py:class:`PutRequest`.
+        :raises NoSQLException: raises the exception if the operation cannot be
+            performed for any other reason.
+        """
+        return await self.__execute(request, PutRequest)
+
+    async def query(self, request):
+        """
+        Queries a table based on the query statement specified in the
+        :py:class:`QueryRequest`, see :py:meth:`NoSQLHandle.query`. Streamed
+        results are not supported.
+
+        :param request: the input parameters for the operation.
+        :returns: the result of the operation.
+        :raises IllegalArgumentException: raises the exception if request is not
+            an instance of :py:class:`QueryRequest`, or if its results are
+            streamed.
+        :raises NoSQLException: raises the exception if the operation cannot be
+            performed for any other reason.
+        """
+        return await self.__execute(request, QueryRequest)
+
+    async def table_request(self, request):
+        """
+        Performs a DDL operation on a table, see
+        :py:meth:`NoSQLHandle.table_request`. Use :py:meth:`wait_for_state` to
+        wait for the operation to complete.
+
+        :param request: the input parameters for the operation.
+        :returns: the result of the operation.
+        :raises IllegalArgumentException: raises the exception if request is not
+            an instance of :py:class:`TableRequest`.
+        :raises NoSQLException: raises the exception if the operation cannot be
+            performed for any other reason.
+        """
+        return await self.__execute(request, TableRequest)
+
+    async def wait_for_state(self, table_name, state, wait_millis,
+                             delay_millis, operation_id=None):
+        """
+        Waits for the specified table to reach the desired state, polling it
+        every delay_millis, like :py:meth:`TableResult.wait_for_state` does but
+        without blocking the event loop. The state of State.DROPPED is treated
+        specially in that it will be returned as success, even if the table
+        does not exist. Other states will throw an exception if the table is
+        not found.
+
+        :param table_name: the table name.
+        :type table_name: str
+        :param state: the desired state.
+        :type state: State
+        :param wait_millis: the total amount of time to wait, in milliseconds.
+            This value must be non-zero and greater than delay_millis.
+        :type wait_millis: int
+        :param delay_millis: the amount of time to wait between polling
+            attempts, in milliseconds. If 0 it will default to 500.
+        :type delay_millis: int
+        :param operation_id: optional operation id.
+        :type operation_id: int
+        :return: the TableResult representing the table at the desired state.
+        :rtype: TableResult
+        :raises IllegalArgumentException: raises the exception if the
+            parameters are not valid.
+        :raises RequestTimeoutException: raises the exception if the table
+            doesn't reach the state in time.
+        :raises NoSQLException: raises the exception if the operation id used is
+            not None that the operation has failed for some reason.
+        """
+        default_delay = 500
+        delay_ms = delay_millis if delay_millis != 0 else default_delay
+        if wait_millis < delay_millis:
+            raise IllegalArgumentException(
+                'Wait milliseconds must be a minimum of ' + str(default_delay) +
+                ' and greater than delay milliseconds')
+        start_time = int(round(time() * 1000))
+        get_table = GetTableRequest().set_table_name(
+            table_name).set_operation_id(operation_id)
+        res = None
+        while True:
+            cur_time = int(round(time() * 1000))
+            if cur_time - start_time > wait_millis:
+                raise RequestTimeoutException(
+                    'Expected state for table ' + table_name + ' not reached.',
+                    wait_millis)
+            try:
+                if res is not None:
+                    # only delay after the first get_table.
+                    await sleep(delay_ms / 1000.0)
+                res = await self.get_table(get_table)
+                # If using operation_id, re-acquire from the current result. It
+                # can change.
+                if operation_id is not None:
+                    get_table.set_operation_id(res.get_operation_id())
+            except TableNotFoundException as tnf:
+                # table not found is == DROPPED.
+                if state == State.DROPPED:
+                    return TableResult().set_table_name(table_name).set_state(
+                        State.DROPPED)
+                raise tnf
+            if state == res.get_state():
+                break
+        return res
+
+    async def write_multiple(self, request):
+        """
+        Executes a sequence of operations associated with a table that share the
+        same shard key portion of their primary keys, all the specified
+        operations are executed within the scope of a single transaction, see
+        :py:meth:`NoSQLHandle.write_multiple`.
+
+        :param request: the input parameters for the operation.
+        :returns: the result of the operation.
+        :raises IllegalArgumentException: raises the exception if request is not
+            an instance of :py:class:`WriteMultipleRequest`.
+        :raises RowSizeLimitException: raises the exception if data size in an
+            operation exceeds the limit.
+        :raises BatchOperationNumberLimitException: raises the exception if the
+            number of operations exceeds this limit.
+        :raises NoSQLException: raises the exception if the operation cannot be
+            performed for any other reason.
+        """
+        return await self.__execute(request, WriteMultipleRequest)
+
+    def __check_client(self):
+        # Ensure that the client exists and hasn't been closed.
+        if self.__client is None:
+            raise IllegalStateException('AsyncNoSQLHandle has been closed.')
+
+    async def __execute(self, request, cls_request):
+        if not isinstance(request, cls_request):
+            raise IllegalArgumentException(
+                'The parameter should be an instance of ' +
+                cls_request.__name__ + '.')
+        self.__check_client()
+        return await self.__client.execute(request)
+
+    def __get_logger(self, config):
+        """
+        Returns the logger used for the driver. If no logger is specified,
+        create one based on this class name.
+        """
+        if config.get_logger() is not None:
+            logger = config.get_logger()
+        else:
+            logger = getLogger(self.__class__.__name__)
+            logger.setLevel(WARNING)
+            log_dir = (path.abspath(path.dirname(argv[0])) + sep + 'logs')
+            if not path.exists(log_dir):
+                mkdir(log_dir)
+            logger.addHandler(FileHandler(log_dir + sep + 'driver.log'))
+        return logger
@@ -0,0 +1,299 @@
+#
+# Copyright (C) 2018, 2019 Oracle and/or its affiliates. All rights reserved.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl
+#
+# Please see LICENSE.txt file included in the top-level directory of the
+# appropriate download for a copy of the license and additional information.
+#
+
+from concurrent.futures import Future, wait
+from json import loads
+from threading import Condition, Thread
+from time import time
+
+from .common import ByteOutputStream, CheckValue
+from .exception import IllegalArgumentException, IllegalStateException
+from .operations import (
+    DeleteRequest, GetTableRequest, PutRequest, WriteMultipleRequest)
+from .serde import (
+    BinaryProtocol, DeleteRequestSerializer, PutRequestSerializer,
+    RecordEncoders)
+
+
+class BatchWriter(object):
+    """
+    BatchWriter writes rows of a table in batches, each one a
+    :py:meth:`NoSQLHandle.write_multiple` operation, so that many rows take
+    far fewer round trips to the service than putting or deleting them one at
+    a time.
+
+    The :py:class:`PutRequest` and :py:class:`DeleteRequest` added to the
+    writer are grouped by the values of the shard key fields of their rows, as
+    the operations of a WriteMultipleRequest must share them. A group is sent
+    as a batch when it has max_operations operations, when its encoded size
+    would exceed max_size, when flush_interval_ms has passed since its first
+    operation was added, or when :py:meth:`flush` or :py:meth:`close` is
+    called. Batches are sent concurrently using :py:meth:`NoSQLHandle.submit`.
+
+    Each operation of a batch succeeds or fails independently of the others.
+    :py:meth:`add` returns a :py:class:`concurrent.futures.Future` of the
+    :py:class:`OperationResult` of the operation, or of the exception of its
+    batch if the batch fails.
+
+    A BatchWriter is thread-safe. It must be closed when it's no longer used,
+    either with :py:meth:`close` or using it as a context manager::
+
+        with BatchWriter(handle, 'users') as writer:
+            for row in rows:
+                writer.add(PutRequest().set_value(row))
+
+    :param handle: the handle the batches are written with.
+    :type handle: NoSQLHandle
+    :param table_name: the name of the table.
+    :type table_name: str
+    :param shard_key: the names of the shard key fields of the table, if None
+        they are got from the schema of the table with
+        :py:meth:`NoSQLHandle.get_table`.
+    :type shard_key: list(str)
+    :param max_operations: the maximum number of operations of a batch, at most
+        50.
+    :type max_operations: int
+    :param max_size: the maximum encoded size of the operations of a batch, in
+        bytes, at most 25MB minus 1KB.
+    :type max_size: int
+    :param flush_interval_ms: the maximum time an operation waits for its batch
+        to be sent, in milliseconds, or 0 to send batches only when they are
+        full or flushed.
+    :type flush_interval_ms: int
+    :raises IllegalArgumentException: raises the exception if one of the
+        parameters is not valid.
+    """
+
+    # The size reserved for the fields of a batch other than its operations.
+    _HEADER_SIZE = 1024
+
+    def __init__(self, handle, table_name, shard_key=None,
+                 max_operations=BinaryProtocol.BATCH_OP_NUMBER_LIMIT,
+                 max_size=BinaryProtocol.REQUEST_SIZE_LIMIT,
+                 flush_interval_ms=0):
+        CheckValue.check_str(table_name, 'table_name')
+        CheckValue.check_int_gt_zero(max_operations, 'max_operations')
+        if max_operations > BinaryProtocol.BATCH_OP_NUMBER_LIMIT:
+            raise IllegalArgumentException(
+                'max_operations must be at most ' +
+                str(BinaryProtocol.BATCH_OP_NUMBER_LIMIT))
+        CheckValue.check_int_gt_zero(max_size, 'max_size')
+        if (max_size > BinaryProtocol.BATCH_REQUEST_SIZE_LIMIT -
+                BatchWriter._HEADER_SIZE):
+            raise IllegalArgumentException(
+                'max_size must be at most ' +
+                str(BinaryProtocol.BATCH_REQUEST_SIZE_LIMIT -
+                    BatchWriter._HEADER_SIZE))
+        CheckValue.check_int_ge_zero(flush_interval_ms, 'flush_interval_ms')
+        self.__handle = handle
+        self.__table_name = table_name
+        if shard_key is None:
+            shard_key = self.__get_shard_key()
+        CheckValue.check_list(shard_key, 'shard_key')
+        self.__shard_key = shard_key
+        self.__max_operations = max_operations
+        self.__max_size = max_size
+        self.__flush_interval = flush_interval_ms / 1000.0
+        # The operations are serialized to check their size, with the plans
+        # of the writer.
+        encoders = RecordEncoders()
+        self.__put_serializer = PutRequestSerializer(True, encoders=encoders)
+        self.__delete_serializer = DeleteRequestSerializer(
+            True, encoders=encoders)
+        # The batches being filled, by the values of their shard key.
+        self.__batches = dict()
+        # The Futures of the batches that have been sent but aren't done.
+        self.__pending = set()
+        self.__condition = Condition()
+        self.__closed = False
+        if flush_interval_ms > 0:
+            flusher = Thread(target=self.__flush_expired)
+            flusher.daemon = True
+            flusher.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add(self, request):
+        """
+        Adds an operation to its batch, which is sent first if it's full. The
+        table name of request is set to that of the writer if it's None.
+
+        :param request: the operation.
+        :type request: PutRequest or DeleteRequest
+        :returns: the Future of the result of the operation.
+        :rtype: concurrent.futures.Future
+        :raises IllegalArgumentException: raises the exception if request is
+            not a PutRequest or DeleteRequest, if it's for another table, or if
+            it's not valid.
+        :raises RequestSizeLimitException: raises the exception if the size of
+            the request exceeds the limit.
+        :raises IllegalStateException: raises the exception if the writer has
+            been closed.
+        """
+        if isinstance(request, PutRequest):
+            serializer = self.__put_serializer
+            row = request.get_value()
+        elif isinstance(request, DeleteRequest):
+            serializer = self.__delete_serializer
+            row = request.get_key()
+        else:
+            raise IllegalArgumentException(
+                'Invalid request, requires an instance of PutRequest or ' +
+                'DeleteRequest as parameter. Got: ' + str(request))
+        table_name = request.get_table_name_internal()
+        if table_name is None:
+            request.set_table_name(self.__table_name)
+        elif table_name.lower() != self.__table_name.lower():
+            raise IllegalArgumentException(
+                'The table_name used for the operation is different from ' +
+                'that of the writer: ' + self.__table_name)
+        request.validate()
+        bos = ByteOutputStream(bytearray(256))
+        serializer.serialize(request, bos)
+        # The abort_if_unsuccessful flag precedes each operation.
+        size = bos.get_offset() + 1
+        BinaryProtocol.check_request_size_limit(request, size)
+        shard = self.__get_shard(row)
+        future = Future()
+        with self.__condition:
+            if self.__closed:
+                raise IllegalStateException('BatchWriter has been closed.')
+            batch = self.__batches.get(shard)
+            if batch is not None and batch.size + size > self.__max_size:
+                self.__send(self.__batches.pop(shard))
+                batch = None
+            if batch is None:
+                batch = self.__batches[shard] = _Batch(time())
+            batch.add(request, size, future)
+            if batch.request.get_num_operations() == self.__max_operations:
+                self.__send(self.__batches.pop(shard))
+        return future
+
+    def close(self):
+        """
+        Flushes the writer and waits for the batches that have been sent to be
+        done. Operations can't be added once it's closed.
+        """
+        with self.__condition:
+            if self.__closed:
+                return
+            self.__closed = True
+            self.__condition.notify_all()
+        self.flush()
+
+    def flush(self):
+        """
+        Sends the batches being filled, and waits for them and the batches sent
+        before to be done. The results of the operations are available from
+        their Futures, flush doesn't raise the exceptions of the batches.
+        """
+        with self.__condition:
+            while self.__batches:
+                self.__send(self.__batches.popitem()[1])
+            pending = list(self.__pending)
+        wait(pending)
+
+    def get_table_name(self):
+        """
+        Returns the name of the table written by the writer.
+
+        :returns: the table name.
+        :rtype: str
+        """
+        return self.__table_name
+
+    def __flush_expired(self):
+        # Sends the batches that have been filled for flush_interval or longer.
+        with self.__condition:
+            while not self.__closed:
+                now = time()
+                for shard in [shard for shard in self.__batches if
+                              now - self.__batches[shard].start >=
+                              self.__flush_interval]:
+                    self.__send(self.__batches.pop(shard))
+                timeout = self.__flush_interval
+                for batch in self.__batches.values():
+                    timeout = min(timeout,
+                                  batch.start + self.__flush_interval - now)
+                self.__condition.wait(max(timeout, 0.001))
+
+    def __get_shard(self, row):
+        # Returns the values of the shard key fields of the row.
+        shard = list()
+        for field in self.__shard_key:
+            if field in row:
+                shard.append(row[field])
+                continue
+            # Field names are case insensitive.
+            value = None
+            for name in row:
+                if name.lower() == field.lower():
+                    value = row[name]
+                    break
+            shard.append(value)
+        return tuple(shard)
+
+    def __get_shard_key(self):
+        # Gets the shard key fields from the schema of the table.
+        result = self.__handle.get_table(
+            GetTableRequest().set_table_name(self.__table_name))
+        if result.get_schema() is not None:
+            schema = loads(result.get_schema())
+            for name in ('shardKey', 'primaryKey'):
+                if schema.get(name):
+                    return schema[name]
+        raise IllegalArgumentException(
+            'The shard key of table ' + self.__table_name + ' is unknown, ' +
+            'it must be specified.')
+
+    def __send(self, batch):
+        # Submits a batch, with the condition held.
+        future = self.__handle.submit(batch.request)
+        self.__pending.add(future)
+
+        def done(result):
+            with self.__condition:
+                self.__pending.discard(result)
+            batch.complete(result)
+
+        future.add_done_callback(done)
+
+
+class _Batch(object):
+    # A batch being filled and the Futures of its operations.
+
+    def __init__(self, start):
+        self.start = start
+        self.size = 0
+        self.request = WriteMultipleRequest()
+        self.futures = list()
+
+    def add(self, request, size, future):
+        self.request.add(request, False)
+        self.size += size
+        self.futures.append(future)
+
+    def complete(self, future):
+        # Sets the results of the operations from the Future of the batch.
+        if future.cancelled():
+            for operation in self.futures:
+                operation.cancel()
+            return
+        exception = future.exception()
+        if exception is not None:
+            for operation in self.futures:
+                operation.set_exception(exception)
+            return
+        for operation, result in zip(self.futures,
+                                     future.result().get_results()):
+            operation.set_result(result)
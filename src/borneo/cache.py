@@ -0,0 +1,200 @@
+#
+# Copyright (C) 2018, 2019 Oracle and/or its affiliates. All rights reserved.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl
+#
+# Please see LICENSE.txt file included in the top-level directory of the
+# appropriate download for a copy of the license and additional information.
+#
+
+from concurrent.futures import Future
+from copy import deepcopy
+from threading import Lock
+from time import time
+
+from .common import ByteOutputStream, LruCache
+from .operations import GetResult
+from .serde import BinaryProtocol
+
+
+class MetadataCache(object):
+    """
+    A cache of the results of :py:meth:`NoSQLHandle.get_table`,
+    :py:meth:`NoSQLHandle.get_indexes` and :py:meth:`NoSQLHandle.list_tables`,
+    internal. A result is cached by the parameters of its request for ttl_ms,
+    and the concurrent requests with the same parameters share the request to
+    the service of the first one. The cache is cleared when the handle
+    executes a :py:class:`TableRequest`, and a result is only cached if it
+    wasn't cleared while it was got. The callers are given copies of the
+    results, so that they can't change the cached ones.
+    """
+
+    # The maximum number of results cached.
+    _MAX_RESULTS = 1000
+
+    def __init__(self, ttl_ms):
+        self.__results = LruCache(MetadataCache._MAX_RESULTS)
+        self.__ttl = ttl_ms / 1000.0
+        self.__fetches = SingleFlight()
+        self.__generation = 0
+        self.__lock = Lock()
+
+    def clear(self):
+        with self.__lock:
+            self.__generation += 1
+            self.__results.clear()
+
+    def get(self, key, fetch, cacheable):
+        # Returns a copy of the cached result of key, or of the result of
+        # fetch, that is cached if cacheable returns True for it. The result of
+        # fetch is also shared by the concurrent gets of key, so it's copied
+        # too.
+        result = self.__results.get(key)
+        if result is None:
+            result = self.__fetches.do(
+                key, lambda: self.__fetch(key, fetch, cacheable))
+        return deepcopy(result)
+
+    def __fetch(self, key, fetch, cacheable):
+        generation = self.__generation
+        result = fetch()
+        if cacheable(result):
+            with self.__lock:
+                if generation == self.__generation:
+                    self.__results.put(key, result, time() + self.__ttl)
+        return result
+
+
+class RowCache(object):
+    """
+    A cache of the results of :py:meth:`NoSQLHandle.get`, internal. A result is
+    cached by the name of the table and the values of the fields of the key of
+    its get, and is evicted once it's been cached for max_staleness_ms, when
+    its row expires, when the least recently used results are evicted to make
+    room for new ones, or when its row is written by the handle. The handle
+    has a cache of the rows of each table cached, and a cache of the keys of
+    the rows that don't exist.
+
+    The names of the key fields of the gets are remembered, so that the cached
+    result that a written row replaces is found without knowing the primary
+    key of the table. Every write also increments a generation, and a result
+    is only cached if no write was done while it was read.
+    """
+
+    def __init__(self, max_rows, max_staleness_ms):
+        self.__rows = LruCache(max_rows)
+        self.__max_staleness = max_staleness_ms / 1000.0
+        # The names of the key fields of the cached results, by table.
+        self.__key_fields = dict()
+        self.__generation = 0
+        self.__hits = 0
+        self.__misses = 0
+        self.__lock = Lock()
+
+    def clear(self):
+        with self.__lock:
+            self.__generation += 1
+            self.__rows.clear()
+
+    def get(self, table_name, key):
+        # Returns a copy of the cached result of the get of key, or None.
+        result = self.__rows.get(RowCache.__encode(table_name, key))
+        with self.__lock:
+            if result is None:
+                self.__misses += 1
+                return None
+            self.__hits += 1
+        return RowCache.__copy(result)
+
+    def get_generation(self):
+        return self.__generation
+
+    def get_stats(self):
+        return {'hits': self.__hits, 'misses': self.__misses,
+                'size': self.__rows.size()}
+
+    def invalidate(self, table_name, row):
+        # Evicts the cached result of the get of the key fields of row.
+        with self.__lock:
+            self.__generation += 1
+            key_fields = list(self.__key_fields.get(table_name.lower(), ()))
+        values = dict((name.lower(), value) for name, value in row.items())
+        for fields in key_fields:
+            if all(field in values for field in fields):
+                self.__rows.remove(RowCache.__encode(
+                    table_name,
+                    dict((field, values[field]) for field in fields)))
+
+    def put(self, table_name, key, result, generation):
+        # Caches the result of the get of key, unless a write was done since
+        # generation.
+        expiration = time() + self.__max_staleness
+        if result.get_expiration_time() > 0:
+            expiration = min(expiration, result.get_expiration_time() / 1000.0)
+        encoded = RowCache.__encode(table_name, key)
+        result = RowCache.__copy(result)
+        with self.__lock:
+            if generation != self.__generation:
+                return
+            self.__key_fields.setdefault(table_name.lower(), set()).add(
+                tuple(sorted(name.lower() for name in key)))
+            self.__rows.put(encoded, result, expiration)
+
+    @staticmethod
+    def __copy(result):
+        # Returns a copy of a result, so that its value is never shared with
+        # the caller.
+        copied = GetResult()
+        copied.set_value(deepcopy(result.get_value()))
+        copied.set_version(result.get_version())
+        copied.set_expiration_time(result.get_expiration_time())
+        return copied
+
+    @staticmethod
+    def __encode(table_name, key):
+        # Returns the bytes of the lowercase name of the table and of the values
+        # of the key, in the order of the lowercase names of their fields.
+        values = dict((name.lower(), value) for name, value in key.items())
+        bos = ByteOutputStream(bytearray(64))
+        BinaryProtocol.write_string(bos, table_name.lower())
+        for name in sorted(values):
+            BinaryProtocol.write_string(bos, name)
+            BinaryProtocol.write_field_value(bos, values[name])
+        return bos.get_content().tobytes()
+
+
+class SingleFlight(object):
+    """
+    Runs a function once for the concurrent callers of :py:meth:`do` with the
+    same key, internal. The first caller runs it, and the others wait for it
+    to be done and get its result, or the copy of it returned by copy if it's
+    not None, or its exception.
+    """
+
+    def __init__(self):
+        # The Futures of the functions running, by their keys.
+        self.__running = dict()
+        self.__lock = Lock()
+
+    def do(self, key, function, copy=None):
+        with self.__lock:
+            future = self.__running.get(key)
+            if future is None:
+                future = self.__running[key] = Future()
+                runner = True
+            else:
+                runner = False
+        if not runner:
+            result = future.result()
+            return result if copy is None else copy(result)
+        try:
+            result = function()
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self.__lock:
+                del self.__running[key]
@@ -7,21 +7,40 @@
 # appropriate download for a copy of the license and additional information.
 #
 
+from copy import deepcopy
 from logging import DEBUG
 from platform import python_version
 from requests import Session, adapters
 from sys import version_info
+from threading import local
+from time import time
 
+from .cache import SingleFlight
 from .common import ByteOutputStream, CheckValue, HttpConstants, LogUtils
 from .config import DefaultRetryHandler
-from .exception import IllegalArgumentException
-from .http import RequestUtils
-from .serde import BinaryProtocol
+from .exception import (
+    IllegalArgumentException, NoSQLException, RequestTimeoutException)
+from .http import RequestUtils, RetryStats
+from .limiter import ConcurrencyLimiter, RateLimiter
+from .operations import (
+    DeleteRequest, GetRequest, GetResult, GetTableRequest, MultiDeleteRequest,
+    PutRequest, QueryRequest, QueryResult, TableRequest, TableResult,
+    WriteMultipleRequest, WriteRequest)
+from .serde import BinaryProtocol, RecordEncoders
 from .version import __version__
 
 
 class Client:
     # The HTTP driver client.
+
+    # The initial size of the buffer each thread serializes requests into.
+    _INITIAL_BUFFER_SIZE = 4096
+    # The time after which the limits of a table are got again, in seconds,
+    # and after which the limits of a table that couldn't be got are tried
+    # again.
+    _LIMITS_REFRESH_S = 600
+    _LIMITS_RETRY_S = 10
+
     def __init__(self, config, logger):
         self.__logutils = LogUtils(logger)
         self.__config = config
@@ -32,6 +51,7 @@ class Client:
                                                  self.__port)
         self.__pool_connections = config.get_pool_connections()
         self.__pool_maxsize = config.get_pool_maxsize()
+        self.__max_content_length = config.get_max_content_length()
         self.__max_request_id = 1
         self.__proxy_host = config.get_proxy_host()
         self.__proxy_port = config.get_proxy_port()
@@ -43,6 +63,12 @@ class Client:
         self.__sec_info_timeout = config.get_sec_info_timeout()
         self.__shut_down = False
         self.__user_agent = self.__make_user_agent()
+        # The headers that are the same for all requests, copied for each one.
+        self.__headers = {'Host': self.__host,
+                          'Content-Type': 'application/octet-stream',
+                          'Connection': 'keep-alive',
+                          'Accept': 'application/octet-stream',
+                          'User-Agent': self.__user_agent}
         self.__auth_provider = config.get_authorization_provider()
         if self.__auth_provider is None:
             raise IllegalArgumentException(
@@ -54,6 +80,27 @@ class Client:
         self.__sess.mount(self.__protocol + '://', adapter)
         if self.__proxy_host is not None:
             self.__check_and_set_proxy(self.__sess)
+        # Per-thread output streams, reused across requests.
+        self.__local = local()
+        # The plans the rows and keys of the tables are written with.
+        self.__encoders = RecordEncoders()
+        # The identical gets and queries running, that are sent once.
+        self.__coalesce_reads = config.get_coalesce_reads()
+        self.__coalesce_queries = config.get_coalesce_queries()
+        self.__in_flight = SingleFlight()
+        # The read and write limiters of the tables and the times they're got
+        # again, by the lowercase names of the tables.
+        self.__rate_limiting = config.get_rate_limiting_enabled()
+        self.__rate_limiting_percentage = config.get_rate_limiting_percentage()
+        self.__rate_limiters = dict()
+        self.__limits_fetches = SingleFlight()
+        # The retries of the requests, by the classes of their exceptions.
+        self.__retry_stats = RetryStats()
+        # The adaptive limit of the requests in flight.
+        self.__concurrency_limiter = None
+        if config.get_adaptive_concurrency_enabled():
+            self.__concurrency_limiter = ConcurrencyLimiter(
+                self.__pool_maxsize, config.get_concurrency_queue_timeout())
 
     def execute(self, request):
         """
@@ -85,23 +132,65 @@ class Client:
             raise IllegalArgumentException(
                 'Configured AuthorizationProvider acquired an unexpected ' +
                 'None authorization string.')
-        content = bytearray()
-        self.__write_content(request, content)
-        BinaryProtocol.check_request_size_limit(request, len(content))
-        headers = {'Host': self.__host,
-                   'Content-Type': 'application/octet-stream',
-                   'Connection': 'keep-alive',
-                   'Accept': 'application/octet-stream',
-                   'Authorization': auth_string,
-                   'Content-Length': str(len(content)),
-                   'User-Agent': self.__user_agent}
+        # The limits of the table are got before the request is serialized,
+        # since getting them reuses the output stream of the thread.
+        limiters = None
+        if self.__rate_limiting:
+            limiters = self.__get_rate_limiters(request)
+        if limiters is not None:
+            timeout_ms = self.__wait_for_limiter(request, limiters, timeout_ms)
+        bos = self.__get_output_stream()
+        self.__write_content(request, bos)
+        content_length = bos.get_offset()
+        BinaryProtocol.check_request_size_limit(request, content_length)
+        headers = self.__headers.copy()
+        headers['Authorization'] = auth_string
+        headers['Content-Length'] = str(content_length)
         if self.__logutils.is_enabled_for(DEBUG):
             self.__logutils.log_trace('Request: ' + request.__class__.__name__)
         request_utils = RequestUtils(
-            self.__sess, self.__logutils, request, self.__retry_handler)
-        return request_utils.do_post_request(
-            self.__request_uri, headers, content, timeout_ms,
-            self.__sec_info_timeout)
+            self.__sess, self.__logutils, request, self.__retry_handler,
+            self.__concurrency_limiter, self.__retry_stats)
+        if self.__coalesces(request):
+            # The requests with the same content, decoded the same way, share
+            # the response of the first one.
+            result = self.__in_flight.do(
+                (request.get_lazy_values(), request.get_raw_values(),
+                 bos.get_content().tobytes()),
+                lambda: request_utils.do_post_request(
+                    self.__request_uri, headers, bos.get_content(),
+                    timeout_ms, self.__sec_info_timeout),
+                Client.__copy_result)
+        else:
+            result = request_utils.do_post_request(
+                self.__request_uri, headers, bos.get_content(), timeout_ms,
+                self.__sec_info_timeout)
+        if limiters is not None:
+            if request.should_stream():
+                # The units of a streamed query are only known once its
+                # results are read.
+                result._add_stream_listener_internal(
+                    lambda res: Client.__consume(limiters, res))
+            else:
+                Client.__consume(limiters, result)
+        elif self.__rate_limiting and isinstance(request, TableRequest):
+            # The limits of the tables may have been changed.
+            for key in list(self.__rate_limiters):
+                self.__rate_limiters[key] = (self.__rate_limiters[key][0], 0)
+        if isinstance(result, TableResult):
+            self.__encoders.set_schema(result.get_table_name(),
+                                       result.get_schema())
+        return result
+
+    def get_concurrency_stats(self):
+        # Returns the statistics of the concurrency limiter, or None.
+        if self.__concurrency_limiter is None:
+            return None
+        return self.__concurrency_limiter.get_stats()
+
+    def get_retry_stats(self):
+        # Returns the statistics of the retries of the requests.
+        return self.__retry_stats.get_stats()
 
     def shut_down(self):
         # Shutdown the client.
@@ -141,6 +230,97 @@ class Client:
         return (protocol + '://' + host + ':' + str(port) + '/' +
                 HttpConstants.NOSQL_DATA_PATH)
 
+    def __coalesces(self, request):
+        # Returns True if request is sent once for all the identical requests
+        # running. The lazy values can't be shared between threads, so the
+        # requests with lazy values are not coalesced.
+        if isinstance(request, GetRequest):
+            return self.__coalesce_reads and not request.get_lazy_values()
+        return (self.__coalesce_queries and isinstance(request, QueryRequest)
+                and not request.should_stream() and
+                not request.get_columnar_results() and
+                not request.get_lazy_values())
+
+    @staticmethod
+    def __copy_result(result):
+        # Returns the copy of the result of a request given to the requests
+        # that shared it, that consumed no throughput.
+        if isinstance(result, GetResult):
+            copied = GetResult()
+            copied.set_value(deepcopy(result.get_value()))
+            copied.set_version(result.get_version())
+            copied.set_expiration_time(result.get_expiration_time())
+            return copied
+        copied = QueryResult()
+        copied.set_results(deepcopy(result.get_results()))
+        copied.set_continuation_key(result.get_continuation_key())
+        return copied
+
+    def __fetch_rate_limiters(self, table_name, key):
+        # Gets the limits of a table and returns its read and write limiters,
+        # updating those it already has.
+        entry = self.__rate_limiters.get(key)
+        limiters = None if entry is None else entry[0]
+        try:
+            limits = self.execute(GetTableRequest().set_table_name(
+                table_name)).get_table_limits()
+        except NoSQLException as e:
+            self.__logutils.log_info(
+                'Unable to get the limits of table ' + table_name + ': ' +
+                str(e))
+            self.__rate_limiters[key] = (limiters,
+                                         time() + Client._LIMITS_RETRY_S)
+            return limiters
+        if limits is None:
+            limiters = None
+        else:
+            share = self.__rate_limiting_percentage / 100.0
+            read_limiter, write_limiter = (
+                (None, None) if limiters is None else limiters)
+            limiters = (
+                Client.__update_limiter(
+                    read_limiter, limits.get_read_units() * share),
+                Client.__update_limiter(
+                    write_limiter, limits.get_write_units() * share))
+            if limiters == (None, None):
+                limiters = None
+        self.__rate_limiters[key] = (limiters,
+                                     time() + Client._LIMITS_REFRESH_S)
+        return limiters
+
+    def __get_output_stream(self):
+        """
+        Returns the output stream of the calling thread, reset for a new
+        request. A buffer that has grown beyond the maximum content length for
+        one large request is not kept for the following ones.
+        """
+        bos = getattr(self.__local, 'bos', None)
+        if bos is None or bos.get_capacity() > self.__max_content_length:
+            bos = ByteOutputStream(bytearray(Client._INITIAL_BUFFER_SIZE))
+            self.__local.bos = bos
+        bos.reset()
+        return bos
+
+    def __get_rate_limiters(self, request):
+        # Returns the read and write limiters of the table of a request, or
+        # None if it's not limited.
+        if isinstance(request, (DeleteRequest, GetRequest, PutRequest)):
+            table_name = request.get_table_name_internal()
+        elif isinstance(request, (MultiDeleteRequest, WriteMultipleRequest)):
+            table_name = request.get_table_name()
+        elif isinstance(request, QueryRequest):
+            table_name = request.get_table_name_internal()
+        else:
+            return None
+        if table_name is None:
+            return None
+        key = table_name.lower()
+        entry = self.__rate_limiters.get(key)
+        if entry is not None and time() < entry[1]:
+            return entry[0]
+        return self.__limits_fetches.do(
+            key, lambda: self.__fetch_rate_limiters(table_name, key))
+
     def __make_user_agent(self):
         if version_info.major >= 3:
             pyversion = python_version()
@@ -149,13 +329,53 @@ class Client:
                                       version_info.micro)
         return '%s/%s (Python %s)' % ('NoSQL-PythonSDK', __version__, pyversion)
 
-    def __write_content(self, request, content):
+    @staticmethod
+    def __update_limiter(limiter, units_per_second):
+        # Returns the limiter of units_per_second, limiter updated if it's not
+        # None, or None if the units aren't limited.
+        if units_per_second <= 0:
+            return None
+        if limiter is None:
+            return RateLimiter(units_per_second)
+        limiter.set_limit(units_per_second)
+        return limiter
+
+    @staticmethod
+    def __consume(limiters, result):
+        # Consumes the units of a result from the limiters of its table.
+        read_limiter, write_limiter = limiters
+        if read_limiter is not None:
+            read_limiter.consume(result._get_read_units_internal())
+        if write_limiter is not None:
+            write_limiter.consume(result._get_write_units_internal())
+
+    @staticmethod
+    def __wait_for_limiter(request, limiters, timeout_ms):
+        # Waits until the read limiter of a read or the write limiter of a
+        # write is owed no units, returning the time left of the timeout of the
+        # request in milliseconds.
+        limiter = limiters[0 if isinstance(
+            request, (GetRequest, QueryRequest)) else 1]
+        if limiter is None:
+            return timeout_ms
+        waited = limiter.wait(timeout_ms / 1000.0)
+        if waited is None:
+            raise RequestTimeoutException(
+                'Request would exceed its timeout waiting for the rate ' +
+                'limit of its table.', timeout_ms)
+        return max(1, timeout_ms - int(waited * 1000))
+
+    def __write_content(self, request, bos):
         """
         Serializes the request payload, sent as http content.
 
         :param request: the request to be executed by the server.
-        :returns: the bytes contain the content.
+        :param bos: the output stream to write the content to.
         """
-        bos = ByteOutputStream(content)
         BinaryProtocol.write_serial_version(bos)
-        return request.create_serializer().serialize(request, bos)
+        if isinstance(request, (GetRequest, MultiDeleteRequest,
+                                WriteMultipleRequest, WriteRequest)):
+            serializer = request.create_serializer(self.__encoders)
+        else:
+            serializer = request.create_serializer()
+        return serializer.serialize(request, bos)
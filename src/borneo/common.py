@@ -7,10 +7,12 @@
 # appropriate download for a copy of the license and additional information.
 #
 
+from collections import OrderedDict
 from datetime import datetime
 from logging import Logger
-from struct import pack, unpack
+from struct import pack_into, unpack_from
 from sys import version_info
+from threading import Lock
 from time import ctime, time
 
 from .exception import IllegalArgumentException
@@ -23,86 +25,175 @@ def enum(**enums):
 class ByteInputStream:
     """
     The ByteInputStream provides methods to get data with different type from
-    a bytearray.
+    a bytes-like object.
+
+    The content is not copied, reads advance an offset over a view of it. On
+    Python 2 indexing a memoryview returns a str rather than an int, so there
+    the content is kept as a bytearray instead.
     """
 
     def __init__(self, content):
-        self.__content = content
-        self.__content.reverse()
+        if version_info.major == 2:
+            if not isinstance(content, bytearray):
+                content = bytearray(content)
+            self.__content = content
+        else:
+            self.__content = memoryview(content)
+        self.__offset = 0
+        self.__limit = len(self.__content)
+
+    def get_buffer(self):
+        # Returns the underlying content, for decoding in place.
+        return self.__content
+
+    def get_offset(self):
+        return self.__offset
 
     def read_boolean(self):
         res = bool(self.read_byte())
         return res
 
     def read_byte(self):
-        return self.__content.pop()
+        offset = self.__offset
+        res = self.__content[offset]
+        self.__offset = offset + 1
+        return res
+
+    def read_bytes(self, length):
+        # Returns a view of the next length bytes, without copying them.
+        offset = self.__offset
+        end = offset + length
+        if end > self.__limit:
+            raise IndexError('Read past the end of the content.')
+        self.__offset = end
+        return self.__content[offset:end]
 
     def read_float(self):
-        buf = bytearray(8)
-        self.read_fully(buf)
-        res, = unpack('>d', buf)
+        offset = self.__offset
+        res, = unpack_from('>d', self.__content, offset)
+        self.__offset = offset + 8
         return res
 
     def read_fully(self, buf, start=0, end=None):
         if end is None:
             end = len(buf)
-        for index in range(start, end):
-            buf[index] = self.__content.pop()
+        buf[start:end] = self.read_bytes(end - start)
 
     def read_int(self):
-        buf = bytearray(4)
-        self.read_fully(buf)
-        res, = unpack('>i', buf)
+        offset = self.__offset
+        res, = unpack_from('>i', self.__content, offset)
+        self.__offset = offset + 4
         return res
 
+    def skip(self, length):
+        # Advances the offset past the next length bytes.
+        self.read_bytes(length)
+
 
 class ByteOutputStream:
     """
     The ByteOutputStream provides methods to write data with different type into
     a bytearray.
+
+    The bytearray is used as a buffer, writing starts at its beginning and any
+    existing length is spare capacity, so a pre-sized buffer can be reused by
+    calling :py:meth:`reset`. The buffer is grown geometrically when needed.
+    Use :py:meth:`get_offset` for the number of bytes written and
+    :py:meth:`get_content` for the bytes themselves.
     """
 
     def __init__(self, content):
         self.__content = content
+        self.__offset = 0
 
-    def get_offset(self):
+    def ensure_capacity(self, length):
+        # Makes sure length more bytes can be written in place.
+        end = self.__offset + length
+        if end > len(self.__content):
+            self.__reserve(end)
+
+    def get_buffer(self):
+        # Returns the underlying buffer, for writing in place after calling
+        # ensure_capacity.
+        return self.__content
+
+    def get_capacity(self):
         return len(self.__content)
 
+    def get_content(self):
+        # Returns a view of the bytes written so far, without copying them.
+        return memoryview(self.__content)[:self.__offset]
+
+    def get_offset(self):
+        return self.__offset
+
+    def reset(self):
+        self.__offset = 0
+
+    def skip(self, length):
+        # Advances the offset past length bytes written in place.
+        self.__offset += length
+
     def write_boolean(self, value):
-        val_s = pack('?', value)
-        self.write_value(val_s)
+        self.write_byte(1 if value else 0)
 
     def write_byte(self, value):
-        val_s = pack('B', value)
-        self.write_value(val_s)
+        offset = self.__offset
+        if offset >= len(self.__content):
+            self.__reserve(offset + 1)
+        self.__content[offset] = value
+        self.__offset = offset + 1
 
     def write_bytearray(self, value, start=0, end=None):
-        if end is None:
-            end = len(value)
-        for index in range(start, end):
-            self.__content.append(value[index])
+        if end is not None and (start != 0 or end != len(value)):
+            value = value[start:end]
+        offset = self.__offset
+        end = offset + len(value)
+        if end > len(self.__content):
+            self.__reserve(end)
+        self.__content[offset:end] = value
+        self.__offset = end
 
     def write_float(self, value):
-        val_s = pack('>d', value)
-        self.write_value(val_s)
+        offset = self.__offset
+        if offset + 8 > len(self.__content):
+            self.__reserve(offset + 8)
+        pack_into('>d', self.__content, offset, value)
+        self.__offset = offset + 8
 
     def write_int(self, value):
-        val_s = pack('>i', value)
-        self.write_value(val_s)
+        offset = self.__offset
+        if offset + 4 > len(self.__content):
+            self.__reserve(offset + 4)
+        pack_into('>i', self.__content, offset, value)
+        self.__offset = offset + 4
 
     def write_int_at_offset(self, offset, value):
-        val_s = pack('>i', value)
-        val_b = bytearray(val_s)
-        for index in range(len(val_b)):
-            self.__content[offset + index] = val_b[index]
+        pack_into('>i', self.__content, offset, value)
 
     def write_short_int(self, value):
-        val_s = pack('>h', value)
-        self.write_value(val_s)
+        offset = self.__offset
+        if offset + 2 > len(self.__content):
+            self.__reserve(offset + 2)
+        pack_into('>h', self.__content, offset, value)
+        self.__offset = offset + 2
 
     def write_value(self, value):
-        val_b = bytearray(value)
-        self.write_bytearray(val_b)
+        self.write_bytearray(value)
+
+    def __reserve(self, end):
+        # Grows the buffer so that it can hold end bytes.
+        content = self.__content
+        size = len(content)
+        grow = max(end - size, size)
+        try:
+            content.extend(bytearray(grow))
+        except BufferError:
+            # A view of the buffer handed out earlier is still alive and the
+            # buffer cannot be resized in place, so move to a new one.
+            content = bytearray(content)
+            content.extend(bytearray(grow))
+            self.__content = content
 
 
 class CheckValue:
@@ -171,6 +262,77 @@ class CheckValue:
         return False
 
 
+class ChunkReader:
+    """
+    Reads bytes from an iterator of chunks of bytes, the content of a streamed
+    HTTP response for example. Only the bytes not read yet are kept, as the
+    chunks are fetched when needed.
+    """
+
+    def __init__(self, chunks, close=None):
+        """
+        :param chunks: the iterable of chunks.
+        :param close: a function called by :py:meth:`close`, to release the
+            source of the chunks.
+        """
+        self.__chunks = iter(chunks)
+        self.__close = close
+        self.__buf = bytearray()
+        self.__offset = 0
+
+    def close(self):
+        if self.__close is not None:
+            self.__close()
+            self.__close = None
+
+    def peek(self, length):
+        """
+        Returns up to length bytes from the current offset without advancing
+        it. Fewer bytes are returned only at the end of the chunks.
+        """
+        self.__fill(length)
+        offset = self.__offset
+        return bytes(self.__buf[offset:offset + length])
+
+    def read(self, length):
+        """
+        Returns the next length bytes.
+
+        :raises IOError: raises the exception if the chunks end before that.
+        """
+        if not self.__fill(length):
+            raise IOError('Unexpected end of the content, ' + str(length) +
+                          ' bytes expected.')
+        offset = self.__offset
+        self.__offset = offset + length
+        return bytes(self.__buf[offset:offset + length])
+
+    def read_all(self):
+        # Returns all the bytes not read yet.
+        for chunk in self.__chunks:
+            self.__buf.extend(chunk)
+        res = bytes(self.__buf[self.__offset:])
+        self.__buf = bytearray()
+        self.__offset = 0
+        return res
+
+    def __fill(self, length):
+        # Fetches chunks until length bytes are available past the offset,
+        # returns False if the chunks end before that.
+        buf = self.__buf
+        while len(buf) - self.__offset < length:
+            try:
+                chunk = next(self.__chunks)
+            except StopIteration:
+                return False
+            if self.__offset > len(buf) // 2:
+                # Drop the bytes read, once they are the larger part.
+                del buf[:self.__offset]
+                self.__offset = 0
+            buf.extend(chunk)
+        return True
+
+
 class Consistency:
     """
     Set the consistency for read requests.
@@ -425,6 +587,43 @@ class LogUtils:
         return self.__logger is not None and self.__logger.isEnabledFor(level)
 
 
+class LruCache:
+    # A thread-safe cache of at most capacity entries, that evicts the least
+    # recently used entry to make room for a new one. An entry can expire at a
+    # time, after which it's evicted rather than returned.
+    def __init__(self, capacity):
+        self.__capacity = capacity
+        self.__entries = OrderedDict()
+        self.__lock = Lock()
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+
+    def get(self, key):
+        # Returns the value of key, or None if it's not cached or has expired.
+        with self.__lock:
+            entry = self.__entries.pop(key, None)
+            if entry is None or (entry[1] is not None and entry[1] <= time()):
+                return None
+            self.__entries[key] = entry
+            return entry[0]
+
+    def put(self, key, value, expiration=None):
+        with self.__lock:
+            self.__entries.pop(key, None)
+            if len(self.__entries) == self.__capacity:
+                self.__entries.popitem(last=False)
+            self.__entries[key] = (value, expiration)
+
+    def remove(self, key):
+        with self.__lock:
+            self.__entries.pop(key, None)
+
+    def size(self):
+        return len(self.__entries)
+
+
 class Memoize:
     # A cache that used for saving the access token.
     def __init__(self, duration=60):
@@ -443,7 +642,79 @@ class Memoize:
         return time() - entry['time'] > self.__duration
 
 
+# The range of values, [_CACHE_MIN, _CACHE_MAX), whose packed encodings are
+# computed once, it covers most of the sizes, counts and timeouts written.
+_CACHE_MIN = -512
+_CACHE_MAX = 8192
+
+# The number of bytes needed for an unsigned value, indexed by its bit length.
+_BYTE_LENGTHS = [max(1, (bits + 7) >> 3) for bits in range(65)]
+
+# The total length of a packed integer, indexed by its first byte.
+_READ_LENGTHS = [1 + 0x08 - b if b < 0x08 else 1 + b - 0xf7 if b > 0xf7 else 1
+                 for b in range(256)]
+
+if version_info.major == 2:
+    def _int_from_bytes(buf, byteorder):
+        value = 0
+        for b in buf:
+            value = (value << 8) | b
+        return value
+
+    def _int_to_bytes(value, length, byteorder):
+        return bytearray((value >> shift) & 0xFF
+                         for shift in range((length - 1) << 3, -1, -8))
+else:
+    _int_from_bytes = int.from_bytes
+    _int_to_bytes = int.to_bytes
+
+
+def _write_sorted(buf, offset, value, negative_length):
+    """
+    Writes a packed sorted integer starting at the given buffer offset and
+    returns the next offset to be written. An adjusted negative value is always
+    written in negative_length bytes, 4 for an int and 8 for a long, which any
+    reader accepts just like the shortest form.
+    """
+    if value < -119:
+        length = negative_length
+        value = (value + 119) & ((1 << (length << 3)) - 1)
+        buf[offset] = 0x08 - length
+    elif value > 120:
+        value -= 121
+        length = _BYTE_LENGTHS[value.bit_length()]
+        buf[offset] = 0xF7 + length
+    else:
+        buf[offset] = value + 127
+        return offset + 1
+    offset += 1
+    end = offset + length
+    buf[offset:end] = _int_to_bytes(value, length, 'big')
+    return end
+
+
+def _encodings(negative_length):
+    encodings = []
+    for value in range(_CACHE_MIN, _CACHE_MAX):
+        buf = bytearray(PackedInteger.MAX_LONG_LENGTH)
+        encodings.append(bytes(buf[:_write_sorted(buf, 0, value,
+                                                  negative_length)]))
+    return encodings
+
+
 class PackedInteger:
+    """
+    Packed sorted integers. Values in the inclusive range [-119,120] are stored
+    in a single byte. For values outside that range, the first byte stores the
+    number of additional bytes. The additional bytes store (value + 119 for
+    negative and value - 121 for positive) as an unsigned big endian integer.
+
+    The first byte stores 0x08 - length for negative values and 0xF7 + length
+    for positive ones, rather than the length itself, so that byte-by-byte
+    comparison follows the natural sort order. Lengths are looked up in tables
+    and the encodings of small values are cached, so the methods work directly
+    on the given buffer without building the value byte by byte.
+    """
     # The maximum number of bytes needed to store an int value (5).
     MAX_LENGTH = 5
 
@@ -460,111 +731,13 @@ class PackedInteger:
         :param offset: the offset in the buffer at which to start writing.
         :param value: the integer to be written.
         :returns: the offset past the bytes written.
-
-        Values in the inclusive range [-119,120] are stored in a single byte.
-        For values outside that range, the first byte stores the number of
-        additional bytes. The additional bytes store (value + 119 for negative
-        and value - 121 for positive) as an unsigned big endian integer.
         """
-        b1 = offset
-        offset += 1
-        if value < -119:
-            """
-            If the value < -119, then first adjust the value by adding 119. Then
-            the adjusted value is stored as an unsigned big endian integer.
-            """
-            value += 119
-
-            """
-            Store the adjusted value as an unsigned big endian integer. For an
-            negative integer, from left to right, the first significant byte is
-            the byte which is not equal to 0xFF. Also please note that, because
-            the adjusted value is stored in big endian integer, we extract the
-            significant byte from left to right.
-
-            In the left to right order, if the first byte of the adjusted value
-            is a significant byte, it will be stored in the 2nd byte of the buf.
-            Then we will look at the 2nd byte of the adjusted value to see if
-            this byte is the significant byte, if yes, this byte will be stored
-            in the 3rd byte of the buf, and the like.
-            """
-            if value | 0x00FFFFFF != 0xFFFFFFFF:
-                buf[offset] = value >> 24 & 0xFF
-                offset += 1
-            if value | 0x0000FFFF != 0xFFFFFFFF:
-                buf[offset] = value >> 16 & 0xFF
-                offset += 1
-            if value | 0x000000FF != 0xFFFFFFFF:
-                buf[offset] = value >> 8 & 0xFF
-                offset += 1
-            buf[offset] = value & 0xFF
-            offset += 1
-
-            """
-            value_len is the length of the value part stored in buf. Because
-            the first byte of buf is used to stored the length, we need to
-            subtract one.
-            """
-            value_len = offset - b1 - 1
-
-            """
-            The first byte stores the number of additional bytes. Here we store
-            the result of 0x08 - value_len, rather than directly store
-            value_len. The reason is to implement natural sort order for
-            byte-by-byte comparison.
-            """
-            buf[b1] = (0x08 - value_len) & 0xFF
-        elif value > 120:
-            """
-            If the value > 120, then first adjust the value by subtracting 121.
-            Then the adjusted value is stored as an unsigned big endian integer.
-            """
-            value -= 121
-
-            """
-            Store the adjusted value as an unsigned big endian integer. For a
-            positive integer, from left to right, the first significant byte is
-            the byte which is not equal to 0x00.
-
-            In the left to right order, if the first byte of the adjusted value
-            is a significant byte, it will be stored in the 2nd byte of the buf.
-            Then we will look at the 2nd byte of the adjusted value to see if
-            this byte is the significant byte, if yes, this byte will be stored
-            in the 3rd byte of the buf, and the like.
-            """
-            if value & 0xFF000000 != 0:
-                buf[offset] = value >> 24 & 0xFF
-                offset += 1
-            if value & 0xFFFF0000 != 0:
-                buf[offset] = value >> 16 & 0xFF
-                offset += 1
-            if value & 0xFFFFFF00 != 0:
-                buf[offset] = value >> 8 & 0xFF
-                offset += 1
-            buf[offset] = value & 0xFF
-            offset += 1
-
-            """
-            value_len is the length of the value part stored in buf. Because the
-            first byte of buf is used to stored the length, we need to subtract
-            one.
-            """
-            value_len = offset - b1 - 1
-
-            """
-            The first byte stores the number of additional bytes. Here we store
-            the result of 0xF7 + value_len, rather than directly store
-            value_len. The reason is to implement natural sort order for
-            byte-by-byte comparison.
-            """
-            buf[b1] = (0xF7 + value_len) & 0xFF
-        else:
-            """
-            If -119 <= value <= 120, only one byte is needed to store the value.
-            The stored value is the original value plus 127.
-            """
-            buf[b1] = (value + 127) & 0xFF
-        return offset
+        if _CACHE_MIN <= value < _CACHE_MAX:
+            encoding = _INT_ENCODINGS[value - _CACHE_MIN]
+            end = offset + len(encoding)
+            buf[offset:end] = encoding
+            return end
+        return _write_sorted(buf, offset, value, 4)
 
     @staticmethod
     def write_sorted_long(buf, offset, value):
@@ -576,135 +749,13 @@ class PackedInteger:
         :param offset: the offset in the buffer at which to start writing.
         :param value: the long integer to be written.
         :returns: the offset past the bytes written.
-
-        Values in the inclusive range [-119,120] are stored in a single byte.
-        For values outside that range, the first byte stores the number of
-        additional bytes. The additional bytes store (value + 119 for negative
-        and value - 121 for positive) as an unsigned big endian integer.
         """
-        b1 = offset
-        offset += 1
-        if value < -119:
-            """
-            If the value < -119, then first adjust the value by adding 119. Then
-            the adjusted value is stored as an unsigned big endian integer.
-            """
-            value += 119
-
-            """
-            Store the adjusted value as an unsigned big endian integer. For an
-            negative integer, from left to right, the first significant byte is
-            the byte which is not equal to 0xFF. Also please note that, because
-            the adjusted value is stored in big endian integer, we extract the
-            significant byte from left to right.
-
-            In the left to right order, if the first byte of the adjusted value
-            is a significant byte, it will be stored in the 2nd byte of the buf.
-            Then we will look at the 2nd byte of the adjusted value to see if
-            this byte is the significant byte, if yes, this byte will be stored
-            in the 3rd byte of the buf, and the like.
-            """
-            if value | 0x00FFFFFFFFFFFFFF != 0xFFFFFFFFFFFFFFFF:
-                buf[offset] = value >> 56 & 0xFF
-                offset += 1
-            if value | 0x0000FFFFFFFFFFFF != 0xFFFFFFFFFFFFFFFF:
-                buf[offset] = value >> 48 & 0xFF
-                offset += 1
-            if value | 0x000000FFFFFFFFFF != 0xFFFFFFFFFFFFFFFF:
-                buf[offset] = value >> 40 & 0xFF
-                offset += 1
-            if value | 0x00000000FFFFFFFF != 0xFFFFFFFFFFFFFFFF:
-                buf[offset] = value >> 32 & 0xFF
-                offset += 1
-            if value | 0x0000000000FFFFFF != 0xFFFFFFFFFFFFFFFF:
-                buf[offset] = value >> 24 & 0xFF
-                offset += 1
-            if value | 0x000000000000FFFF != 0xFFFFFFFFFFFFFFFF:
-                buf[offset] = value >> 16 & 0xFF
-                offset += 1
-            if value | 0x00000000000000FF != 0xFFFFFFFFFFFFFFFF:
-                buf[offset] = value >> 8 & 0xFF
-                offset += 1
-            buf[offset] = value & 0xFF
-            offset += 1
-
-            """
-            value_len is the length of the value part stored in buf. Because the
-            first byte of buf is used to stored the length, so we need to minus
-            one.
-            """
-            value_len = offset - b1 - 1
-
-            """
-            The first byte stores the number of additional bytes. Here we store
-            the result of 0x08 - value_len, rather than directly store
-            value_len. The reason is to implement nature sort order for
-            byte-by-byte comparison.
-            """
-            buf[b1] = (0x08 - value_len) & 0xFF
-        elif value > 120:
-            """
-            If the value > 120, then first adjust the value by subtracting 119.
-            Then the adjusted value is stored as an unsigned big endian integer.
-            """
-            value -= 121
-
-            """
-            Store the adjusted value as an unsigned big endian integer. For a
-            positive integer, from left to right, the first significant byte is
-            the byte which is not equal to 0x00.
-
-            In the left to right order, if the first byte of the adjusted value
-            is a significant byte, it will be stored in the 2nd byte of the buf.
-            Then we will look at the 2nd byte of the adjusted value to see if
-            this byte is the significant byte, if yes, this byte will be stored
-            in the 3rd byte of the buf, and the like.
-            """
-            if value & 0xFF00000000000000 != 0:
-                buf[offset] = value >> 56 & 0xFF
-                offset += 1
-            if value & 0xFFFF000000000000 != 0:
-                buf[offset] = value >> 48 & 0xFF
-                offset += 1
-            if value & 0xFFFFFF0000000000 != 0:
-                buf[offset] = value >> 40 & 0xFF
-                offset += 1
-            if value & 0xFFFFFFFF00000000 != 0:
-                buf[offset] = value >> 32 & 0xFF
-                offset += 1
-            if value & 0xFFFFFFFFFF000000 != 0:
-                buf[offset] = value >> 24 & 0xFF
-                offset += 1
-            if value & 0xFFFFFFFFFFFF0000 != 0:
-                buf[offset] = value >> 16 & 0xFF
-                offset += 1
-            if value & 0xFFFFFFFFFFFFFF00 != 0:
-                buf[offset] = value >> 8 & 0xFF
-                offset += 1
-            buf[offset] = value & 0xFF
-            offset += 1
-
-            """
-            value_en is the length of the value part stored in buf. Because the
-            first byte of buf is used to stored the length, so we need to minus
-            one.
-            """
-            value_len = offset - b1 - 1
-
-            """
-            The first byte stores the number of additional bytes. Here we store
-            the result of 0xF7 + value_len, rather than directly store
-            value_len. The reason is to implement nature sort order for
-            byte-by-byte comparison.
-            """
-            buf[b1] = (0xF7 + value_len) & 0xFF
-        else:
-            """
-            If -119 <= value <= 120, only one byte is needed to store the value.
-            The stored value is the original value adds 127.
-            """
-            buf[b1] = (value + 127) & 0xFF
-        return offset
+        if _CACHE_MIN <= value < _CACHE_MAX:
+            encoding = _LONG_ENCODINGS[value - _CACHE_MIN]
+            end = offset + len(encoding)
+            buf[offset:end] = encoding
+            return end
+        return _write_sorted(buf, offset, value, 8)
 
     @staticmethod
     def get_read_sorted_int_length(buf, offset):
@@ -720,13 +771,7 @@ class PackedInteger:
         :param offset: the offset in the buffer at which to start reading.
         :returns: the number of bytes that would be read.
         """
-        # The first byte of the buf stores the length of the value part.
-        b1 = buf[offset] & 0xff
-        if b1 < 0x08:
-            return 1 + 0x08 - b1
-        if b1 > 0xf7:
-            return 1 + b1 - 0xf7
-        return 1
+        return _READ_LENGTHS[buf[offset]]
 
     @staticmethod
     def get_read_sorted_long_length(buf, offset):
@@ -743,7 +788,7 @@ class PackedInteger:
         :returns: the number of bytes that would be read.
         """
         # The length is stored in the same way for int and long.
-        return PackedInteger.get_read_sorted_int_length(buf, offset)
+        return _READ_LENGTHS[buf[offset]]
 
     @staticmethod
     def read_sorted_int(buf, offset):
@@ -754,49 +799,17 @@ class PackedInteger:
         :param offset: the offset in the buffer at which to start reading.
         :returns: the integer that was read.
         """
-        # The first byte of the buf stores the length of the value part.
-        b1 = buf[offset] & 0xff
-        offset += 1
-        # Adjust the byte_len to the real length of the value part.
-        if b1 < 0x08:
-            byte_len = 0x08 - b1
-            negative = True
-        elif b1 > 0xf7:
-            byte_len = b1 - 0xf7
-            negative = False
-        else:
+        b1 = buf[offset]
+        length = _READ_LENGTHS[b1] - 1
+        if length == 0:
             return b1 - 127
-
-        """
-        The following bytes on the buf store the value as a big endian integer.
-        We extract the significant bytes from the buf and put them into the
-        value in big endian order.
-        """
-        if negative:
-            value = 0xFFFFFFFF
-        else:
-            value = 0
-        if byte_len > 3:
-            value = (value << 8) | (buf[offset] & 0xFF)
-            offset += 1
-        if byte_len > 2:
-            value = (value << 8) | (buf[offset] & 0xFF)
-            offset += 1
-        if byte_len > 1:
-            value = (value << 8) | (buf[offset] & 0xFF)
-            offset += 1
-        value = (value << 8) | (buf[offset] & 0xFF)
         offset += 1
-
-        """
-        After get the adjusted value, we have to adjust it back to the original
-        value.
-        """
-        if negative:
-            value -= 119
-        else:
-            value += 121
-        return value
+        value = _int_from_bytes(buf[offset:offset + length], 'big')
+        if b1 < 0x08:
+            # Only the significant bytes of a negative value are stored, so
+            # sign-extend it before adjusting it back.
+            return value - (1 << (length << 3)) - 119
+        return value + 121
 
     @staticmethod
     def read_sorted_long(buf, offset):
@@ -808,68 +821,18 @@ class PackedInteger:
         :param offset: the offset in the buffer at which to start reading.
         :returns: the long integer that was read.
         """
-        # The first byte of the buf stores the length of the value part.
-        b1 = buf[offset] & 0xff
-        offset += 1
-        # Adjust the byte_len to the real length of the value part.
-        if b1 < 0x08:
-            byte_len = 0x08 - b1
-            negative = True
-        elif b1 > 0xf7:
-            byte_len = b1 - 0xf7
-            negative = False
-        else:
-            try:
-                return long(b1 - 127)
-            except NameError:
-                return b1 - 127
-
-        """
-        The following bytes on the buf store the value as a big endian integer.
-        We extract the significant bytes from the buf and put them into the
-        value in big endian order.
-        """
-        if negative:
-            value = 0xFFFFFFFFFFFFFFFF
-        else:
-            value = 0
-        if byte_len > 7:
-            value = (value << 8) | (buf[offset] & 0xFF)
-            offset += 1
-        if byte_len > 6:
-            value = (value << 8) | (buf[offset] & 0xFF)
-            offset += 1
-        if byte_len > 5:
-            value = (value << 8) | (buf[offset] & 0xFF)
-            offset += 1
-        if byte_len > 4:
-            value = (value << 8) | (buf[offset] & 0xFF)
-            offset += 1
-        if byte_len > 3:
-            value = (value << 8) | (buf[offset] & 0xFF)
-            offset += 1
-        if byte_len > 2:
-            value = (value << 8) | (buf[offset] & 0xFF)
-            offset += 1
-        if byte_len > 1:
-            value = (value << 8) | (buf[offset] & 0xFF)
-            offset += 1
-        value = (value << 8) | (buf[offset] & 0xFF)
-        offset += 1
-        """
-        After obtaining the adjusted value, we have to adjust it back to the
-        original value.
-        """
-        if negative:
-            value -= 119
-        else:
-            value += 121
+        # The value is stored in the same way for int and long.
+        value = PackedInteger.read_sorted_int(buf, offset)
         try:
             return long(value)
         except NameError:
             return value
 
 
+_INT_ENCODINGS = _encodings(4)
+_LONG_ENCODINGS = _encodings(8)
+
+
 class PreparedStatement:
     """
     A class encapsulating a prepared query statement. It includes state that can
@@ -887,7 +850,7 @@ class PreparedStatement:
     :py:meth:`copy_statement`.
     """
 
-    def __init__(self, statement):
+    def __init__(self, statement, sql_text=None):
         """
         Constructs a PreparedStatement. Construction is hidden to eliminate
         application access to the underlying statement, reducing the chance of
@@ -898,6 +861,7 @@ class PreparedStatement:
             raise IllegalArgumentException(
                 'Invalid prepared query, cannot be None.')
         self.__statement = statement
+        self.__sql_text = sql_text
         self.__variables = dict()
 
     def copy_statement(self):
@@ -909,7 +873,11 @@ class PreparedStatement:
             Bind variables are uninitialized.
         :rtype: PreparedStatement
         """
-        return PreparedStatement(self.__statement)
+        return PreparedStatement(self.__statement, self.__sql_text)
+
+    def get_sql_text(self):
+        # internal use to return the text of the query prepared, or None
+        return self.__sql_text
 
     def get_statement(self):
         # internal use to return the serialized, prepared query, opaque
@@ -9,8 +9,10 @@
 
 from abc import ABCMeta, abstractmethod
 from copy import deepcopy
-from random import random
-from time import sleep
+from math import exp
+from random import random, uniform
+from threading import Lock
+from time import sleep, time
 
 from .common import CheckValue, Consistency
 from .exception import (
@@ -108,17 +110,83 @@ class RetryHandler(object):
         """
         pass
 
+    def get_delay(self, num_retried, re):
+        """
+        Returns the time of delay that :py:meth:`delay` waits for, in seconds,
+        which may be fractional. When it's known, the handles wait for it
+        themselves rather than calling :py:meth:`delay`, and a request isn't
+        retried if the delay would take it past its timeout.
+        :py:class:`AsyncNoSQLHandle` also waits without blocking the thread.
+        The default returns None, in which case :py:meth:`delay` is called, in
+        a separate thread by :py:class:`AsyncNoSQLHandle`. It's also called
+        rather than this method by the handles when a subclass overrides
+        :py:meth:`delay` but not this method, such as a subclass of
+        :py:class:`DefaultRetryHandler` that only overrides :py:meth:`delay`.
+
+        :param num_retried: the number of retries that have occurred for the
+            operation.
+        :param re: the exception that was thrown.
+        :returns: the time of delay in seconds, or None if it isn't known.
+        """
+        return None
+
+    def on_request(self, request):
+        """
+        This method is called once for each request executed by a handle
+        configured with this handler, before it is first sent, so that the
+        handler can account for the requests whose retries it allows, as
+        :py:class:`PolicyRetryHandler` does with a :py:class:`RetryBudget`. The
+        default does nothing.
+
+        :param request: the request executed.
+        """
+        pass
+
+    def on_retry_dropped(self, request, num_retried, re):
+        """
+        This method is called when a retry allowed by :py:meth:`do_retry`
+        isn't done because its delay would take the request past its timeout,
+        so that the handler can give back what it took for the retry, as
+        :py:class:`PolicyRetryHandler` does with a :py:class:`RetryBudget`.
+        The default does nothing.
+
+        :param request: the request that has triggered the exception.
+        :param num_retried: the number of retries that have occurred for the
+            operation, including the retry dropped.
+        :param re: the exception that was thrown.
+        """
+        pass
+
+    def _get_delay_internal(self, num_retried, re):
+        # Returns the delay of get_delay, or None if delay is overridden by a
+        # subclass of the class that defines get_delay, so that delay is
+        # called rather than skipped.
+        for cls in type(self).__mro__:
+            if 'get_delay' in vars(cls):
+                return self.get_delay(num_retried, re)
+            if 'delay' in vars(cls):
+                return None
+        return None
+
 
 class DefaultRetryHandler(RetryHandler):
     """
-    A default instance of :py:class:`RetryHandler`
+    A default instance of :py:class:`RetryHandler`. It delays retries by
+    delay_s, which may be fractional, or if delay_s is 0 by an exponential
+    backoff of 1, 2, 4... seconds with a random jitter of up to a second. The
+    delays are never rounded to whole seconds, and a retry that would be past
+    the timeout of its request isn't done.
     """
     # Base time of delay between retries for security info unavailable.
     _SEC_ERROR_DELAY_MS = 100
 
     def __init__(self, num_retries=10, delay_s=1):
         CheckValue.check_int_ge_zero(num_retries, 'num_retries')
-        CheckValue.check_int_ge_zero(delay_s, 'delay_s')
+        if (not (CheckValue.is_int(delay_s) or isinstance(delay_s, float)) or
+                isinstance(delay_s, bool) or delay_s < 0):
+            raise IllegalArgumentException(
+                'delay_s must be a number that is not negative. Got:' +
+                str(delay_s))
         self.__num_retries = num_retries
         self.__delay_s = delay_s
 
@@ -139,14 +207,16 @@ class DefaultRetryHandler(RetryHandler):
         return num_retried < self.__num_retries
 
     def delay(self, num_retried, re):
+        sleep(self.get_delay(num_retried, re))
+
+    def get_delay(self, num_retried, re):
         CheckValue.check_int_gt_zero(num_retried, 'num_retried')
         self.__check_retryable_exception(re)
-        sec = self.__delay_s
-        if sec == 0:
-            sec = self.__compute_backoff_delay(num_retried, 1000)
         if isinstance(re, SecurityInfoNotReadyException):
-            sec = self.__sec_info_not_ready_delay(num_retried)
-        sleep(sec)
+            return self.__sec_info_not_ready_delay(num_retried) / 1000.0
+        if self.__delay_s == 0:
+            return self.__compute_backoff_delay(num_retried, 1000) / 1000.0
+        return self.__delay_s
 
     def __check_request(self, request):
         if not isinstance(request, operations.Request):
@@ -160,26 +230,279 @@ class DefaultRetryHandler(RetryHandler):
 
     def __compute_backoff_delay(self, num_retried, base_delay):
         """
-        Use an exponential backoff algorithm to compute time of delay.
+        Use an exponential backoff algorithm to compute time of delay, in
+        milliseconds.
 
         Assumption: numRetries starts with 1
-        sec = (2^(num_retried-1) + random MS (0-1000)) / 1000
+        msec = 2^(num_retried-1) * base_delay + random (0-base_delay)
         """
         msec = (1 << (num_retried - 1)) * base_delay
         msec += (random() * base_delay)
-        return msec // 1000
+        return msec
 
     def __sec_info_not_ready_delay(self, num_retried):
         """
         Handle security information not ready retries. If number of retries is
         smaller than 10, delay for DefaultRetryHandler._SEC_ERROR_DELAY_MS.
-        Otherwise, use the backoff algorithm to compute the time of delay.
+        Otherwise, use the backoff algorithm to compute the time of delay, in
+        milliseconds.
         """
         msec = DefaultRetryHandler._SEC_ERROR_DELAY_MS
         if num_retried > 10:
             msec = self.__compute_backoff_delay(
                 num_retried - 10, DefaultRetryHandler._SEC_ERROR_DELAY_MS)
-        return msec // 1000
+        return msec
+
+
+class DecorrelatedJitterRetryHandler(DefaultRetryHandler):
+    """
+    A :py:class:`RetryHandler` that retries like :py:class:`DefaultRetryHandler`
+    but delays retries with decorrelated jitter: the delay of each retry is
+    random, between base_delay_s and 3 times the delay of the previous retry,
+    and at most max_delay_s. The delays grow about exponentially but the
+    retries of the requests that failed at the same time are spread rather
+    than synchronized.
+
+    The handler is immutable, so the delay of each retry is drawn as the last
+    of a sequence of num_retried delays rather than from the delay of the
+    previous retry, which has the same distribution.
+
+    :param num_retries: the number of retries to perform automatically.
+    :param base_delay_s: the minimum delay, in seconds.
+    :param max_delay_s: the maximum delay, in seconds.
+    :raises IllegalArgumentException: raises the exception if num_retries is a
+        negative number, if base_delay_s is not a positive number or if
+        max_delay_s is less than base_delay_s.
+    """
+
+    def __init__(self, num_retries=10, base_delay_s=0.1, max_delay_s=10):
+        super(DecorrelatedJitterRetryHandler, self).__init__(num_retries, 0)
+        for value, name in ((base_delay_s, 'base_delay_s'),
+                            (max_delay_s, 'max_delay_s')):
+            if (not (CheckValue.is_int(value) or isinstance(value, float)) or
+                    isinstance(value, bool) or value <= 0):
+                raise IllegalArgumentException(
+                    name + ' must be a positive number. Got:' + str(value))
+        if max_delay_s < base_delay_s:
+            raise IllegalArgumentException(
+                'max_delay_s must not be less than base_delay_s.')
+        self.__base_delay_s = base_delay_s
+        self.__max_delay_s = max_delay_s
+
+    def get_delay(self, num_retried, re):
+        if isinstance(re, SecurityInfoNotReadyException):
+            return super(DecorrelatedJitterRetryHandler, self).get_delay(
+                num_retried, re)
+        CheckValue.check_int_gt_zero(num_retried, 'num_retried')
+        if not isinstance(re, RetryableException):
+            raise IllegalArgumentException(
+                're must be an instance of RetryableException.')
+        delay = self.__base_delay_s
+        for retry in range(num_retried):
+            delay = min(self.__max_delay_s,
+                        uniform(self.__base_delay_s, delay * 3))
+        return delay
+
+
+class PolicyRetryHandler(RetryHandler):
+    """
+    A :py:class:`RetryHandler` that delegates to a handler chosen by the class
+    of each exception, and that limits the retries of all the requests to a
+    :py:class:`RetryBudget`.
+
+    The handler of an exception is the one of policies for its class, or for
+    the closest of its base classes, or default_handler. For instance, a
+    policy for :py:class:`ThrottlingException` retries the throttled requests
+    with longer delays than the other exceptions. A retry allowed by its
+    handler is only done if budget, when not None, has a retry left, and it's
+    given back to the budget if it isn't done because its delay would take its
+    request past its timeout. The retries of
+    :py:class:`SecurityInfoNotReadyException` don't use the budget.
+
+    :param default_handler: the handler of the exceptions without a policy,
+        or None for a :py:class:`DefaultRetryHandler`.
+    :param policies: the handlers of exceptions by their classes, or None.
+    :type policies: dict
+    :param budget: the budget of retries, or None for no budget.
+    :type budget: RetryBudget
+    :raises IllegalArgumentException: raises the exception if default_handler
+        or a value of policies is not an instance of :py:class:`RetryHandler`,
+        if a key of policies is not a subclass of
+        :py:class:`RetryableException` or if budget is not an instance of
+        :py:class:`RetryBudget`.
+    """
+
+    def __init__(self, default_handler=None, policies=None, budget=None):
+        if default_handler is None:
+            default_handler = DefaultRetryHandler()
+        if not isinstance(default_handler, RetryHandler):
+            raise IllegalArgumentException(
+                'default_handler must be an instance of RetryHandler.')
+        CheckValue.check_dict(policies, 'policies')
+        policies = dict() if policies is None else dict(policies)
+        for exception_class, handler in policies.items():
+            if not (isinstance(exception_class, type) and
+                    issubclass(exception_class, RetryableException)):
+                raise IllegalArgumentException(
+                    'The keys of policies must be subclasses of ' +
+                    'RetryableException.')
+            if not isinstance(handler, RetryHandler):
+                raise IllegalArgumentException(
+                    'The values of policies must be instances of ' +
+                    'RetryHandler.')
+        if budget is not None and not isinstance(budget, RetryBudget):
+            raise IllegalArgumentException(
+                'budget must be an instance of RetryBudget.')
+        self.__default_handler = default_handler
+        self.__policies = policies
+        self.__budget = budget
+
+    def get_num_retries(self):
+        return self.__default_handler.get_num_retries()
+
+    def do_retry(self, request, num_retried, re):
+        if not self.__get_handler(re).do_retry(request, num_retried, re):
+            return False
+        return (self.__budget is None or
+                isinstance(re, SecurityInfoNotReadyException) or
+                self.__budget.try_retry())
+
+    def delay(self, num_retried, re):
+        self.__get_handler(re).delay(num_retried, re)
+
+    def get_delay(self, num_retried, re):
+        # None if the handler overrides delay, which is then called.
+        return self.__get_handler(re)._get_delay_internal(num_retried, re)
+
+    def on_request(self, request):
+        if self.__budget is not None:
+            self.__budget.on_request()
+
+    def on_retry_dropped(self, request, num_retried, re):
+        self.__get_handler(re).on_retry_dropped(request, num_retried, re)
+        if (self.__budget is not None and
+                not isinstance(re, SecurityInfoNotReadyException)):
+            self.__budget.refund()
+
+    def __get_handler(self, re):
+        # Returns the handler of the class of re or of its closest base class.
+        for exception_class in type(re).__mro__:
+            handler = self.__policies.get(exception_class)
+            if handler is not None:
+                return handler
+        return self.__default_handler
+
+
+class RetryBudget(object):
+    """
+    A budget of retries shared by the requests of the handles configured with
+    :py:class:`PolicyRetryHandler` instances using it, that caps the retries to
+    a percentage of the requests, so that retries don't multiply the load of a
+    service that is overloaded. Configure all the handles of a process with the
+    same budget for a process-wide budget, it is not copied by
+    :py:meth:`NoSQLHandleConfig.clone`.
+
+    Each request adds percentage / 100 retries to the budget and each retry
+    takes one. The retries added decay exponentially, so that they count the
+    requests of about the last window_s seconds. In addition,
+    min_retries_per_second retries are allowed whatever the traffic, so that
+    the few requests of a quiet handle can be retried.
+
+    :param percentage: the percentage of the requests that can be retried.
+    :param min_retries_per_second: the retries allowed each second whatever
+        the number of requests.
+    :param window_s: the time the requests count in the budget, in seconds.
+    :raises IllegalArgumentException: raises the exception if percentage,
+        min_retries_per_second or window_s is not a positive number.
+    """
+
+    def __init__(self, percentage=10, min_retries_per_second=10, window_s=10):
+        for value, name in ((percentage, 'percentage'),
+                            (min_retries_per_second, 'min_retries_per_second'),
+                            (window_s, 'window_s')):
+            if (not (CheckValue.is_int(value) or isinstance(value, float)) or
+                    isinstance(value, bool) or value <= 0):
+                raise IllegalArgumentException(
+                    name + ' must be a positive number. Got:' + str(value))
+        self.__ratio = percentage / 100.0
+        self.__min_retries_per_second = float(min_retries_per_second)
+        self.__window_s = float(window_s)
+        # The retries added by the requests, and those allowed whatever the
+        # traffic, at most a second's worth.
+        self.__balance = 0.0
+        self.__reserve = self.__min_retries_per_second
+        self.__last = time()
+        self.__requests = 0
+        self.__retries = 0
+        self.__rejected = 0
+        self.__lock = Lock()
+
+    def __deepcopy__(self, memo):
+        # The budget is shared by the copies of the configurations.
+        return self
+
+    def get_stats(self):
+        """
+        Returns the statistics of the budget.
+
+        :returns: the number of requests as 'requests', the number of retries
+            allowed as 'retries' and the number of retries rejected as
+            'rejected'.
+        :rtype: dict
+        """
+        with self.__lock:
+            return {'requests': self.__requests, 'retries': self.__retries,
+                    'rejected': self.__rejected}
+
+    def on_request(self):
+        """
+        Adds a request to the budget.
+        """
+        with self.__lock:
+            self.__refill()
+            self.__requests += 1
+            self.__balance += self.__ratio
+
+    def refund(self):
+        """
+        Gives back a retry taken by :py:meth:`try_retry` that isn't done, such
+        as a retry whose delay would take its request past its timeout. It's
+        no longer counted in the retries of :py:meth:`get_stats`.
+        """
+        with self.__lock:
+            self.__refill()
+            self.__balance += 1
+            self.__retries -= 1
+
+    def try_retry(self):
+        """
+        Takes a retry from the budget.
+
+        :returns: True if the retry is allowed, False if there is no retry
+            left.
+        """
+        with self.__lock:
+            self.__refill()
+            if self.__balance >= 1:
+                self.__balance -= 1
+            elif self.__reserve >= 1:
+                self.__reserve -= 1
+            else:
+                self.__rejected += 1
+                return False
+            self.__retries += 1
+            return True
+
+    def __refill(self):
+        # Decays the balance and refills the reserve for the time elapsed,
+        # called with the lock.
+        now = time()
+        elapsed = now - self.__last
+        self.__last = now
+        self.__balance *= exp(-elapsed / self.__window_s)
+        self.__reserve = min(
+            self.__min_retries_per_second,
+            self.__reserve + elapsed * self.__min_retries_per_second)
 
 
 class NoSQLHandleConfig:
@@ -239,6 +562,17 @@ class NoSQLHandleConfig:
         self.__consistency = None
         self.__pool_connections = 2
         self.__pool_maxsize = 10
+        self.__statement_cache_size = 0
+        self.__auto_prepare = False
+        self.__row_caches = dict()
+        self.__negative_cache = None
+        self.__metadata_cache_ttl = 0
+        self.__coalesce_reads = False
+        self.__coalesce_queries = False
+        self.__rate_limiting = False
+        self.__rate_limiting_percentage = 100.0
+        self.__adaptive_concurrency = False
+        self.__concurrency_queue_timeout = 0
         self.__max_content_length = 1024 * 1024
         self.__retry_handler = None
         self.__auth_provider = None
@@ -465,6 +799,391 @@ class NoSQLHandleConfig:
         """
         return self.__pool_maxsize
 
+    def set_statement_cache_size(self, statement_cache_size):
+        """
+        Sets the maximum number of prepared query statements cached by the
+        handle, by the text of their statements. :py:meth:`NoSQLHandle.prepare`
+        returns a copy of the cached statement of a query that has already
+        been prepared, without a request to the service. The least recently
+        used statements are evicted when the cache is full, and all of them
+        when a DDL statement is executed with
+        :py:meth:`NoSQLHandle.table_request`. The default value is 0, for no
+        cache.
+
+        :param statement_cache_size: the number of statements cached.
+        :returns: self.
+        :raises IllegalArgumentException: raises the exception if
+            statement_cache_size is a negative number.
+        """
+        CheckValue.check_int_ge_zero(statement_cache_size,
+                                     'statement_cache_size')
+        self.__statement_cache_size = statement_cache_size
+        return self
+
+    def get_statement_cache_size(self):
+        """
+        Returns the maximum number of prepared query statements cached by the
+        handle.
+
+        :returns: the number of statements cached, 0 for no cache.
+        """
+        return self.__statement_cache_size
+
+    def set_auto_prepare(self, auto_prepare):
+        """
+        Sets whether the queries that are not prepared are prepared by
+        :py:meth:`NoSQLHandle.query` before they are executed, using the
+        statements cached by the handle, so that a query string that is
+        executed repeatedly is compiled by the service only once. The request
+        of the query is not modified. It has no effect if the statement cache
+        size is 0. The default value is False.
+
+        :param auto_prepare: True to prepare queries.
+        :returns: self.
+        :raises IllegalArgumentException: raises the exception if auto_prepare
+            is not a boolean.
+        """
+        CheckValue.check_boolean(auto_prepare, 'auto_prepare')
+        self.__auto_prepare = auto_prepare
+        return self
+
+    def get_auto_prepare(self):
+        """
+        Returns whether the queries that are not prepared are prepared by the
+        handle.
+
+        :returns: True if queries are prepared.
+        """
+        return self.__auto_prepare
+
+    def set_row_cache(self, table_name, max_rows, max_staleness_ms):
+        """
+        Sets a cache of the rows of a table read by :py:meth:`NoSQLHandle.get`,
+        so that a row read again is returned by the handle without a request
+        to the service. It suits rows that are read far more often than they
+        are written.
+
+        The rows are cached by the values of the fields of the key of their
+        get. A row is evicted once it's been cached for max_staleness_ms or
+        expires, and the least recently used rows are evicted when max_rows are
+        cached. The rows written or deleted with the handle are evicted, and
+        all the rows of the table are evicted when a query executed with the
+        handle writes rows of it, but not those written by other handles, which
+        can be stale by up to max_staleness_ms. The gets with ABSOLUTE
+        consistency, lazy values or raw values are not cached.
+
+        The hits and misses of the cache are returned by
+        :py:meth:`NoSQLHandle.get_row_cache_stats`.
+
+        :param table_name: the name of the table.
+        :type table_name: str
+        :param max_rows: the maximum number of rows cached, or 0 to remove the
+            cache of the table.
+        :type max_rows: int
+        :param max_staleness_ms: the maximum time a row is cached, in
+            milliseconds.
+        :type max_staleness_ms: int
+        :returns: self.
+        :raises IllegalArgumentException: raises the exception if table_name is
+            not a string, if max_rows is a negative number or if
+            max_staleness_ms is not a positive number.
+        """
+        CheckValue.check_str(table_name, 'table_name')
+        CheckValue.check_int_ge_zero(max_rows, 'max_rows')
+        CheckValue.check_int_gt_zero(max_staleness_ms, 'max_staleness_ms')
+        if max_rows == 0:
+            self.__row_caches.pop(table_name.lower(), None)
+        else:
+            self.__row_caches[table_name.lower()] = (max_rows,
+                                                     max_staleness_ms)
+        return self
+
+    def get_row_caches(self):
+        """
+        Returns the caches of the rows of the tables.
+
+        :returns: the maximum number of rows and the maximum staleness in
+            milliseconds of each cache, by the lowercase names of the tables.
+        :rtype: dict
+        """
+        return dict(self.__row_caches)
+
+    def set_negative_cache(self, max_keys, ttl_ms):
+        """
+        Sets a cache of the keys of the rows that :py:meth:`NoSQLHandle.get`
+        finds don't exist, so that a get of a key cached returns a result
+        without a row without a request to the service. It suits gets that
+        check whether rows exist when most of them don't.
+
+        The keys are cached by the name of the table and the values of the
+        fields of the key of their get. A key is evicted once it's been cached
+        for ttl_ms, and the least recently used keys are evicted when max_keys
+        are cached. The keys of the rows written with the handle are evicted,
+        and all the keys are evicted when a query executed with the handle
+        writes rows, but not those of rows written by other handles, which may
+        not be found for up to ttl_ms. The gets with ABSOLUTE consistency are
+        not cached.
+
+        The hits and misses of the cache are returned by
+        :py:meth:`NoSQLHandle.get_negative_cache_stats`.
+
+        :param max_keys: the maximum number of keys cached, or 0 for no cache.
+        :type max_keys: int
+        :param ttl_ms: the maximum time a key is cached, in milliseconds.
+        :type ttl_ms: int
+        :returns: self.
+        :raises IllegalArgumentException: raises the exception if max_keys is a
+            negative number or if ttl_ms is not a positive number.
+        """
+        CheckValue.check_int_ge_zero(max_keys, 'max_keys')
+        CheckValue.check_int_gt_zero(ttl_ms, 'ttl_ms')
+        self.__negative_cache = None if max_keys == 0 else (max_keys, ttl_ms)
+        return self
+
+    def get_negative_cache(self):
+        """
+        Returns the cache of the keys of the rows that don't exist.
+
+        :returns: the maximum number of keys and the time they are cached in
+            milliseconds, or None if there is no cache.
+        :rtype: tuple
+        """
+        return self.__negative_cache
+
+    def set_metadata_cache_ttl(self, metadata_cache_ttl):
+        """
+        Sets the time the results of :py:meth:`NoSQLHandle.get_table`,
+        :py:meth:`NoSQLHandle.get_indexes` and
+        :py:meth:`NoSQLHandle.list_tables` are cached by the handle, so that
+        the same request made again returns the cached result without a request
+        to the service. The concurrent requests made while a result is got
+        share the request of the first one, whether or not the result is
+        cached.
+
+        The results of get_table are only cached for tables that are ACTIVE and
+        requests without an operation id. All the results are evicted when a
+        :py:class:`TableRequest` is executed with the handle, but not when
+        tables are changed by other handles. The default value is 0, for no
+        cache.
+
+        :param metadata_cache_ttl: the time results are cached, in
+            milliseconds.
+        :returns: self.
+        :raises IllegalArgumentException: raises the exception if
+            metadata_cache_ttl is a negative number.
+        """
+        CheckValue.check_int_ge_zero(metadata_cache_ttl, 'metadata_cache_ttl')
+        self.__metadata_cache_ttl = metadata_cache_ttl
+        return self
+
+    def get_metadata_cache_ttl(self):
+        """
+        Returns the time the metadata of the tables are cached by the handle.
+
+        :returns: the time results are cached in milliseconds, 0 for no cache.
+        """
+        return self.__metadata_cache_ttl
+
+    def set_coalesce_reads(self, coalesce_reads):
+        """
+        Sets whether identical gets are coalesced. A get made while the same
+        get is running, with the same table, key, consistency and timeout, then
+        waits for the response of the running one rather than making another
+        request to the service, so that many threads reading a key at the same
+        time make a single request. The result of the get that waits is a copy
+        of the result, without consumed throughput. Gets with lazy values are
+        not coalesced. The default value is False.
+
+        :param coalesce_reads: True to coalesce gets.
+        :returns: self.
+        :raises IllegalArgumentException: raises the exception if
+            coalesce_reads is not a boolean.
+        """
+        CheckValue.check_boolean(coalesce_reads, 'coalesce_reads')
+        self.__coalesce_reads = coalesce_reads
+        return self
+
+    def get_coalesce_reads(self):
+        """
+        Returns whether identical gets are coalesced.
+
+        :returns: True if gets are coalesced.
+        """
+        return self.__coalesce_reads
+
+    def set_coalesce_queries(self, coalesce_queries):
+        """
+        Sets whether identical pages of queries are coalesced, like the gets of
+        :py:meth:`set_coalesce_reads`. A page is identical if its query, bind
+        variables, continuation key and all the other parameters of its
+        request are. Queries that stream their results, return columnar
+        results or have lazy values are not coalesced. The default value is
+        False.
+
+        :param coalesce_queries: True to coalesce pages of queries.
+        :returns: self.
+        :raises IllegalArgumentException: raises the exception if
+            coalesce_queries is not a boolean.
+        """
+        CheckValue.check_boolean(coalesce_queries, 'coalesce_queries')
+        self.__coalesce_queries = coalesce_queries
+        return self
+
+    def get_coalesce_queries(self):
+        """
+        Returns whether identical pages of queries are coalesced.
+
+        :returns: True if pages of queries are coalesced.
+        """
+        return self.__coalesce_queries
+
+    def set_rate_limiting_enabled(self, rate_limiting):
+        """
+        Sets whether the handle limits the rate of the reads and writes of each
+        table to the read and write units of the limits of the table, so that
+        its load is smoothed rather than throttled by the service with
+        :py:class:`ReadThrottlingException` and
+        :py:class:`WriteThrottlingException`.
+
+        The limits of a table are got with :py:meth:`NoSQLHandle.get_table` the
+        first time the handle accesses it, and every 10 minutes or after a
+        :py:class:`TableRequest` is executed with the handle. A request waits
+        until the units consumed by the previous requests on its table have
+        been paid back before it is sent, and is charged the units reported in
+        its result, once its results are all read for a streamed query. A
+        request that would have to wait longer than its timeout
+        fails immediately with :py:class:`RequestTimeoutException`.
+
+        The gets, puts, deletes, multiple deletes and writes of
+        :py:meth:`NoSQLHandle.write_multiple` are limited, and the queries are
+        limited by the table named after the first FROM, INTO or UPDATE of
+        their statement that isn't in a string or in parentheses, including
+        the queries of the statements prepared by the handle. Rate limiting is
+        not supported by :py:class:`AsyncNoSQLHandle`, which raises
+        :py:class:`IllegalArgumentException` for a configuration that enables
+        it. The default value is False.
+
+        :param rate_limiting: True to limit the rate of requests.
+        :returns: self.
+        :raises IllegalArgumentException: raises the exception if rate_limiting
+            is not a boolean.
+        """
+        CheckValue.check_boolean(rate_limiting, 'rate_limiting')
+        self.__rate_limiting = rate_limiting
+        return self
+
+    def get_rate_limiting_enabled(self):
+        """
+        Returns whether the handle limits the rate of requests to the limits of
+        the tables.
+
+        :returns: True if the rate of requests is limited.
+        """
+        return self.__rate_limiting
+
+    def set_rate_limiting_percentage(self, rate_limiting_percentage):
+        """
+        Sets the percentage of the read and write units of the limits of each
+        table that the handle allocates to itself when rate limiting is
+        enabled by :py:meth:`set_rate_limiting_enabled`, so that the handles of
+        several processes accessing the same tables can share their limits.
+        The default value is 100.
+
+        :param rate_limiting_percentage: the percentage of the limits, greater
+            than 0 and not greater than 100.
+        :returns: self.
+        :raises IllegalArgumentException: raises the exception if
+            rate_limiting_percentage is not a number greater than 0 and not
+            greater than 100.
+        """
+        if (not (CheckValue.is_int(rate_limiting_percentage) or
+                 isinstance(rate_limiting_percentage, float)) or
+                isinstance(rate_limiting_percentage, bool) or
+                not 0 < rate_limiting_percentage <= 100):
+            raise IllegalArgumentException(
+                'rate_limiting_percentage must be a number greater than 0 ' +
+                'and not greater than 100. Got:' +
+                str(rate_limiting_percentage))
+        self.__rate_limiting_percentage = float(rate_limiting_percentage)
+        return self
+
+    def get_rate_limiting_percentage(self):
+        """
+        Returns the percentage of the limits of the tables allocated to the
+        handle.
+
+        :returns: the percentage.
+        :rtype: float
+        """
+        return self.__rate_limiting_percentage
+
+    def set_adaptive_concurrency_enabled(self, adaptive_concurrency):
+        """
+        Sets whether the number of requests the handle has in flight is limited
+        by an adaptive limit, so that an overloaded service or network isn't
+        sent more requests that would wait on the pool of connections.
+
+        The limit starts at the size of the pool of connections, set by
+        :py:meth:`set_pool_maxsize`, and is never above it. It's increased by 1
+        each time as many requests as the limit are done, and decreased by 10
+        percent each time a request is throttled, fails with a server error or
+        times out, or takes more than twice the average latency of the
+        previous requests. A request made while the limit is reached waits for
+        a request in flight to be done, for at most the time set by
+        :py:meth:`set_concurrency_queue_timeout`, and then fails with
+        :py:class:`ConcurrencyLimitException`.
+
+        The limit and the number of requests in flight and waiting are returned
+        by :py:meth:`NoSQLHandle.get_concurrency_stats`. The adaptive limit is
+        not supported by :py:class:`AsyncNoSQLHandle`, which raises
+        :py:class:`IllegalArgumentException` for a configuration that enables
+        it. The default value is False.
+
+        :param adaptive_concurrency: True to limit the requests in flight.
+        :returns: self.
+        :raises IllegalArgumentException: raises the exception if
+            adaptive_concurrency is not a boolean.
+        """
+        CheckValue.check_boolean(adaptive_concurrency, 'adaptive_concurrency')
+        self.__adaptive_concurrency = adaptive_concurrency
+        return self
+
+    def get_adaptive_concurrency_enabled(self):
+        """
+        Returns whether the requests in flight are limited by an adaptive
+        limit.
+
+        :returns: True if the requests in flight are limited.
+        """
+        return self.__adaptive_concurrency
+
+    def set_concurrency_queue_timeout(self, concurrency_queue_timeout):
+        """
+        Sets the time a request waits for the adaptive concurrency limit of
+        :py:meth:`set_adaptive_concurrency_enabled` to allow it in flight,
+        before it fails with :py:class:`ConcurrencyLimitException`. A request
+        never waits longer than its timeout. The default value is 0, for the
+        timeout of the request.
+
+        :param concurrency_queue_timeout: the time a request waits, in
+            milliseconds.
+        :returns: self.
+        :raises IllegalArgumentException: raises the exception if
+            concurrency_queue_timeout is a negative number.
+        """
+        CheckValue.check_int_ge_zero(concurrency_queue_timeout,
+                                     'concurrency_queue_timeout')
+        self.__concurrency_queue_timeout = concurrency_queue_timeout
+        return self
+
+    def get_concurrency_queue_timeout(self):
+        """
+        Returns the time a request waits for the adaptive concurrency limit.
+
+        :returns: the time in milliseconds, 0 for the timeout of the request.
+        """
+        return self.__concurrency_queue_timeout
+
     def get_max_content_length(self):
         """
         Returns the maximum size, in bytes, of a request operation payload. Not
@@ -508,8 +1227,8 @@ class NoSQLHandleConfig:
 
         :param num_retries: the number of retries to perform automatically.
             This parameter may be 0 for no retries.
-        :param delay_s: the delay, in seconds. Use 0 to use the default delay
-            algorithm.
+        :param delay_s: the delay, in seconds, which may be fractional. Use 0
+            to use the default delay algorithm.
         :returns: self.
         :raises IllegalArgumentException: raises the exception if num_retries or
             delay_s is a negative number.
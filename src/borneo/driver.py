@@ -7,18 +7,29 @@
 # appropriate download for a copy of the license and additional information.
 #
 
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
 from logging import FileHandler, WARNING, getLogger
 from os import mkdir, path, sep
 from sys import argv
+from threading import BoundedSemaphore
+from time import time
 
 from .idcs import DefaultAccessTokenProvider
+from .cache import MetadataCache, RowCache
 from .client import Client
+from .common import CheckValue, Consistency, LruCache, State
 from .config import NoSQLHandleConfig
-from .exception import IllegalArgumentException, IllegalStateException
+from .exception import (
+    IllegalArgumentException, IllegalStateException, RequestTimeoutException)
+from .query import ParallelScan, QueryIterator
 from .operations import (
-    DeleteRequest, GetIndexesRequest, GetRequest, GetTableRequest,
-    ListTablesRequest, MultiDeleteRequest, PrepareRequest, PutRequest,
-    QueryRequest, TableRequest, TableUsageRequest, WriteMultipleRequest)
+    DeleteRequest, GetIndexesRequest, GetManyResult, GetRequest,
+    GetTableRequest,
+    ListTablesRequest, MultiDeleteRequest, PrepareRequest, PrepareResult,
+    PutRequest,
+    QueryRequest, Request, TableRequest, TableResult, TableUsageRequest,
+    WriteMultipleRequest)
+from .serde import BinaryProtocol
 
 
 class NoSQLHandle:
@@ -72,13 +83,18 @@ class NoSQLHandle:
     syntactic or semantic error.
 
     Instances of NoSQLHandle are thread-safe and expected to be shared among
-    threads.
+    threads. Operations can also be run concurrently without managing threads,
+    using :py:meth:`submit` and :py:meth:`map`, which run them on a pool of
+    threads of the same size as the pool of connections.
 
     :param config: an instance of NoSQLHandleConfig.
     :raises IllegalArgumentException: raises the exception if config is not an
         instance of NoSQLHandleConfig.
     """
 
+    # The number of values of the key field sampled by parallel_scan.
+    _SAMPLE_SIZE = 1000
+
     def __init__(self, config):
         if not isinstance(config, NoSQLHandleConfig):
             raise IllegalArgumentException(
@@ -86,6 +102,31 @@ class NoSQLHandle:
         logger = self.__get_logger(config)
         self.__config_default_at_handler_logging(config, logger)
         self.__client = Client(config, logger)
+        self.__pool_maxsize = config.get_pool_maxsize()
+        # The prepared statements of the queries, by their statements.
+        self.__statements = None
+        if config.get_statement_cache_size() > 0:
+            self.__statements = LruCache(config.get_statement_cache_size())
+        self.__auto_prepare = config.get_auto_prepare()
+        # The caches of the rows of the tables, by their lowercase names.
+        self.__row_caches = dict()
+        for table_name, (max_rows, max_staleness_ms) in (
+                config.get_row_caches().items()):
+            self.__row_caches[table_name] = RowCache(max_rows, max_staleness_ms)
+        # The cache of the keys of the rows that don't exist.
+        self.__negative_cache = None
+        if config.get_negative_cache() is not None:
+            self.__negative_cache = RowCache(*config.get_negative_cache())
+        self.__consistency = config.get_default_consistency()
+        # The cache of the metadata of the tables.
+        self.__metadata = None
+        if config.get_metadata_cache_ttl() > 0:
+            self.__metadata = MetadataCache(config.get_metadata_cache_ttl())
+        # The threads of submitted operations, one for each connection.
+        self.__executor = ThreadPoolExecutor(config.get_pool_maxsize())
+        # Bounds the operations submitted but not yet done, so that submit
+        # blocks rather than queueing operations without limit.
+        self.__submitted = BoundedSemaphore(2 * config.get_pool_maxsize())
 
     def delete(self, request):
         """
@@ -119,7 +160,7 @@ class NoSQLHandle:
             raise IllegalArgumentException(
                 'The parameter should be an instance of DeleteRequest.')
         self.__check_client()
-        return self.__client.execute(request)
+        return self.__execute(request)
 
     def get(self, request):
         """
@@ -145,7 +186,22 @@ class NoSQLHandle:
             raise IllegalArgumentException(
                 'The parameter should be an instance of GetRequest.')
         self.__check_client()
-        return self.__client.execute(request)
+        return self.__execute(request)
+
+    def get_concurrency_stats(self):
+        """
+        Returns the statistics of the adaptive limit of the requests in flight,
+        see :py:meth:`NoSQLHandleConfig.set_adaptive_concurrency_enabled`.
+
+        :returns: the current limit as 'limit', the number of requests in
+            flight as 'in_flight' and the number of requests waiting for the
+            limit as 'queue_depth', or None if the requests aren't limited.
+        :rtype: dict
+        :raises IllegalStateException: raises the exception if the handle has
+            been closed.
+        """
+        self.__check_client()
+        return self.__client.get_concurrency_stats()
 
     def get_indexes(self, request):
         """
@@ -164,7 +220,128 @@ class NoSQLHandle:
             raise IllegalArgumentException(
                 'The parameter should be an instance of GetIndexesRequest.')
         self.__check_client()
-        return self.__client.execute(request)
+        return self.__execute(request)
+
+    def get_many(self, table_name, keys, consistency=None, timeout_ms=None):
+        """
+        Gets the rows associated with primary keys. The gets are run
+        concurrently as if by :py:meth:`submit`, so that getting many rows takes
+        about as long as the slowest of their gets rather than all of them in
+        turn. Duplicate keys are got once.
+
+        :param table_name: the name of the table.
+        :type table_name: str
+        :param keys: the primary keys of the rows, an iterable of dicts as set
+            by :py:meth:`GetRequest.set_key`.
+        :param consistency: the consistency of the gets, if None the default of
+            :py:class:`NoSQLHandleConfig` is used.
+        :type consistency: Consistency
+        :param timeout_ms: the time the gets must all be done in, in
+            milliseconds, if None each get has the default request timeout of
+            :py:class:`NoSQLHandleConfig`.
+        :type timeout_ms: int
+        :returns: the results of the gets of the distinct keys, in the order of
+            the keys, and the capacity they consumed.
+        :rtype: GetManyResult
+        :raises IllegalArgumentException: raises the exception if one of the
+            parameters is not valid.
+        :raises RequestTimeoutException: raises the exception if the gets aren't
+            all done in timeout_ms.
+        :raises NoSQLException: raises the exception of the first failed get,
+            in the order of the keys.
+        """
+        CheckValue.check_str(table_name, 'table_name')
+        if timeout_ms is not None:
+            CheckValue.check_int_gt_zero(timeout_ms, 'timeout_ms')
+            deadline = time() + timeout_ms / 1000.0
+        requests = list()
+        distinct_keys = set()
+        for key in keys:
+            request = GetRequest().set_table_name(table_name).set_key(key)
+            distinct_key = tuple(sorted(key.items()))
+            if distinct_key in distinct_keys:
+                continue
+            distinct_keys.add(distinct_key)
+            if consistency is not None:
+                request.set_consistency(consistency)
+            if timeout_ms is not None:
+                request.set_timeout(timeout_ms)
+            requests.append(request)
+        futures = list()
+        try:
+            for request in requests:
+                futures.append(self.submit(request))
+                if timeout_ms is not None and time() > deadline:
+                    break
+            done, not_done = wait(
+                futures, None if timeout_ms is None else
+                max(deadline - time(), 0), FIRST_EXCEPTION)
+            for future in futures:
+                if future in done and future.exception() is not None:
+                    raise future.exception()
+            if not_done or len(futures) < len(requests):
+                raise RequestTimeoutException(
+                    'Get many timed out with ' +
+                    str(len(requests) - len(done)) + ' of ' +
+                    str(len(requests)) + ' gets not done.', timeout_ms)
+        finally:
+            for future in futures:
+                future.cancel()
+        result = GetManyResult()
+        for future in futures:
+            result.add_result(future.result())
+        return result
+
+    def get_negative_cache_stats(self):
+        """
+        Returns the statistics of the cache of the keys of the rows that don't
+        exist, see :py:meth:`NoSQLHandleConfig.set_negative_cache`.
+
+        :returns: the number of gets returned from the cache as 'hits', the
+            number of the other gets that could have been as 'misses' and the
+            number of keys cached as 'size', or None if there is no cache.
+        :rtype: dict
+        """
+        cache = self.__negative_cache
+        return None if cache is None else cache.get_stats()
+
+    def get_retry_stats(self):
+        """
+        Returns the statistics of the retries of the requests of the handle,
+        done as the :py:class:`RetryHandler` of its configuration allows.
+
+        :returns: the number of retries as 'retries', the number of retries by
+            the names of the classes of the exceptions retried as
+            'exceptions', the number of exceptions the retry handler didn't
+            allow to retry, because they can't be retried or there were too
+            many retries or no retry left in a :py:class:`RetryBudget`, as
+            'rejected', and the number of retries not done because their delay
+            would be past the timeout of their request as 'deadline_exceeded'.
+        :rtype: dict
+        :raises IllegalStateException: raises the exception if the handle has
+            been closed.
+        """
+        self.__check_client()
+        return self.__client.get_retry_stats()
+
+    def get_row_cache_stats(self, table_name):
+        """
+        Returns the statistics of the cache of the rows of a table, see
+        :py:meth:`NoSQLHandleConfig.set_row_cache`.
+
+        :param table_name: the name of the table.
+        :type table_name: str
+        :returns: the number of gets returned from the cache as 'hits', the
+            number of the other gets that could have been as 'misses' and the
+            number of rows cached as 'size', or None if the rows of the table
+            aren't cached.
+        :rtype: dict
+        :raises IllegalArgumentException: raises the exception if table_name is
+            not a string.
+        """
+        CheckValue.check_str(table_name, 'table_name')
+        cache = self.__row_caches.get(table_name.lower())
+        return None if cache is None else cache.get_stats()
 
     def get_table(self, request):
         """
@@ -185,7 +362,7 @@ class NoSQLHandle:
             raise IllegalArgumentException(
                 'The parameter should be an instance of GetTableRequest.')
         self.__check_client()
-        return self.__client.execute(request)
+        return self.__execute(request)
 
     def get_table_usage(self, request):
         """
@@ -227,7 +404,24 @@ class NoSQLHandle:
             raise IllegalArgumentException(
                 'The parameter should be an instance of ListTablesRequest.')
         self.__check_client()
-        return self.__client.execute(request)
+        return self.__execute(request)
+
+    def map(self, requests):
+        """
+        Submits operations to be executed concurrently, see :py:meth:`submit`.
+
+        :param requests: the input parameters for the operations, an iterable of
+            instances of :py:class:`Request`.
+        :returns: a list of the Futures of the results of the operations, in
+            the order of requests.
+        :raises IllegalArgumentException: raises the exception if one of the
+            requests is not an instance of :py:class:`Request`, in which case
+            none of them is submitted.
+        """
+        requests = list(requests)
+        for request in requests:
+            self.__check_request(request)
+        return [self.submit(request) for request in requests]
 
     def multi_delete(self, request):
         """
@@ -246,7 +440,78 @@ class NoSQLHandle:
             raise IllegalArgumentException(
                 'The parameter should be an instance of MultiDeleteRequest.')
         self.__check_client()
-        return self.__client.execute(request)
+        return self.__execute(request)
+
+    def parallel_scan(self, table_name, key_field, split_points=None,
+                      num_splits=0, max_read_kb=0, parallelism=0):
+        """
+        Returns a scan of all the rows of a table that queries ranges of the
+        values of a field of its primary key concurrently, see
+        :py:class:`ParallelScan`. The rows are got by iterating the scan, or
+        by :py:meth:`ParallelScan.for_each` for the pages of each range.
+
+        The ranges are delimited by split_points, or if it's None by the split
+        points that divide a sample of the values of key_field into num_splits
+        ranges of about the same size. The sample is the first page of at most
+        1000 values of ``SELECT key_field FROM table_name``, so that sampled
+        split points suit tables whose rows are evenly spread over the values
+        of key_field.
+
+        :param table_name: the name of the table.
+        :type table_name: str
+        :param key_field: the name of the field of the primary key whose values
+            are split into ranges, usually its first field.
+        :type key_field: str
+        :param split_points: the values of key_field where the ranges start, or
+            None for them to be sampled. They must be all finite numbers or all
+            strings.
+        :type split_points: list
+        :param num_splits: the number of ranges if the split points are
+            sampled, 0 for the pool_maxsize of the handle. There are fewer if
+            the sample has fewer distinct values.
+        :type num_splits: int
+        :param max_read_kb: the maximum KBytes read by the pages of the
+            queries that run at the same time, shared between them, or 0 for
+            the default limit of a query.
+        :type max_read_kb: int
+        :param parallelism: the maximum number of ranges queried at the same
+            time, 0 for the pool_maxsize of the handle.
+        :type parallelism: int
+        :returns: the scan of the table.
+        :rtype: ParallelScan
+        :raises IllegalArgumentException: raises the exception if one of the
+            parameters is not valid.
+        :raises NoSQLException: raises the exception if the split points can't
+            be sampled.
+        """
+        CheckValue.check_str(table_name, 'table_name')
+        CheckValue.check_str(key_field, 'key_field')
+        ParallelScan.check_names(table_name, key_field)
+        CheckValue.check_int_ge_zero(num_splits, 'num_splits')
+        CheckValue.check_int_ge_zero(max_read_kb, 'max_read_kb')
+        CheckValue.check_int_ge_zero(parallelism, 'parallelism')
+        if max_read_kb > BinaryProtocol.READ_KB_LIMIT:
+            raise IllegalArgumentException(
+                'max_read_kb can not exceed ' +
+                str(BinaryProtocol.READ_KB_LIMIT))
+        if split_points is not None:
+            CheckValue.check_list(split_points, 'split_points')
+        self.__check_client()
+        if split_points is None:
+            split_points = self.__sample_split_points(
+                table_name, key_field,
+                self.__pool_maxsize if num_splits == 0 else num_splits)
+        for point in split_points:
+            ParallelScan.check_split_point(point)
+        try:
+            split_points = sorted(set(split_points))
+        except TypeError:
+            raise IllegalArgumentException(
+                'Split points must be all numbers or all strings.')
+        return ParallelScan(
+            self, table_name, key_field, split_points,
+            self.__pool_maxsize if parallelism == 0 else parallelism,
+            max_read_kb)
 
     def prepare(self, request):
         """
@@ -257,6 +522,11 @@ class NoSQLHandle:
         time. The query language and API support query variables to assist with
         re-use.
 
+        If :py:meth:`NoSQLHandleConfig.set_statement_cache_size` is set, the
+        prepared statements are cached by the text of their queries, and the
+        result of a query already prepared is a copy of its cached statement,
+        which consumes no throughput.
+
         :param request: the input parameters for the operation.
         :returns: the result of the operation.
         :raises IllegalArgumentException: raises the exception if request is not
@@ -268,7 +538,7 @@ class NoSQLHandle:
             raise IllegalArgumentException(
                 'The parameter should be an instance of PrepareRequest.')
         self.__check_client()
-        return self.__client.execute(request)
+        return self.__execute(request)
 
     def put(self, request):
         """
@@ -322,7 +592,7 @@ class NoSQLHandle:
             raise IllegalArgumentException(
                 'The parameter should be an instance of PutRequest.')
         self.__check_client()
-        return self.__client.execute(request)
+        return self.__execute(request)
 
     def query(self, request):
         """
@@ -371,7 +641,73 @@ class NoSQLHandle:
             raise IllegalArgumentException(
                 'The parameter should be an instance of QueryRequest.')
         self.__check_client()
-        return self.__client.execute(request)
+        return self.__execute(request)
+
+    def query_iterable(self, request, prefetch=1):
+        """
+        Returns an iterator of all the results of a query, that follows the
+        continuation keys of the query for the caller, see
+        :py:class:`QueryIterator`. The next pages of results are got by a
+        thread of the iterator while the current one is being iterated, up to
+        prefetch pages ahead.
+
+        The request is used to get all the pages, its continuation key is set
+        as they are got, so it must not be modified or used for other
+        operations until the iterator is done or closed. Streamed and columnar
+        results are not supported.
+
+        :param request: the input parameters for the query.
+        :type request: QueryRequest
+        :param prefetch: the maximum number of pages got ahead of those being
+            iterated, or 0 for the pages to be got only as they're iterated.
+        :type prefetch: int
+        :returns: the iterator of the results of the query.
+        :rtype: QueryIterator
+        :raises IllegalArgumentException: raises the exception if request is not
+            an instance of :py:class:`QueryRequest`, if it streams its results
+            or returns columnar results, or if prefetch is a negative number.
+        """
+        if not isinstance(request, QueryRequest):
+            raise IllegalArgumentException(
+                'The parameter should be an instance of QueryRequest.')
+        CheckValue.check_int_ge_zero(prefetch, 'prefetch')
+        if request.get_stream_results() or request.get_columnar_results():
+            raise IllegalArgumentException(
+                'Streamed and columnar results are not supported by ' +
+                'query_iterable.')
+        request.validate()
+        self.__check_client()
+        return QueryIterator(self, request, prefetch)
+
+    def submit(self, request):
+        """
+        Submits an operation to be executed by a thread of the handle, and
+        returns a :py:class:`concurrent.futures.Future` of its result. The
+        operation is the one of the type of request, for example
+        :py:meth:`get` for a :py:class:`GetRequest`, and the Future raises the
+        exceptions that the operation would.
+
+        The handle has as many threads as
+        :py:meth:`NoSQLHandleConfig.get_pool_maxsize`, so that each one has a
+        connection to use. When twice that many operations are submitted but
+        not yet done, submit blocks until one of them is done. For that reason
+        it must not be called from the callbacks of the Futures it returns.
+
+        :param request: the input parameters for the operation.
+        :returns: the Future of the result of the operation.
+        :raises IllegalArgumentException: raises the exception if request is not
+            an instance of :py:class:`Request`.
+        """
+        self.__check_request(request)
+        self.__check_client()
+        self.__submitted.acquire()
+        try:
+            future = self.__executor.submit(self.__execute, request)
+        except Exception:
+            self.__submitted.release()
+            raise
+        future.add_done_callback(self.__release_submitted)
+        return future
 
     def table_request(self, request):
         """
@@ -393,7 +729,7 @@ class NoSQLHandle:
             raise IllegalArgumentException(
                 'The parameter should be an instance of TableRequest.')
         self.__check_client()
-        return self.__client.execute(request)
+        return self.__execute(request)
 
     def write_multiple(self, request):
         """
@@ -422,13 +758,15 @@ class NoSQLHandle:
             raise IllegalArgumentException(
                 'The parameter should be an instance of WriteMultipleRequest.')
         self.__check_client()
-        return self.__client.execute(request)
+        return self.__execute(request)
 
     def close(self):
         """
-        Close the NoSQLHandle.
+        Close the NoSQLHandle, after waiting for the operations submitted by
+        :py:meth:`submit` and :py:meth:`map` to be done.
         """
         self.__check_client()
+        self.__executor.shutdown()
         self.__client.shut_down()
         self.__client = None
 
@@ -437,12 +775,102 @@ class NoSQLHandle:
         if self.__client is None:
             raise IllegalStateException('NoSQLHandle has been closed.')
 
+    @staticmethod
+    def __check_request(request):
+        if not isinstance(request, Request):
+            raise IllegalArgumentException(
+                'The parameter should be an instance of Request.')
+
     def __config_default_at_handler_logging(self, config, logger):
         provider = config.get_authorization_provider()
         if isinstance(provider, DefaultAccessTokenProvider):
             if provider.get_logger() is None:
                 provider.set_logger(logger)
 
+    def __execute(self, request):
+        # Executes a request, using and maintaining the caches of the handle.
+        if isinstance(request, GetRequest):
+            return self.__get(request)
+        if isinstance(request, PrepareRequest):
+            return self.__prepare(request)
+        if isinstance(request, QueryRequest):
+            if (self.__auto_prepare and self.__statements is not None and
+                    request.get_prepared_statement() is None and
+                    request.get_statement() is not None):
+                request = self.__prepare_query(request)
+            result = self.__client.execute(request)
+            if self.__row_caches or self.__negative_cache is not None:
+                if request.should_stream():
+                    # The capacity of a streamed query is only known once its
+                    # results are read.
+                    result._add_stream_listener_internal(
+                        lambda res: self.__invalidate_written(request, res))
+                else:
+                    self.__invalidate_written(request, result)
+            return result
+        if self.__metadata is not None and isinstance(
+                request, (GetIndexesRequest, GetTableRequest,
+                          ListTablesRequest)):
+            return self.__get_metadata(request)
+        if isinstance(request, TableRequest):
+            result = self.__client.execute(request)
+            if self.__metadata is not None:
+                self.__metadata.clear()
+            if request.get_statement() is not None:
+                # The prepared queries and the cached rows may depend on the
+                # schema being changed.
+                if self.__statements is not None:
+                    self.__statements.clear()
+                for cache in self.__row_caches.values():
+                    cache.clear()
+                if self.__negative_cache is not None:
+                    self.__negative_cache.clear()
+            return result
+        if ((self.__row_caches or self.__negative_cache is not None) and
+                isinstance(request, (DeleteRequest, MultiDeleteRequest,
+                                     PutRequest, WriteMultipleRequest))):
+            # The rows are evicted both before and after they're written, so
+            # that those read while they're written aren't cached.
+            self.__invalidate(request)
+            try:
+                return self.__client.execute(request)
+            finally:
+                self.__invalidate(request)
+        return self.__client.execute(request)
+
+    def __get(self, request):
+        # Gets a row, from the caches if it's cached.
+        table_name = request.get_table_name_internal()
+        consistency = request.get_consistency_internal()
+        if consistency is None:
+            consistency = self.__consistency
+        key = request.get_key()
+        if (table_name is None or consistency == Consistency.ABSOLUTE or
+                not isinstance(key, dict)):
+            return self.__client.execute(request)
+        negative_cache = self.__negative_cache
+        if negative_cache is not None:
+            result = negative_cache.get(table_name, key)
+            if result is not None:
+                return result
+            negative_generation = negative_cache.get_generation()
+        cache = self.__row_caches.get(table_name.lower())
+        if cache is not None and not (request.get_lazy_values() or
+                                      request.get_raw_values()):
+            result = cache.get(table_name, key)
+            if result is not None:
+                return result
+            generation = cache.get_generation()
+        else:
+            cache = None
+        result = self.__client.execute(request)
+        if result.get_value() is None:
+            if negative_cache is not None:
+                negative_cache.put(table_name, key, result, negative_generation)
+        elif cache is not None:
+            cache.put(table_name, key, result, generation)
+        return result
+
     def __get_logger(self, config):
         """
         Returns the logger used for the driver. If no logger is specified,
@@ -458,3 +886,112 @@ class NoSQLHandle:
                 mkdir(log_dir)
             logger.addHandler(FileHandler(log_dir + sep + 'driver.log'))
         return logger
+
+    def __sample_split_points(self, table_name, key_field, num_splits):
+        # Returns the split points that divide a sample of the values of the
+        # key field into num_splits ranges.
+        result = self.query(QueryRequest().set_statement(
+            'SELECT ' + key_field + ' FROM ' + table_name).set_limit(
+            NoSQLHandle._SAMPLE_SIZE))
+        values = set()
+        for row in result.get_results():
+            for name in row:
+                if name.lower() == key_field.lower():
+                    values.add(row[name])
+        values = sorted(values)
+        return [values[split * len(values) // num_splits]
+                for split in range(1, num_splits)
+                if split * len(values) // num_splits > 0]
+
+    def __get_metadata(self, request):
+        # Gets the metadata of tables, from the cache if it's cached.
+        if isinstance(request, ListTablesRequest):
+            key = ('list_tables', request.get_start_index(),
+                   request.get_limit())
+        elif request.get_table_name() is None:
+            return self.__client.execute(request)
+        elif isinstance(request, GetIndexesRequest):
+            index_name = request.get_index_name()
+            key = ('get_indexes', request.get_table_name().lower(),
+                   None if index_name is None else index_name.lower())
+        elif request.get_operation_id() is None:
+            key = ('get_table', request.get_table_name().lower())
+        else:
+            # The state of an operation is polled.
+            return self.__client.execute(request)
+        return self.__metadata.get(
+            key, lambda: self.__client.execute(request),
+            lambda result: (not isinstance(result, TableResult) or
+                            result.get_state() == State.ACTIVE))
+
+    def __invalidate(self, request):
+        # Evicts the cached results of the rows written by a request.
+        if isinstance(request, WriteMultipleRequest):
+            for operation in request.get_operations():
+                self.__invalidate(operation.get_request())
+            return
+        table_name = (request.get_table_name()
+                      if isinstance(request, MultiDeleteRequest) else
+                      request.get_table_name_internal())
+        if table_name is None:
+            return
+        row = (request.get_value() if isinstance(request, PutRequest) else
+               request.get_key())
+        for cache in (self.__row_caches.get(table_name.lower()),
+                      self.__negative_cache):
+            if cache is None:
+                continue
+            if isinstance(request, MultiDeleteRequest) or row is None:
+                cache.clear()
+            else:
+                cache.invalidate(table_name, row)
+
+    def __invalidate_written(self, request, result):
+        # Evicts the cached results of the table of a query that wrote rows.
+        if result.get_write_kb() > 0:
+            self.__invalidate_query(request)
+
+    def __invalidate_query(self, request):
+        # Evicts the cached results of the table written by a query, or of all
+        # the tables if the table of the query can't be resolved. The keys of
+        # the negative cache are evicted for all the tables, that share it.
+        table_name = request.get_table_name_internal()
+        if table_name is None:
+            caches = list(self.__row_caches.values())
+        else:
+            caches = [self.__row_caches.get(table_name.lower())]
+        caches.append(self.__negative_cache)
+        for cache in caches:
+            if cache is not None:
+                cache.clear()
+
+    def __prepare(self, request):
+        # Prepares a query, using the cached statement if it's been prepared.
+        statement = request.get_statement()
+        if self.__statements is None or statement is None:
+            return self.__client.execute(request)
+        prepared = self.__statements.get(statement)
+        if prepared is None:
+            result = self.__client.execute(request)
+            # The variables set on the statement returned aren't cached.
+            self.__statements.put(
+                statement, result.get_prepared_statement().copy_statement())
+            return result
+        result = PrepareResult()
+        result.set_prepared_statement(prepared.get_statement(),
+                                      prepared.get_sql_text())
+        return result
+
+    def __prepare_query(self, request):
+        # Returns a copy of a query request that executes the prepared
+        # statement of its query.
+        prepare_request = PrepareRequest().set_statement(
+            request.get_statement())
+        if request.get_timeout() != 0:
+            prepare_request.set_timeout(request.get_timeout())
+        return request.copy_prepared(
+            self.__prepare(prepare_request).get_prepared_statement())
+
+    def __release_submitted(self, future):
+        # Called when a submitted operation is done.
+        self.__submitted.release()
@@ -236,6 +236,18 @@ class UnauthorizedException(NoSQLException):
         return self.__message
 
 
+class ConcurrencyLimitException(RequestTimeoutException):
+    """
+    Thrown when a request waits longer than allowed for one of the requests in
+    flight allowed by the adaptive concurrency limit of the handle, see
+    :py:meth:`NoSQLHandleConfig.set_adaptive_concurrency_enabled`. The request
+    has not been sent, and the service or the network is likely overloaded.
+    """
+
+    def __init__(self, message, timeout_ms=0):
+        super(ConcurrencyLimitException, self).__init__(message, timeout_ms)
+
+
 class EvolutionLimitException(ResourceLimitException):
     """
     Thrown to indicate that an attempt has been made to evolve the schema of a
@@ -8,14 +8,15 @@
 #
 
 from logging import DEBUG
-from requests import ConnectionError, Timeout, codes
+from requests import ConnectionError, RequestException, Timeout, codes
 from threading import Lock
-from time import time
+from time import sleep, time
 
-from .common import ByteInputStream
+from .common import ByteInputStream, ChunkReader
 from .exception import (
-    IllegalStateException, NoSQLException, RequestTimeoutException,
-    RetryableException, SecurityInfoNotReadyException)
+    ConcurrencyLimitException, IllegalStateException, NoSQLException,
+    RequestTimeoutException, RetryableException, SecurityInfoNotReadyException,
+    SystemException, ThrottlingException)
 from .serde import BinaryProtocol
 
 
@@ -36,9 +37,49 @@ class HttpResponse:
         return self.__status_code
 
 
+class RetryStats(object):
+    # The retries of the requests of a handle, internal. A retry is counted
+    # by the class of the exception retried, or as rejected if the retry
+    # handler doesn't allow it, or as past the deadline if its delay would
+    # take the request past its timeout.
+
+    def __init__(self):
+        self.__retries = dict()
+        self.__rejected = 0
+        self.__deadline_exceeded = 0
+        self.__lock = Lock()
+
+    def get_stats(self):
+        with self.__lock:
+            return {'retries': sum(self.__retries.values()),
+                    'exceptions': dict(self.__retries),
+                    'rejected': self.__rejected,
+                    'deadline_exceeded': self.__deadline_exceeded}
+
+    def record_deadline_exceeded(self):
+        with self.__lock:
+            self.__deadline_exceeded += 1
+
+    def record_rejected(self):
+        with self.__lock:
+            self.__rejected += 1
+
+    def record_retry(self, re):
+        name = re.__class__.__name__
+        with self.__lock:
+            self.__retries[name] = self.__retries.get(name, 0) + 1
+
+
 class RequestUtils:
     # Utility to issue http request.
-    def __init__(self, sess, logutils, request=None, retry_handler=None):
+
+    # The size of the chunks a streamed response is read in.
+    STREAM_CHUNK_SIZE = 16 * 1024
+    # The smallest socket timeout of an attempt, in seconds.
+    _MIN_TIMEOUT_S = 0.001
+
+    def __init__(self, sess, logutils, request=None, retry_handler=None,
+                 limiter=None, retry_stats=None):
         """
         Init the RequestUtils.
 
@@ -46,11 +87,16 @@ class RequestUtils:
         :param logutils: contains the logging methods.
         :param request: request to execute.
         :param retry_handler: the retry handler.
+        :param limiter: the ConcurrencyLimiter of the requests in flight, or
+            None.
+        :param retry_stats: the RetryStats the retries are counted in, or None.
         """
         self.__sess = sess
         self.__logutils = logutils
         self.__request = request
         self.__retry_handler = retry_handler
+        self.__limiter = limiter
+        self.__retry_stats = retry_stats
         self.__lock = Lock()
         self.__max_request_id = 1
 
@@ -140,23 +186,38 @@ class RequestUtils:
 
     def __do_request(self, method, uri, headers, payload, timeout_ms,
                      sec_timeout_ms):
-        start_ms = int(time() * 1000)
-        timeout_s = timeout_ms // 1000
-        if timeout_s == 0:
-            timeout_s = 1
+        start = time()
+        if self.__request is not None and self.__retry_handler is not None:
+            self.__retry_handler.on_request(self.__request)
         throttle_retried = 0
         num_retried = 0
         exception = None
         while True:
+            # Each attempt is only given the time left before the deadline.
+            timeout_s = self.__time_left(start, timeout_ms, sec_timeout_ms,
+                                         exception)
             if num_retried > 0:
+                if timeout_s <= 0:
+                    break
                 self.__log_retried(num_retried, exception)
             response = None
+            started = None
+            # Whether the request is throttled, fails with a server error or
+            # times out, for the concurrency limiter.
+            overloaded = True
             try:
+                if self.__limiter is not None:
+                    started = self.__acquire(timeout_s, timeout_ms)
+                    timeout_s = self.__time_left(
+                        start, timeout_ms, sec_timeout_ms, exception)
+                timeout_s = max(timeout_s, RequestUtils._MIN_TIMEOUT_S)
                 if self.__request is not None:
                     request_id = str(self.__next_request_id())
                     headers['x-nosql-request-id'] = request_id
                 elif payload is not None:
                     payload = payload.encode()
+                stream = (self.__request is not None and
+                          self.__request.should_stream())
                 if payload is None:
                     response = self.__sess.request(
                         method, uri, headers=headers, timeout=timeout_s)
@@ -165,11 +226,21 @@ class RequestUtils:
                     # there maybe small cost to wrap it.
                     response = self.__sess.request(
                         method, uri, headers=headers,
-                        data=memoryview(payload), timeout=timeout_s)
+                        data=memoryview(payload), timeout=timeout_s,
+                        stream=stream)
+                overloaded = response.status_code >= codes.server_error
                 if self.__logutils.is_enabled_for(DEBUG):
                     self.__logutils.log_trace(
                         'Response: ' + self.__request.__class__.__name__ +
                         ', status: ' + str(response.status_code))
+                if stream and response.status_code == codes.ok:
+                    result = self.__process_stream_response(
+                        self.__request, response, started, timeout_ms)
+                    # The result reads the rest of the response, closes it and
+                    # then releases the request in flight.
+                    response = None
+                    started = None
+                    return result
                 if self.__request is not None:
                     return self.__process_response(
                         self.__request, response.content, response.status_code)
@@ -190,11 +261,16 @@ class RequestUtils:
                     return res
             except RetryableException as re:
                 self.__logutils.log_debug('Retryable exception: ' + str(re))
+                if started is not None:
+                    # The connection isn't held while the retry is delayed.
+                    self.__limiter.release(started, isinstance(
+                        re, (SystemException, ThrottlingException)))
+                    started = None
                 """
-                Handle automatic retries. If this returns True then the delay
-                (if any) will be performed and the request should be retried.
-                If there have been too many retries this method will throw the
-                original exception.
+                Handle automatic retries. If this returns, the request is
+                retried after the delay of the retry handler, unless the retry
+                would be past the deadline of the request. If there have been
+                too many retries this method will throw the original exception.
                 """
                 retried = self.__handle_retry(re, self.__request,
                                               throttle_retried)
@@ -206,6 +282,15 @@ class RequestUtils:
                     throttle_retried = retried
                 exception = re
                 num_retried += 1
+                if not self.__delay_retry(retried, re, self.__time_left(
+                        start, timeout_ms, sec_timeout_ms, re)):
+                    self.__retry_handler.on_retry_dropped(
+                        self.__request, retried, re)
+                    if self.__retry_stats is not None:
+                        self.__retry_stats.record_deadline_exceeded()
+                    break
+                if self.__retry_stats is not None:
+                    self.__retry_stats.record_retry(re)
             except NoSQLException as nse:
                 self.__logutils.log_error(
                     'Client execution NoSQLException: ' + str(nse))
@@ -226,9 +311,8 @@ class RequestUtils:
             finally:
                 if response is not None:
                     response.close()
-            if self.__timeout_request(
-                    start_ms, timeout_ms, sec_timeout_ms, exception):
-                break
+                if started is not None:
+                    self.__limiter.release(started, overloaded)
         actual_timeout = timeout_ms
         if (self.__request is not None and
                 isinstance(exception, SecurityInfoNotReadyException)):
@@ -238,19 +322,49 @@ class RequestUtils:
             (' retry.' if num_retried == 0 or num_retried == 1
              else ' retries.'), actual_timeout, exception)
 
+    def __acquire(self, timeout_s, timeout_ms):
+        # Waits for the concurrency limiter to allow the request in flight,
+        # for at most timeout_s, the time left of its timeout.
+        now_ms = int(time() * 1000)
+        started = self.__limiter.acquire(max(0, timeout_s))
+        if started is None:
+            stats = self.__limiter.get_stats()
+            raise ConcurrencyLimitException(
+                'Request waited ' + str(int(time() * 1000) - now_ms) +
+                ' ms for the concurrency limit of ' + str(stats['limit']) +
+                ' requests in flight, with ' +
+                str(stats['queue_depth']) + ' requests queued.', timeout_ms)
+        return started
+
     def __handle_retry(self, re, request, throttle_retried):
         throttle_retried += 1
         msg = ('Retry for request ' + request.__class__.__name__ + ', num ' +
                'retries: ' + str(throttle_retried) + ', exception: ' + str(re))
         self.__logutils.log_debug(msg)
-        handler = self.__retry_handler
-        if not handler.do_retry(request, throttle_retried, re):
+        if not self.__retry_handler.do_retry(request, throttle_retried, re):
             self.__logutils.log_debug(
                 'Operation not retry-able or too many retries.')
+            if self.__retry_stats is not None:
+                self.__retry_stats.record_rejected()
             raise re
-        handler.delay(throttle_retried, re)
         return throttle_retried
 
+    def __delay_retry(self, num_retried, re, time_left_s):
+        # Waits for the delay of the retry handler before a retry. Returns
+        # False without waiting if the retry would be past the deadline of the
+        # request.
+        handler = self.__retry_handler
+        delay_s = handler._get_delay_internal(num_retried, re)
+        if delay_s is None:
+            # The handler can only wait by blocking, the deadline is checked
+            # after it.
+            handler.delay(num_retried, re)
+            return True
+        if delay_s >= time_left_s:
+            return False
+        sleep(delay_s)
+        return True
+
     def __log_retried(self, num_retried, exception):
         msg = ('Client, doing retry: ' + str(num_retried) +
                ('' if exception is None else ', exception: ' + str(exception)))
@@ -279,12 +393,66 @@ class RequestUtils:
         :returns: the programmatic response object.
         """
         if status == codes.ok:
-            bis = ByteInputStream(bytearray(content))
+            bis = ByteInputStream(content)
             return self.__process_ok_response(bis, request)
         self.__process_not_ok_response(content, status)
         raise IllegalStateException('Unexpected http response status: ' +
                                     str(status))
 
+    def __process_stream_response(self, request, response, started,
+                                  timeout_ms):
+        """
+        Convert an OK response into a suitable return value, reading the
+        content as it is received.
+
+        :param request: the request executed by the server.
+        :param response: the streamed response from the server.
+        :param started: the start of the request in flight given by the
+            concurrency limiter, released once the response is closed, or
+            None.
+        :param timeout_ms: the timeout of the request.
+        :returns: the programmatic response object.
+        """
+        limiter = self.__limiter
+        # The latency of the request is the time to its response, not the
+        # time its results are read in.
+        latency = None if started is None else time() - started
+        failed = list()
+
+        def read_chunks():
+            # The errors reading the rest of the response reach the reader of
+            # the results, they are wrapped like those of the request.
+            try:
+                for chunk in response.iter_content(
+                        RequestUtils.STREAM_CHUNK_SIZE):
+                    yield chunk
+            except Timeout as t:
+                failed.append(t)
+                raise RequestTimeoutException(
+                    'Timeout reading the streamed response: ' + str(t),
+                    timeout_ms, t)
+            except RequestException as re:
+                failed.append(re)
+                raise NoSQLException(
+                    'Error reading the streamed response: ' + str(re), re)
+
+        def close():
+            response.close()
+            if started is not None:
+                limiter.release(started, len(failed) > 0, latency)
+
+        reader = ChunkReader(read_chunks(), close)
+        code = ByteInputStream(reader.read(1)).read_byte()
+        if code == 0:
+            return request.create_deserializer().deserialize_stream(reader)
+
+        """
+        Operation failed. Handle the failure and throw an appropriate
+        exception.
+        """
+        err = BinaryProtocol.read_string(ByteInputStream(reader.read_all()))
+        raise BinaryProtocol.map_exception(code, err)
+
     def __process_ok_response(self, bis, request):
         """
         Process an OK response.
@@ -321,20 +489,20 @@ class RequestUtils:
             raise NoSQLException('Error response: ' + err_msg)
         raise NoSQLException('Error response = ' + str(status))
 
-    def __timeout_request(self, start_time, request_timeout, sec_timeout_ms,
-                          exception):
+    def __time_left(self, start, request_timeout, sec_timeout_ms, exception):
         """
-        Determine if the request should be timed out. If the last exception if
-        the SecurityInfoNotReadyException, use its specific timeout to
-        determine. Otherwise, check if the request exceed the timeout given.
+        Returns the time left before the deadline of the request. If the last
+        exception is the SecurityInfoNotReadyException, the deadline is its
+        specific timeout. Otherwise, it's the timeout of the request.
 
-        :param start_time: when the request starts.
+        :param start: when the request starts, in seconds.
         :param request_timeout: the default timeout of this request.
         :param sec_timeout_ms: the timeout of waiting security information to be
             available in milliseconds.
         :param exception: the last exception.
-        :returns: True if the request need to be timed out.
+        :returns: the time left, in seconds, 0 or less if the deadline has
+            passed.
         """
         if isinstance(exception, SecurityInfoNotReadyException):
-            return int(time() * 1000) - start_time >= sec_timeout_ms
-        return int(time() * 1000) - start_time >= request_timeout
+            request_timeout = sec_timeout_ms
+        return start + request_timeout / 1000.0 - time()
@@ -0,0 +1,154 @@
+#
+# Copyright (C) 2018, 2019 Oracle and/or its affiliates. All rights reserved.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl
+#
+# Please see LICENSE.txt file included in the top-level directory of the
+# appropriate download for a copy of the license and additional information.
+#
+
+from threading import Condition, Lock
+from time import sleep, time
+
+
+class ConcurrencyLimiter(object):
+    """
+    An adaptive limit of the requests in flight, internal. The limit is
+    increased additively, by 1 for each limit of requests done, and decreased
+    multiplicatively when a request is throttled, fails with a server error or
+    times out, or when its latency is more than twice the average latency of
+    the previous requests. It's never above max_limit, the size of the pool of
+    connections, nor below 1.
+
+    A request waits for one of the requests in flight to be done while the
+    limit is reached, for at most max_queue_wait_ms if it's not 0.
+    """
+
+    # The factor the limit is multiplied by when a request is overloaded.
+    _BACKOFF_RATIO = 0.9
+    # A request is overloaded if its latency is more than this times the
+    # average latency.
+    _LATENCY_TOLERANCE = 2.0
+    # The weight of the latency of a request in the average latency.
+    _LATENCY_WEIGHT = 0.05
+
+    def __init__(self, max_limit, max_queue_wait_ms=0):
+        self.__max_limit = max_limit
+        self.__max_queue_wait = max_queue_wait_ms / 1000.0
+        self.__limit = float(max_limit)
+        self.__in_flight = 0
+        self.__waiting = 0
+        self.__average_latency = None
+        self.__condition = Condition()
+
+    def acquire(self, timeout_s):
+        # Waits for the limit to allow a request in flight, for at most
+        # timeout_s and max_queue_wait_ms. Returns the time the request
+        # starts, to be given to release, or None if it waited too long.
+        if self.__max_queue_wait > 0:
+            timeout_s = min(timeout_s, self.__max_queue_wait)
+        deadline = time() + timeout_s
+        with self.__condition:
+            self.__waiting += 1
+            try:
+                while self.__in_flight >= int(self.__limit):
+                    left = deadline - time()
+                    if left <= 0:
+                        return None
+                    self.__condition.wait(left)
+                self.__in_flight += 1
+            finally:
+                self.__waiting -= 1
+        return time()
+
+    def get_stats(self):
+        with self.__condition:
+            return {'limit': int(self.__limit),
+                    'in_flight': self.__in_flight,
+                    'queue_depth': self.__waiting}
+
+    def release(self, start, overloaded, latency=None):
+        # Called when a request started by acquire is done, overloaded if it
+        # was throttled, failed with a server error or timed out. The latency
+        # is the time since it started, unless given.
+        if latency is None:
+            latency = time() - start
+        with self.__condition:
+            self.__in_flight -= 1
+            if not overloaded:
+                average = self.__average_latency
+                overloaded = (
+                    average is not None and
+                    latency > average * ConcurrencyLimiter._LATENCY_TOLERANCE)
+                self.__average_latency = (
+                    latency if average is None else
+                    average + (latency - average) *
+                    ConcurrencyLimiter._LATENCY_WEIGHT)
+            if overloaded:
+                self.__limit = max(
+                    1.0, self.__limit * ConcurrencyLimiter._BACKOFF_RATIO)
+            else:
+                self.__limit = min(float(self.__max_limit),
+                                   self.__limit + 1 / self.__limit)
+            self.__condition.notify_all()
+
+
+class RateLimiter(object):
+    """
+    A token bucket of the read or write units of a table, internal. The bucket
+    is refilled at units_per_second and holds at most burst_seconds of units.
+    The units a request consumes are only known from its result, so a request
+    waits until no units are owed before it's sent and the units reported in
+    its result are then charged, possibly putting the bucket in debt that the
+    following requests wait to be paid back.
+    """
+
+    def __init__(self, units_per_second, burst_seconds=1.0):
+        self.__burst_seconds = burst_seconds
+        self.__rate = float(units_per_second)
+        self.__units = self.__rate * burst_seconds
+        self.__last = time()
+        self.__lock = Lock()
+
+    def consume(self, units):
+        # Charges units consumed by a request.
+        if units <= 0:
+            return
+        with self.__lock:
+            self.__refill()
+            self.__units -= units
+
+    def get_limit(self):
+        return self.__rate
+
+    def set_limit(self, units_per_second):
+        # Changes the rate of the bucket, keeping the units owed.
+        with self.__lock:
+            self.__refill()
+            self.__rate = float(units_per_second)
+            self.__units = min(self.__units,
+                               self.__rate * self.__burst_seconds)
+
+    def wait(self, timeout_s):
+        # Waits until no units are owed. Returns the time waited in seconds, or
+        # None without waiting if the units would still be owed after
+        # timeout_s.
+        start = time()
+        while True:
+            with self.__lock:
+                self.__refill()
+                owed = -self.__units
+            now = time()
+            if owed <= 0:
+                return now - start
+            delay = owed / self.__rate
+            if now + delay > start + timeout_s:
+                return None
+            sleep(delay)
+
+    def __refill(self):
+        # Adds the units earned since the last refill, called with the lock.
+        now = time()
+        self.__units = min(self.__units + (now - self.__last) * self.__rate,
+                           self.__rate * self.__burst_seconds)
+        self.__last = now
@@ -7,8 +7,10 @@
 # appropriate download for a copy of the license and additional information.
 #
 
+from copy import copy
 from datetime import datetime
 from json import loads
+from re import compile as re_compile
 from time import mktime, sleep, time
 
 from .common import (
@@ -17,7 +19,7 @@ from .common import (
 from .config import NoSQLHandleConfig
 from .exception import (
     BatchOperationNumberLimitException, IllegalArgumentException,
-    RequestTimeoutException, TableNotFoundException)
+    IllegalStateException, RequestTimeoutException, TableNotFoundException)
 try:
     import serde
 except ImportError:
@@ -64,6 +66,10 @@ class Request(object):
         # Returns True if this request should be retried.
         return True
 
+    def should_stream(self):
+        # Returns True if the response to this request should be streamed.
+        return False
+
 
 class WriteRequest(Request):
     """
@@ -322,8 +328,8 @@ class DeleteRequest(WriteRequest):
         if self.__key is None:
             raise IllegalArgumentException('DeleteRequest requires a key.')
 
-    def create_serializer(self):
-        return serde.DeleteRequestSerializer()
+    def create_serializer(self, encoders=None):
+        return serde.DeleteRequestSerializer(encoders=encoders)
 
     def create_deserializer(self):
         return serde.DeleteRequestSerializer(cls_result=DeleteResult)
@@ -442,6 +448,8 @@ class GetRequest(ReadRequest):
     def __init__(self):
         super(GetRequest, self).__init__()
         self.__key = None
+        self.__lazy_values = False
+        self.__raw_values = False
 
     def set_key(self, key):
         """
@@ -525,6 +533,63 @@ class GetRequest(ReadRequest):
         """
         super(GetRequest, self).get_consistency_internal()
 
+    def set_lazy_values(self, lazy_values):
+        """
+        Sets whether the row value returned is decoded lazily. If True, the
+        value is returned as a read-only mapping, a :py:class:`LazyRecord`,
+        that decodes a field value the first time it is accessed and skips the
+        fields that are never accessed. This is cheaper when only some of the
+        fields of a wide row are used. The default is False, which returns the
+        value as a fully decoded dict.
+
+        :param lazy_values: True to decode the row value lazily.
+        :type lazy_values: bool
+        :return: self.
+        :raises IllegalArgumentException: raises the exception if lazy_values
+            is not True or False.
+        """
+        CheckValue.check_boolean(lazy_values, 'lazy_values')
+        self.__lazy_values = lazy_values
+        return self
+
+    def get_lazy_values(self):
+        """
+        Returns whether the row value returned is decoded lazily.
+
+        :return: True if the row value is decoded lazily.
+        :rtype: bool
+        """
+        return self.__lazy_values
+
+    def set_raw_values(self, raw_values):
+        """
+        Sets whether TIMESTAMP and NUMBER values are returned as they are
+        received. If True, they are returned as strings, TIMESTAMP values in
+        the ISO 8601 layout, such as 2019-05-02T10:23:42.123456, and NUMBER
+        values as decimal strings, rather than converted to datetime and
+        Decimal. This skips the conversions for applications that only pass the
+        values on, or convert them later. The default is False.
+
+        :param raw_values: True to return the values as strings.
+        :type raw_values: bool
+        :return: self.
+        :raises IllegalArgumentException: raises the exception if raw_values is
+            not True or False.
+        """
+        CheckValue.check_boolean(raw_values, 'raw_values')
+        self.__raw_values = raw_values
+        return self
+
+    def get_raw_values(self):
+        """
+        Returns whether TIMESTAMP and NUMBER values are returned as they are
+        received.
+
+        :return: True if the values are returned as strings.
+        :rtype: bool
+        """
+        return self.__raw_values
+
     def set_timeout(self, timeout_ms):
         """
         Sets the request timeout value, in milliseconds. This overrides any
@@ -556,11 +621,12 @@ class GetRequest(ReadRequest):
         if self.__key is None:
             raise IllegalArgumentException('GetRequest requires a key.')
 
-    def create_serializer(self):
-        return serde.GetRequestSerializer()
+    def create_serializer(self, encoders=None):
+        return serde.GetRequestSerializer(encoders=encoders)
 
     def create_deserializer(self):
-        return serde.GetRequestSerializer(GetResult)
+        return serde.GetRequestSerializer(GetResult, self.__lazy_values,
+                                          self.__raw_values)
 
 
 class GetTableRequest(Request):
@@ -991,8 +1057,8 @@ class MultiDeleteRequest(Request):
         if self.__range is not None:
             self.__range.validate()
 
-    def create_serializer(self):
-        return serde.MultiDeleteRequestSerializer()
+    def create_serializer(self, encoders=None):
+        return serde.MultiDeleteRequestSerializer(encoders=encoders)
 
     def create_deserializer(self):
         return serde.MultiDeleteRequestSerializer(MultiDeleteResult)
@@ -1072,7 +1138,7 @@ class PrepareRequest(Request):
         return serde.PrepareRequestSerializer()
 
     def create_deserializer(self):
-        return serde.PrepareRequestSerializer(PrepareResult)
+        return serde.PrepareRequestSerializer(PrepareResult, self.__statement)
 
 
 class PutRequest(WriteRequest):
@@ -1373,8 +1439,8 @@ class PutRequest(WriteRequest):
                 'PutRequest: only one of set_use_table_default_ttl or set_ttl' +
                 ' may be specified')
 
-    def create_serializer(self):
-        return serde.PutRequestSerializer()
+    def create_serializer(self, encoders=None):
+        return serde.PutRequestSerializer(encoders=encoders)
 
     def create_deserializer(self):
         return serde.PutRequestSerializer(cls_result=PutResult)
@@ -1394,6 +1460,13 @@ class QueryRequest(Request):
     The statement or prepared_statement is required parameter.
     """
 
+    # The tokens of a statement: its string literals, parentheses, identifiers
+    # and keywords, and any other character.
+    _STATEMENT_TOKENS = re_compile(
+        r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|[()]|[A-Za-z][\w.]*|\S")
+    # The keywords followed by the name of the table of a statement.
+    _TABLE_KEYWORDS = ('FROM', 'INTO', 'UPDATE')
+
     def __init__(self):
         super(QueryRequest, self).__init__()
         self.__limit = 0
@@ -1402,6 +1475,10 @@ class QueryRequest(Request):
         self.__consistency = None
         self.__statement = None
         self.__prepared_statement = None
+        self.__lazy_values = False
+        self.__stream_results = False
+        self.__columnar_results = False
+        self.__raw_values = False
 
     def set_limit(self, limit):
         """
@@ -1577,6 +1654,143 @@ class QueryRequest(Request):
         """
         return self.__prepared_statement
 
+    def set_columnar_results(self, columnar_results):
+        """
+        Sets whether the results are returned as columns. If True, the results
+        are decoded straight into a NumPy array for each field, returned by
+        :py:meth:`QueryResult.get_columns`, rather than into a dict for each
+        result. This uses much less memory and time for queries that return
+        many results that are used as columns.
+
+        LONG and INTEGER fields are returned as int64 arrays, DOUBLE fields as
+        float64 arrays and BOOLEAN fields as bool arrays. A field that mixes
+        LONG or INTEGER and DOUBLE values is returned as a float64 array, and
+        all other fields as object arrays. The arrays are masked arrays, the
+        mask is True where a value is null or the result doesn't have the
+        field. Columnar results can only be used with queries that return
+        maps, and can't be combined with lazy values or streamed results.
+
+        Columnar results require NumPy, which is installed with the SDK by
+        ``pip install borneo[numpy]``.
+
+        :param columnar_results: True to return the results as columns.
+        :type columnar_results: bool
+        :return: self.
+        :raises IllegalArgumentException: raises the exception if
+            columnar_results is not True or False.
+        :raises IllegalStateException: raises the exception if
+            columnar_results is True and NumPy is not installed.
+        """
+        CheckValue.check_boolean(columnar_results, 'columnar_results')
+        if columnar_results:
+            try:
+                import numpy
+            except ImportError:
+                raise IllegalStateException(
+                    'Columnar results require NumPy to be installed.')
+        self.__columnar_results = columnar_results
+        return self
+
+    def get_columnar_results(self):
+        """
+        Returns whether the results are returned as columns.
+
+        :return: True if the results are returned as columns.
+        :rtype: bool
+        """
+        return self.__columnar_results
+
+    def set_lazy_values(self, lazy_values):
+        """
+        Sets whether the results returned are decoded lazily. If True, each
+        result is returned as a read-only mapping, a :py:class:`LazyRecord`,
+        that decodes a field value the first time it is accessed and skips the
+        fields that are never accessed. This is cheaper when only some of the
+        fields of wide rows are used. The default is False, which returns the
+        results as fully decoded dicts.
+
+        :param lazy_values: True to decode the results lazily.
+        :type lazy_values: bool
+        :return: self.
+        :raises IllegalArgumentException: raises the exception if lazy_values
+            is not True or False.
+        """
+        CheckValue.check_boolean(lazy_values, 'lazy_values')
+        self.__lazy_values = lazy_values
+        return self
+
+    def get_lazy_values(self):
+        """
+        Returns whether the results returned are decoded lazily.
+
+        :return: True if the results are decoded lazily.
+        :rtype: bool
+        """
+        return self.__lazy_values
+
+    def set_raw_values(self, raw_values):
+        """
+        Sets whether TIMESTAMP and NUMBER values are returned as they are
+        received. If True, they are returned as strings, TIMESTAMP values in
+        the ISO 8601 layout, such as 2019-05-02T10:23:42.123456, and NUMBER
+        values as decimal strings, rather than converted to datetime and
+        Decimal. This skips the conversions for applications that only pass the
+        values on, or convert them later. The default is False.
+
+        :param raw_values: True to return the values as strings.
+        :type raw_values: bool
+        :return: self.
+        :raises IllegalArgumentException: raises the exception if raw_values is
+            not True or False.
+        """
+        CheckValue.check_boolean(raw_values, 'raw_values')
+        self.__raw_values = raw_values
+        return self
+
+    def get_raw_values(self):
+        """
+        Returns whether TIMESTAMP and NUMBER values are returned as they are
+        received.
+
+        :return: True if the values are returned as strings.
+        :rtype: bool
+        """
+        return self.__raw_values
+
+    def set_stream_results(self, stream_results):
+        """
+        Sets whether the results are streamed. If True, the results returned by
+        :py:meth:`QueryResult.get_results` are a generator that yields each
+        result as soon as it is received, rather than a list built once the
+        whole response is received. This reduces the time to the first result
+        and the memory used for large responses.
+
+        The consumed capacity and the continuation key of the
+        :py:class:`QueryResult` follow the results in the response, they are
+        only available once all the results have been iterated. The response
+        is held open until then, and counts as a request in flight for the
+        adaptive concurrency limit of the handle, so the results should always
+        be iterated to the end, or the generator closed.
+
+        :param stream_results: True to stream the results.
+        :type stream_results: bool
+        :return: self.
+        :raises IllegalArgumentException: raises the exception if
+            stream_results is not True or False.
+        """
+        CheckValue.check_boolean(stream_results, 'stream_results')
+        self.__stream_results = stream_results
+        return self
+
+    def get_stream_results(self):
+        """
+        Returns whether the results are streamed.
+
+        :return: True if the results are streamed.
+        :rtype: bool
+        """
+        return self.__stream_results
+
     def set_timeout(self, timeout_ms):
         """
         Sets the request timeout value, in milliseconds. This overrides any
@@ -1608,6 +1822,38 @@ class QueryRequest(Request):
             self.__consistency = cfg.get_default_consistency()
         return self
 
+    def copy_prepared(self, prepared_statement):
+        # Internal use only. Returns a copy of the request that executes the
+        # prepared statement of its statement.
+        request = copy(self)
+        request.__statement = None
+        request.__prepared_statement = prepared_statement
+        return request
+
+    def get_table_name_internal(self):
+        # Internal use only. Returns the name of the table of the statement or
+        # of the prepared statement, or None if it can't be resolved.
+        statement = self.__statement
+        if statement is None and self.__prepared_statement is not None:
+            statement = self.__prepared_statement.get_sql_text()
+        if statement is None:
+            return None
+        # The table is named after the first FROM, INTO or UPDATE that isn't in
+        # a string literal or in parentheses.
+        depth = 0
+        keyword = None
+        for token in QueryRequest._STATEMENT_TOKENS.findall(statement):
+            if token == '(':
+                depth += 1
+            elif token == ')':
+                depth -= 1
+            elif depth == 0:
+                if keyword is not None:
+                    return token if token[0].isalpha() else None
+                if token.upper() in QueryRequest._TABLE_KEYWORDS:
+                    keyword = token
+        return None
+
     def validate(self):
         if (self.__statement is not None and
                 self.__prepared_statement is not None or
@@ -1615,12 +1861,23 @@ class QueryRequest(Request):
                 self.__prepared_statement is None):
             raise IllegalArgumentException(
                 'One of statement or prepared statement must be set.')
+        if self.__columnar_results and (self.__lazy_values or
+                                        self.__stream_results):
+            raise IllegalArgumentException(
+                'Columnar results can\'t be combined with lazy values or ' +
+                'streamed results.')
+
+    def should_stream(self):
+        return self.__stream_results
 
     def create_serializer(self):
         return serde.QueryRequestSerializer()
 
     def create_deserializer(self):
-        return serde.QueryRequestSerializer(cls_result=QueryResult)
+        return serde.QueryRequestSerializer(
+            cls_result=QueryResult, lazy_values=self.__lazy_values,
+            columnar_results=self.__columnar_results,
+            raw_values=self.__raw_values)
 
 
 class TableRequest(Request):
@@ -2155,8 +2412,8 @@ class WriteMultipleRequest(Request):
         if not self.__ops:
             raise IllegalArgumentException('The requests list is empty.')
 
-    def create_serializer(self):
-        return serde.WriteMultipleRequestSerializer()
+    def create_serializer(self, encoders=None):
+        return serde.WriteMultipleRequestSerializer(encoders=encoders)
 
     def create_deserializer(self):
         return serde.WriteMultipleRequestSerializer(
@@ -2477,6 +2734,91 @@ class GetIndexesResult(Result):
         return self.__indexes
 
 
+class GetManyResult(Result):
+    """
+    Represents the result of a :py:meth:`NoSQLHandle.get_many` operation.
+
+    The result of the get of each distinct key is available using
+    :py:meth:`get_results`, in the order of the keys. The consumed capacity is
+    that of all the gets.
+    """
+
+    def __init__(self):
+        super(GetManyResult, self).__init__()
+        self.__results = list()
+
+    def __str__(self):
+        return 'GetMany, num results: ' + str(len(self.__results))
+
+    def add_result(self, result):
+        # Adds the result of a get and its consumed capacity, internal.
+        self.__results.append(result)
+        self.set_read_kb(self._get_read_kb_internal() + result.get_read_kb())
+        self.set_read_units(
+            self._get_read_units_internal() + result.get_read_units())
+        self.set_write_kb(
+            self._get_write_kb_internal() + result.get_write_kb())
+        return self
+
+    def get_results(self):
+        """
+        Returns the results of the gets, in the order of the distinct keys.
+
+        :return: the results of the gets.
+        :rtype: list(GetResult)
+        """
+        return self.__results
+
+    def size(self):
+        """
+        Returns the number of results.
+
+        :return: the number of results.
+        """
+        return len(self.__results)
+
+    def get_read_kb(self):
+        """
+        Returns the read throughput consumed by the gets, in KBytes. This is the
+        actual amount of data read by them. The number of read units consumed
+        is returned by :py:meth:`get_read_units` which may be a larger number if
+        the gets used Consistency.ABSOLUTE.
+
+        :return: the read KBytes consumed.
+        :rtype: int
+        """
+        return super(GetManyResult, self)._get_read_kb_internal()
+
+    def get_read_units(self):
+        """
+        Returns the read throughput consumed by the gets, in read units. This
+        number may be larger than that returned by :py:meth:`get_read_kb` if the
+        gets used Consistency.ABSOLUTE.
+
+        :return: the read units consumed.
+        :rtype: int
+        """
+        return super(GetManyResult, self)._get_read_units_internal()
+
+    def get_write_kb(self):
+        """
+        Returns the write throughput consumed by the gets, in KBytes.
+
+        :return: the write KBytes consumed.
+        :rtype: int
+        """
+        return super(GetManyResult, self)._get_write_kb_internal()
+
+    def get_write_units(self):
+        """
+        Returns the write throughput consumed by the gets, in write units.
+
+        :return: the write units consumed.
+        :rtype: int
+        """
+        return super(GetManyResult, self)._get_write_units_internal()
+
+
 class ListTablesResult(Result):
     """
     Represents the result of a :py:meth:`NoSQLHandle.list_tables` operation.
@@ -2622,9 +2964,10 @@ class PrepareResult(Result):
         super(PrepareResult, self).__init__()
         self.__prepared_statement = None
 
-    def set_prepared_statement(self, prepared_statement):
-        # Sets the prepared statement.
-        self.__prepared_statement = PreparedStatement(prepared_statement)
+    def set_prepared_statement(self, prepared_statement, sql_text=None):
+        # Sets the prepared statement, and the text of the statement prepared.
+        self.__prepared_statement = PreparedStatement(prepared_statement,
+                                                      sql_text)
         return self
 
     def get_prepared_statement(self):
@@ -2803,11 +3146,35 @@ class QueryResult(Result):
     def __init__(self):
         super(QueryResult, self).__init__()
         self.__results = None
+        self.__columns = None
         self.__continuation_key = None
+        self.__stream_listeners = list()
 
     def __str__(self):
+        if self.__columns is not None:
+            return 'Query, num columns: ' + str(len(self.__columns))
+        if not isinstance(self.__results, list):
+            return 'Query, streamed results'
         return 'Query, num results: ' + str(len(self.__results))
 
+    def set_columns(self, columns):
+        self.__columns = columns
+        return self
+
+    def get_columns(self):
+        """
+        Returns the results of a query that returns columnar results, see
+        :py:meth:`QueryRequest.set_columnar_results`, as an ordered dict of the
+        NumPy masked array for each field, in the order the fields are first
+        found in the results. All the arrays have one value for each result,
+        they are empty if there are no results.
+
+        :return: the columns of the results, or None if the request doesn't
+            return columnar results.
+        :rtype: OrderedDict(str, numpy.ma.MaskedArray)
+        """
+        return self.__columns
+
     def set_results(self, results):
         self.__results = results
         return self
@@ -2815,7 +3182,11 @@ class QueryResult(Result):
     def get_results(self):
         """
         Returns a list of results for the query. It is possible to have an empty
-        list and a non-none continuation key.
+        list and a non-none continuation key. If the request streams its
+        results, see :py:meth:`QueryRequest.set_stream_results`, a generator of
+        the results is returned instead. If the request returns columnar
+        results, see :py:meth:`QueryRequest.set_columnar_results`, None is
+        returned and the results are returned by :py:meth:`get_columns`.
 
         :return: a list of results for the query.
         :rtype: list(dict)
@@ -2831,12 +3202,25 @@ class QueryResult(Result):
         Returns the continuation key that can be used to obtain more results
         if non-none.
 
+        With streamed results, see :py:meth:`QueryRequest.set_stream_results`,
+        the key is only available once all the results have been iterated.
+
         :return: the continuation key, or None if there are no further values
             to return.
         :rtype: bytearray
         """
         return self.__continuation_key
 
+    def _add_stream_listener_internal(self, listener):
+        # Adds a function called with this result once its streamed results
+        # are all read, when its consumed capacity is known.
+        self.__stream_listeners.append(listener)
+
+    def _end_stream_internal(self):
+        # Called once the streamed results are all read.
+        for listener in self.__stream_listeners:
+            listener(self)
+
     def get_read_kb(self):
         """
         Returns the read throughput consumed by this operation, in KBytes. This
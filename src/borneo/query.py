@@ -0,0 +1,502 @@
+#
+# Copyright (C) 2018, 2019 Oracle and/or its affiliates. All rights reserved.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl
+#
+# Please see LICENSE.txt file included in the top-level directory of the
+# appropriate download for a copy of the license and additional information.
+#
+
+from decimal import Decimal
+from math import isinf, isnan
+from re import compile as re_compile
+from threading import BoundedSemaphore, Lock, Semaphore, Thread
+try:
+    from queue import Queue
+except ImportError:
+    from Queue import Queue
+
+from .common import CheckValue
+from .exception import IllegalArgumentException, IllegalStateException
+from .operations import PrepareRequest, QueryRequest
+
+
+class ParallelScan(object):
+    """
+    A scan of all the rows of a table, split into ranges of the values of a
+    field of its primary key, that are queried concurrently. Returned by
+    :py:meth:`NoSQLHandle.parallel_scan`.
+
+    The split points divide the values of the field into ranges: the values
+    less than the first split point, those from each split point to the next,
+    and those from the last split point. The range of split i is queried with
+    ``DECLARE $lo type; $hi type; SELECT * FROM table WHERE field >= $lo AND
+    field < $hi``, prepared once for the scan, with split points i-1 and i
+    bound to its variables, by up to parallelism threads at the same time,
+    each of which queries a range after the other.
+
+    The rows of all the ranges are returned by iterating the scan, in the
+    order their pages are received, which is neither that of the ranges nor
+    that of the rows. Alternatively :py:meth:`for_each` hands the pages of
+    results of each range to a function. A scan can only be run once, either
+    way.
+
+    If max_read_kb is not 0, the queries running at the same time read at most
+    that many KBytes in total in each of their pages, so that the scan doesn't
+    consume more throughput at a time than a single query would, see
+    :py:meth:`QueryRequest.set_max_read_kb`.
+
+    The capacity consumed by the pages got so far is returned by
+    :py:meth:`get_read_kb`, :py:meth:`get_read_units` and
+    :py:meth:`get_write_kb`. A scan that is iterated but not to its end must be
+    closed, to stop its queries, either with :py:meth:`close` or using it as a
+    context manager.
+    """
+
+    # The names that can be put in the statements of a scan: the names of
+    # fields, and those of tables, with their parents and namespace.
+    _FIELD_NAME = re_compile(r'[A-Za-z][A-Za-z0-9_]*$')
+    _TABLE_NAME = re_compile(
+        r'([A-Za-z][A-Za-z0-9_]*:)?[A-Za-z][A-Za-z0-9_]*' +
+        r'(\.[A-Za-z][A-Za-z0-9_]*)*$')
+
+    def __init__(self, handle, table_name, key_field, split_points, parallelism,
+                 max_read_kb):
+        self.__handle = handle
+        self.__split_points = split_points
+        self.__parallelism = min(parallelism, len(split_points) + 1)
+        self.__max_read_kb = 0
+        if max_read_kb != 0:
+            self.__max_read_kb = max(max_read_kb // self.__parallelism, 1)
+        # The statement of each range and the values of its variables.
+        self.__ranges = list()
+        variable_type = ParallelScan.__variable_type(split_points)
+        for split in range(len(split_points) + 1):
+            variables = list()
+            conditions = list()
+            if split > 0:
+                variables.append(('$lo', split_points[split - 1]))
+                conditions.append(key_field + ' >= $lo')
+            if split < len(split_points):
+                variables.append(('$hi', split_points[split]))
+                conditions.append(key_field + ' < $hi')
+            statement = 'SELECT * FROM ' + table_name
+            if variables:
+                statement = ('DECLARE ' + ' '.join(
+                    name + ' ' + variable_type + ';' for name, value in
+                    variables) + ' ' + statement + ' WHERE ' +
+                    ' AND '.join(conditions))
+            self.__ranges.append((statement, [
+                (name, ParallelScan.__variable_value(variable_type, value))
+                for name, value in variables]))
+        # The prepared statements of the ranges, by statement.
+        self.__prepared = dict()
+        self.__prepare_lock = Lock()
+        self.__next_split = 0
+        self.__lock = Lock()
+        self.__started = False
+        self.__closed = False
+        self.__read_kb = 0
+        self.__read_units = 0
+        self.__write_kb = 0
+        self.__results = iter(())
+        self.__pages = None
+        self.__running = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.__pages is None:
+            # The pages received but not yet iterated, with the exceptions of
+            # the threads and a None for each thread that is done. The
+            # semaphore bounds their number.
+            self.__pages = Queue()
+            self.__iterated = Semaphore(2 * self.__parallelism)
+            self.__start(self.__put_page)
+        while True:
+            for result in self.__results:
+                return result
+            if self.__running == 0:
+                raise StopIteration
+            page = self.__pages.get()
+            if page is None:
+                self.__running -= 1
+            elif isinstance(page, Exception):
+                self.close()
+                self.__running = 0
+                raise page
+            else:
+                self.__iterated.release()
+                self.__results = iter(page.get_results())
+
+    # Python 2 iterator protocol.
+    next = __next__
+
+    def close(self):
+        """
+        Stops the queries of the scan. The results of the pages already got can
+        still be iterated.
+        """
+        with self.__lock:
+            if self.__closed:
+                return
+            self.__closed = True
+        if self.__pages is not None:
+            # Wakes the threads up if they wait for pages to be iterated.
+            for thread in range(self.__parallelism):
+                self.__iterated.release()
+
+    def for_each(self, sink):
+        """
+        Runs the scan, calling sink with the index of each range, from 0, and
+        the list of results of each page of its query, until all of them are
+        done. sink is called by the threads of the scan, concurrently for
+        different ranges and in order for the pages of a range.
+
+        :param sink: the function called for each page of results.
+        :raises NoSQLException: raises the first exception of a query or of
+            sink, after which no more pages are got.
+        """
+        errors = list()
+
+        def consume(split, result):
+            sink(split, result.get_results())
+
+        def fail(error):
+            errors.append(error)
+            self.close()
+
+        for thread in self.__start(consume, fail):
+            thread.join()
+        if errors:
+            raise errors[0]
+
+    def get_read_kb(self):
+        """
+        Returns the read throughput consumed by the pages got so far, in
+        KBytes.
+
+        :return: the read KBytes consumed.
+        :rtype: int
+        """
+        return self.__read_kb
+
+    def get_read_units(self):
+        """
+        Returns the read throughput consumed by the pages got so far, in read
+        units.
+
+        :return: the read units consumed.
+        :rtype: int
+        """
+        return self.__read_units
+
+    def get_split_points(self):
+        """
+        Returns the split points of the ranges of the scan, in increasing
+        order.
+
+        :return: the split points.
+        :rtype: list
+        """
+        return self.__split_points
+
+    def get_write_kb(self):
+        """
+        Returns the write throughput consumed by the pages got so far, in
+        KBytes.
+
+        :return: the write KBytes consumed.
+        :rtype: int
+        """
+        return self.__write_kb
+
+    @staticmethod
+    def check_names(table_name, key_field):
+        # Checks that the names of a table and of its key field can be put in
+        # the statements of a scan, internal.
+        if not ParallelScan._TABLE_NAME.match(table_name):
+            raise IllegalArgumentException(
+                'table_name must be a table name. Got: ' + table_name)
+        if not ParallelScan._FIELD_NAME.match(key_field):
+            raise IllegalArgumentException(
+                'key_field must be a field name. Got: ' + key_field)
+
+    @staticmethod
+    def check_split_point(value):
+        # Checks that a value can be a split point, internal.
+        if (not (CheckValue.is_int(value) or CheckValue.is_str(value) or
+                 isinstance(value, (float, Decimal))) or
+                isinstance(value, bool)):
+            raise IllegalArgumentException(
+                'Split points must be integers, floats, Decimals or ' +
+                'strings. Got: ' + str(value))
+        if (isinstance(value, Decimal) and not value.is_finite() or
+                isinstance(value, float) and (isinf(value) or isnan(value))):
+            raise IllegalArgumentException(
+                'Split points must be finite. Got: ' + str(value))
+
+    def __prepare(self, statement):
+        # Returns the prepared statement of the ranges with a statement, that
+        # is prepared once for the scan.
+        with self.__prepare_lock:
+            prepared = self.__prepared.get(statement)
+            if prepared is None:
+                prepared = self.__handle.prepare(
+                    PrepareRequest().set_statement(
+                        statement)).get_prepared_statement()
+                self.__prepared[statement] = prepared
+            return prepared
+
+    def __put_page(self, split, result):
+        self.__pages.put(result)
+
+    def __scan(self, consume, fail):
+        # Queries a range after the other, run by each thread.
+        try:
+            while True:
+                with self.__lock:
+                    if (self.__closed or
+                            self.__next_split == len(self.__ranges)):
+                        return
+                    split = self.__next_split
+                    self.__next_split += 1
+                statement, variables = self.__ranges[split]
+                request = QueryRequest().set_max_read_kb(self.__max_read_kb)
+                if variables:
+                    prepared = self.__prepare(statement).copy_statement()
+                    for name, value in variables:
+                        prepared.set_variable(name, value)
+                    request.set_prepared_statement(prepared)
+                else:
+                    request.set_statement(statement)
+                while True:
+                    if self.__pages is not None:
+                        self.__iterated.acquire()
+                    if self.__closed:
+                        return
+                    result = self.__handle.query(request)
+                    with self.__lock:
+                        self.__read_kb += result.get_read_kb()
+                        self.__read_units += result.get_read_units()
+                        self.__write_kb += result.get_write_kb()
+                    consume(split, result)
+                    if result.get_continuation_key() is None:
+                        break
+                    request.set_continuation_key(
+                        result.get_continuation_key())
+        except Exception as e:
+            fail(e)
+        finally:
+            if self.__pages is not None:
+                self.__pages.put(None)
+
+    def __start(self, consume, fail=None):
+        # Starts the threads of the scan.
+        with self.__lock:
+            if self.__started:
+                raise IllegalStateException('The scan has already been run.')
+            self.__started = True
+        if fail is None:
+            fail = self.__pages.put
+        self.__running = self.__parallelism
+        threads = list()
+        for thread in range(self.__parallelism):
+            threads.append(Thread(target=self.__scan, args=(consume, fail)))
+            threads[-1].daemon = True
+            threads[-1].start()
+        return threads
+
+    @staticmethod
+    def __variable_type(split_points):
+        # Returns the type of the variables of the split points, all strings
+        # or all numbers.
+        if any(CheckValue.is_str(point) for point in split_points):
+            return 'STRING'
+        if any(isinstance(point, Decimal) for point in split_points):
+            return 'NUMBER'
+        if any(isinstance(point, float) for point in split_points):
+            return 'DOUBLE'
+        return 'LONG'
+
+    @staticmethod
+    def __variable_value(variable_type, value):
+        # Returns a split point as a value of the type of the variables.
+        if variable_type == 'NUMBER':
+            return Decimal(value)
+        if variable_type == 'DOUBLE':
+            return float(value)
+        return value
+
+
+class QueryIterator(object):
+    """
+    An iterator of the results of a query, returned by
+    :py:meth:`NoSQLHandle.query_iterable`. It follows the continuation keys of
+    the query, getting a page of results after the other with
+    :py:meth:`NoSQLHandle.query`, until there are no more results.
+
+    The pages are got ahead of the results being iterated by a thread of the
+    iterator, up to prefetch pages, so that the next page is usually received
+    by the time the results of the current one have been iterated. With a
+    prefetch of 0 a page is only got once the results of the previous one
+    have been iterated, by the thread iterating them.
+
+    The capacity consumed by the pages got so far is returned by
+    :py:meth:`get_read_kb`, :py:meth:`get_read_units` and
+    :py:meth:`get_write_kb`.
+
+    The exception of a page that can't be got is raised when the results
+    before it have been iterated, and ends the iteration. An iterator that is
+    not iterated to its end must be closed, to stop getting pages, either with
+    :py:meth:`close` or using it as a context manager.
+    """
+
+    def __init__(self, handle, request, prefetch):
+        self.__handle = handle
+        self.__request = request
+        self.__results = iter(())
+        self.__done = False
+        self.__closed = False
+        self.__lock = Lock()
+        self.__read_kb = 0
+        self.__read_units = 0
+        self.__write_kb = 0
+        if prefetch == 0:
+            self.__pages = None
+            return
+        # The pages got but not yet iterated, and the exception or None that
+        # ends them. The semaphore bounds their number.
+        self.__pages = Queue()
+        self.__prefetched = BoundedSemaphore(prefetch)
+        fetcher = Thread(target=self.__fetch)
+        fetcher.daemon = True
+        fetcher.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while True:
+            for result in self.__results:
+                return result
+            if self.__done:
+                raise StopIteration
+            page = self.__next_page()
+            if page is None or isinstance(page, Exception):
+                self.close()
+                if page is None:
+                    raise StopIteration
+                raise page
+            self.__results = iter(page.get_results())
+            if page.get_continuation_key() is None:
+                self.__done = True
+
+    # Python 2 iterator protocol.
+    next = __next__
+
+    def close(self):
+        """
+        Stops getting pages. The results of the pages already got can still
+        be iterated.
+        """
+        with self.__lock:
+            if self.__closed:
+                return
+            self.__closed = True
+        if self.__pages is not None:
+            try:
+                # Wakes the thread up if it waits for a page to be iterated.
+                self.__prefetched.release()
+            except ValueError:
+                # The thread doesn't wait.
+                pass
+
+    def get_read_kb(self):
+        """
+        Returns the read throughput consumed by the pages got so far, in
+        KBytes.
+
+        :return: the read KBytes consumed.
+        :rtype: int
+        """
+        return self.__read_kb
+
+    def get_read_units(self):
+        """
+        Returns the read throughput consumed by the pages got so far, in read
+        units.
+
+        :return: the read units consumed.
+        :rtype: int
+        """
+        return self.__read_units
+
+    def get_write_kb(self):
+        """
+        Returns the write throughput consumed by the pages got so far, in
+        KBytes.
+
+        :return: the write KBytes consumed.
+        :rtype: int
+        """
+        return self.__write_kb
+
+    def __fetch(self):
+        # Gets the pages ahead of the iteration, run by the thread.
+        try:
+            while True:
+                self.__prefetched.acquire()
+                if self.__closed:
+                    return
+                result = self.__query()
+                self.__pages.put(result)
+                if result.get_continuation_key() is None:
+                    return
+        except Exception as e:
+            self.__pages.put(e)
+            return
+        finally:
+            self.__pages.put(None)
+
+    def __next_page(self):
+        # Returns the next page, or the exception or None that ends them.
+        if self.__pages is None:
+            if self.__closed:
+                return None
+            try:
+                return self.__query()
+            except Exception as e:
+                return e
+        page = self.__pages.get()
+        if page is not None and not isinstance(page, Exception):
+            try:
+                self.__prefetched.release()
+            except ValueError:
+                # The iterator has been closed.
+                pass
+        return page
+
+    def __query(self):
+        # Gets a page and sets the continuation key of the next one.
+        result = self.__handle.query(self.__request)
+        with self.__lock:
+            self.__read_kb += result.get_read_kb()
+            self.__read_units += result.get_read_units()
+            self.__write_kb += result.get_write_kb()
+        if result.get_continuation_key() is not None:
+            self.__request.set_continuation_key(result.get_continuation_key())
+        return result
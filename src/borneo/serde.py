@@ -7,13 +7,22 @@
 # appropriate download for a copy of the license and additional information.
 #
 
+from array import array
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from decimal import Decimal
+from json import loads
+from re import compile as re_compile
+from struct import error as StructError, unpack_from
 from sys import version_info
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
 
 from .common import (
-    CheckValue, IndexInfo, PackedInteger, PutOption, State, TableLimits,
-    TableUsage, TimeUnit, Version, enum)
+    ByteInputStream, ByteOutputStream, CheckValue, IndexInfo, PackedInteger,
+    PutOption, State, TableLimits, TableUsage, TimeUnit, Version, enum)
 from .exception import (
     BatchOperationNumberLimitException, DeploymentException,
     EvolutionLimitException, IllegalArgumentException, IllegalStateException,
@@ -68,6 +77,26 @@ class BinaryProtocol:
                             JSON_NULL=10,
                             NULL=11)
 
+    # The field value type code and encoder by value type, filled in as types
+    # are first seen, see __get_encoder.
+    __ENCODERS = dict()
+
+    # Parses timestamps in the layout that is sent, None before Python 3.7.
+    __FROM_ISO_FORMAT = getattr(datetime, 'fromisoformat', None)
+
+    # The max number of request prefixes to keep, see write_request_prefix.
+    MAX_REQUEST_PREFIXES = 1024
+
+    # The encoded prefixes of read and write requests, by op code, timeout,
+    # table name and consistency or return row flag.
+    __REQUEST_PREFIXES = dict()
+
+    # The layout of timestamps that is sent, with a fraction of any number of
+    # digits.
+    __TIMESTAMP_PATTERN = re_compile(
+        r'([0-9]{4})-([0-9]{2})-([0-9]{2})T([0-9]{2}):([0-9]{2}):([0-9]{2})' +
+        r'(?:\.([0-9]+))?\Z')
+
     # Operation codes
     OP_CODE = enum(DELETE=0,
                    DELETE_IF_VERSION=1,
@@ -198,6 +227,17 @@ class BinaryProtocol:
         result.set_existing_value(BinaryProtocol.read_field_value(bis))
         result.set_existing_version(BinaryProtocol.read_version(bis))
 
+    @staticmethod
+    def get_field_value_encoder(value):
+        """
+        Returns the field value type code and the encoder, which is None for
+        None, used by :py:meth:`write_field_value` for the type of the value.
+        """
+        entry = BinaryProtocol.__ENCODERS.get(type(value))
+        if entry is None:
+            entry = BinaryProtocol.__get_encoder(value)
+        return entry
+
     @staticmethod
     def map_exception(code, msg):
         # Maps the error code returned from the server into a local string.
@@ -278,9 +318,7 @@ class BinaryProtocol:
             return None
         if length == 0:
             return bytearray()
-        buf = bytearray(length)
-        bis.read_fully(buf)
-        return buf
+        return bytearray(bis.read_bytes(length))
 
     @staticmethod
     def read_bytearray_with_int(bis):
@@ -288,14 +326,41 @@ class BinaryProtocol:
         length = bis.read_int()
         if length <= 0:
             raise IOError('Invalid length for prepared query: ' + str(length))
-        buf = bytearray(length)
-        bis.read_fully(buf)
-        return buf
+        return bytearray(bis.read_bytes(length))
 
     @staticmethod
     def read_datetime(bis):
         # Deserialize a datetime value.
         dt = BinaryProtocol.read_string(bis)
+        # The layout that is sent, with a fraction of 0, 3 or 6 digits, is
+        # parsed by fromisoformat, where it is available. The layout is checked
+        # first as fromisoformat also takes others, with a time zone for one.
+        length = len(dt)
+        if (BinaryProtocol.__FROM_ISO_FORMAT is not None and
+                (length == 19 or (length == 23 or length == 26) and
+                 dt[19] == '.' and dt[20:].isdigit()) and
+                dt[4] == '-' and dt[7] == '-' and dt[10] == 'T' and
+                dt[13] == ':' and dt[16] == ':'):
+            try:
+                return BinaryProtocol.__FROM_ISO_FORMAT(dt)
+            except ValueError:
+                pass
+        match = BinaryProtocol.__TIMESTAMP_PATTERN.match(dt)
+        if match is not None:
+            (year, month, day, hour, minute, second,
+             fraction) = match.groups()
+            if fraction is None:
+                microsecond = 0
+            else:
+                microsecond = int(fraction[:6].ljust(6, '0'))
+            dt = datetime(int(year), int(month), int(day), int(hour),
+                          int(minute), int(second), microsecond)
+            # Round a fraction of more than 6 digits on the 7th digit.
+            if (fraction is not None and len(fraction) > 6 and
+                    int(fraction[6]) >= 5):
+                dt += timedelta(microseconds=1)
+            return dt
+        # Any other layout that strptime takes.
         if '.' in dt:
             place = dt.index('.')
             if len(dt[place + 1:]) <= 6:
@@ -315,7 +380,7 @@ class BinaryProtocol:
         return Decimal(a)
 
     @staticmethod
-    def read_dict(bis):
+    def read_dict(bis, raw_values=False):
         # Read length.
         bis.read_int()
 
@@ -324,17 +389,18 @@ class BinaryProtocol:
         count = 0
         while count < size:
             key = BinaryProtocol.read_string(bis)
-            value = BinaryProtocol.read_field_value(bis)
+            value = BinaryProtocol.read_field_value(bis, raw_values)
             result[key] = value
             count += 1
         return result
 
     @staticmethod
-    def read_field_value(bis):
-        # Deserialize a generic field value.
+    def read_field_value(bis, raw_values=False):
+        # Deserialize a generic field value. With raw_values, TIMESTAMP and
+        # NUMBER values are returned as the strings they are sent as.
         t = bis.read_byte()
         if t == BinaryProtocol.FIELD_VALUE_TYPE.ARRAY:
-            return BinaryProtocol.read_list(bis)
+            return BinaryProtocol.read_list(bis, raw_values)
         elif t == BinaryProtocol.FIELD_VALUE_TYPE.BINARY:
             return BinaryProtocol.read_bytearray(bis)
         elif t == BinaryProtocol.FIELD_VALUE_TYPE.BOOLEAN:
@@ -346,12 +412,16 @@ class BinaryProtocol:
         elif t == BinaryProtocol.FIELD_VALUE_TYPE.LONG:
             return BinaryProtocol.read_packed_long(bis)
         elif t == BinaryProtocol.FIELD_VALUE_TYPE.MAP:
-            return BinaryProtocol.read_dict(bis)
+            return BinaryProtocol.read_dict(bis, raw_values)
         elif t == BinaryProtocol.FIELD_VALUE_TYPE.STRING:
             return BinaryProtocol.read_string(bis)
         elif t == BinaryProtocol.FIELD_VALUE_TYPE.TIMESTAMP:
+            if raw_values:
+                return BinaryProtocol.read_string(bis)
             return BinaryProtocol.read_datetime(bis)
         elif t == BinaryProtocol.FIELD_VALUE_TYPE.NUMBER:
+            if raw_values:
+                return BinaryProtocol.read_string(bis)
             return BinaryProtocol.read_decimal(bis)
         elif (t == BinaryProtocol.FIELD_VALUE_TYPE.NULL or
               t == BinaryProtocol.FIELD_VALUE_TYPE.JSON_NULL):
@@ -360,7 +430,33 @@ class BinaryProtocol:
             raise IllegalStateException('Unknown value type code: ' + str(t))
 
     @staticmethod
-    def read_list(bis):
+    def read_lazy_field_value(bis, raw_values=False):
+        """
+        Deserialize a generic field value like :py:meth:`read_field_value`,
+        except that a map is returned as a :py:class:`LazyRecord`, including
+        the maps nested in arrays, and its fields are only decoded on access.
+        """
+        t = bis.get_buffer()[bis.get_offset()]
+        if t == BinaryProtocol.FIELD_VALUE_TYPE.MAP:
+            bis.skip(1)
+            return LazyRecord(bis, raw_values)
+        elif t == BinaryProtocol.FIELD_VALUE_TYPE.ARRAY:
+            bis.skip(1)
+            # Read length.
+            bis.read_int()
+
+            length = bis.read_int()
+            result = list()
+            count = 0
+            while count < length:
+                result.append(
+                    BinaryProtocol.read_lazy_field_value(bis, raw_values))
+                count += 1
+            return result
+        return BinaryProtocol.read_field_value(bis, raw_values)
+
+    @staticmethod
+    def read_list(bis, raw_values=False):
         # Read length.
         bis.read_int()
 
@@ -368,7 +464,7 @@ class BinaryProtocol:
         result = list()
         count = 0
         while count < length:
-            result.append(BinaryProtocol.read_field_value(bis))
+            result.append(BinaryProtocol.read_field_value(bis, raw_values))
             count += 1
         return result
 
@@ -380,11 +476,11 @@ class BinaryProtocol:
         :param bis: the byte input stream.
         :returns: the integer that was read.
         """
-        buf = bytearray(PackedInteger.MAX_LENGTH)
-        bis.read_fully(buf, 0, 1)
-        length = PackedInteger.get_read_sorted_int_length(buf, 0)
-        bis.read_fully(buf, 1, length)
-        return PackedInteger.read_sorted_int(buf, 0)
+        buf = bis.get_buffer()
+        offset = bis.get_offset()
+        # Skipping first checks the whole value is within the content.
+        bis.skip(PackedInteger.get_read_sorted_int_length(buf, offset))
+        return PackedInteger.read_sorted_int(buf, offset)
 
     @staticmethod
     def read_packed_long(bis):
@@ -394,11 +490,11 @@ class BinaryProtocol:
         :param bis: the byte input stream.
         :returns: the long that was read.
         """
-        buf = bytearray(PackedInteger.MAX_LONG_LENGTH)
-        bis.read_fully(buf, 0, 1)
-        length = PackedInteger.get_read_sorted_long_length(buf, 0)
-        bis.read_fully(buf, 1, length)
-        return PackedInteger.read_sorted_long(buf, 0)
+        buf = bis.get_buffer()
+        offset = bis.get_offset()
+        # Skipping first checks the whole value is within the content.
+        bis.skip(PackedInteger.get_read_sorted_long_length(buf, offset))
+        return PackedInteger.read_sorted_long(buf, offset)
 
     @staticmethod
     def read_sequence_length(bis):
@@ -437,11 +533,10 @@ class BinaryProtocol:
             return None
         if length == 0:
             return str()
-        buf = bytearray(length)
-        bis.read_fully(buf)
+        buf = bis.read_bytes(length)
         if version_info.major == 2:
             return str(buf)
-        return buf.decode()
+        return str(buf, 'utf-8')
 
     @staticmethod
     def read_version(bis):
@@ -465,6 +560,33 @@ class BinaryProtocol:
     def serialize_request(request, bos):
         BinaryProtocol.write_packed_int(bos, request.get_timeout())
 
+    @staticmethod
+    def skip_field_value(bis):
+        # Skips a generic field value without deserializing it.
+        t = bis.read_byte()
+        if (t == BinaryProtocol.FIELD_VALUE_TYPE.ARRAY or
+                t == BinaryProtocol.FIELD_VALUE_TYPE.MAP):
+            # Maps and arrays start with their length in bytes.
+            bis.skip(bis.read_int())
+        elif (t == BinaryProtocol.FIELD_VALUE_TYPE.BINARY or
+              t == BinaryProtocol.FIELD_VALUE_TYPE.STRING or
+              t == BinaryProtocol.FIELD_VALUE_TYPE.TIMESTAMP or
+              t == BinaryProtocol.FIELD_VALUE_TYPE.NUMBER):
+            length = BinaryProtocol.read_packed_int(bis)
+            if length > 0:
+                bis.skip(length)
+        elif t == BinaryProtocol.FIELD_VALUE_TYPE.BOOLEAN:
+            bis.skip(1)
+        elif t == BinaryProtocol.FIELD_VALUE_TYPE.DOUBLE:
+            bis.skip(8)
+        elif (t == BinaryProtocol.FIELD_VALUE_TYPE.INTEGER or
+              t == BinaryProtocol.FIELD_VALUE_TYPE.LONG):
+            bis.skip(PackedInteger.get_read_sorted_long_length(
+                bis.get_buffer(), bis.get_offset()))
+        elif (t != BinaryProtocol.FIELD_VALUE_TYPE.NULL and
+              t != BinaryProtocol.FIELD_VALUE_TYPE.JSON_NULL):
+            raise IllegalStateException('Unknown value type code: ' + str(t))
+
     @staticmethod
     def write_bytearray(bos, value):
         """
@@ -503,10 +625,11 @@ class BinaryProtocol:
         bos.write_int(0)
         start = bos.get_offset()
         bos.write_int(len(value))
-        for key in value:
-            CheckValue.check_str(key, 'key')
+        for key, field in value.items():
+            if type(key) is not str:
+                CheckValue.check_str(key, 'key')
             BinaryProtocol.write_string(bos, key)
-            BinaryProtocol.write_field_value(bos, value[key])
+            BinaryProtocol.write_field_value(bos, field)
         # Update the length value.
         bos.write_int_at_offset(offset, bos.get_offset() - start)
 
@@ -533,28 +656,13 @@ class BinaryProtocol:
     @staticmethod
     def write_field_value(bos, value):
         # Serialize a generic field value.
-        bos.write_byte(BinaryProtocol.__get_type(value))
-        if value is not None:
-            if isinstance(value, list):
-                BinaryProtocol.write_list(bos, value)
-            elif isinstance(value, bytearray):
-                BinaryProtocol.write_bytearray(bos, value)
-            elif isinstance(value, bool):
-                bos.write_boolean(value)
-            elif isinstance(value, float):
-                bos.write_float(value)
-            elif CheckValue.is_int(value):
-                BinaryProtocol.write_packed_long(bos, value)
-            elif isinstance(value, dict):
-                BinaryProtocol.write_dict(bos, value)
-            elif CheckValue.is_str(value):
-                BinaryProtocol.write_string(bos, value)
-            elif isinstance(value, datetime):
-                BinaryProtocol.write_datetime(bos, value)
-            elif isinstance(value, Decimal):
-                BinaryProtocol.write_decimal(bos, value)
-            else:
-                raise IllegalStateException('Unknown type ' + str(type(value)))
+        entry = BinaryProtocol.__ENCODERS.get(type(value))
+        if entry is None:
+            entry = BinaryProtocol.__get_encoder(value)
+        type_code, encoder = entry
+        bos.write_byte(type_code)
+        if encoder is not None:
+            encoder(bos, value)
 
     @staticmethod
     def write_list(bos, value):
@@ -583,10 +691,16 @@ class BinaryProtocol:
         :param value: the integer to be written.
         :returns: the length of bytes written.
         """
-        buf = bytearray(PackedInteger.MAX_LENGTH)
-        offset = PackedInteger.write_sorted_int(buf, 0, value)
-        bos.write_bytearray(buf, 0, offset)
-        return offset
+        if -119 <= value <= 120:
+            # The most common case, a single byte, see PackedInteger.
+            bos.write_byte(value + 127)
+            return 1
+        bos.ensure_capacity(PackedInteger.MAX_LENGTH)
+        offset = bos.get_offset()
+        length = PackedInteger.write_sorted_int(
+            bos.get_buffer(), offset, value) - offset
+        bos.skip(length)
+        return length
 
     @staticmethod
     def write_packed_long(bos, value):
@@ -596,9 +710,14 @@ class BinaryProtocol:
         :param bos: the byte output stream.
         :param value: the long to be written.
         """
-        buf = bytearray(PackedInteger.MAX_LONG_LENGTH)
-        offset = PackedInteger.write_sorted_long(buf, 0, value)
-        bos.write_bytearray(buf, 0, offset)
+        if -119 <= value <= 120:
+            # The most common case, a single byte, see PackedInteger.
+            bos.write_byte(value + 127)
+            return
+        bos.ensure_capacity(PackedInteger.MAX_LONG_LENGTH)
+        offset = bos.get_offset()
+        bos.skip(PackedInteger.write_sorted_long(
+            bos.get_buffer(), offset, value) - offset)
 
     @staticmethod
     def write_record(bos, record):
@@ -610,6 +729,39 @@ class BinaryProtocol:
         """
         BinaryProtocol.write_field_value(bos, record)
 
+    @staticmethod
+    def write_request_prefix(bos, op, request, read=False):
+        """
+        Writes the op code and the fields common to read or write requests, as
+        :py:meth:`write_op_code` followed by :py:meth:`serialize_read_request`
+        or :py:meth:`serialize_write_request` do. The bytes are encoded once
+        for each op code, timeout, table name and consistency or return row
+        flag, and copied in from then on.
+
+        :param bos: the byte output stream.
+        :param op: the op code.
+        :param request: the read or write request.
+        :param read: True for a read request, False for a write request.
+        """
+        flag = (request.get_consistency_internal() if read
+                else request.get_return_row_internal())
+        key = (op, request.get_timeout(), request.get_table_name_internal(),
+               flag)
+        prefixes = BinaryProtocol.__REQUEST_PREFIXES
+        prefix = prefixes.get(key)
+        if prefix is None:
+            out = ByteOutputStream(bytearray())
+            BinaryProtocol.write_op_code(out, op)
+            if read:
+                BinaryProtocol.serialize_read_request(request, out)
+            else:
+                BinaryProtocol.serialize_write_request(request, out)
+            prefix = out.get_content().tobytes()
+            if len(prefixes) >= BinaryProtocol.MAX_REQUEST_PREFIXES:
+                prefixes.clear()
+            prefixes[key] = prefix
+        bos.write_bytearray(prefix)
+
     @staticmethod
     def write_sequence_length(bos, length):
         """
@@ -649,15 +801,24 @@ class BinaryProtocol:
         if value is None:
             return BinaryProtocol.write_packed_int(bos, -1)
         try:
-            buf = bytearray(value.encode())
+            buf = value.encode()
         except UnicodeDecodeError:
-            buf = bytearray(value)
+            buf = value
         length = len(buf)
         int_len = BinaryProtocol.write_packed_int(bos, length)
         if length > 0:
             bos.write_bytearray(buf)
         return int_len + length
 
+    @staticmethod
+    def write_table_record(bos, record, encoders=None, table_name=None):
+        # Serialize a row or a key, with the plan of its table if the plans of
+        # the tables are given, see RecordEncoders.
+        if encoders is None or table_name is None:
+            BinaryProtocol.write_field_value(bos, record)
+        else:
+            encoders.for_table(table_name).write(bos, record)
+
     @staticmethod
     def write_ttl(bos, ttl):
         if ttl is None:
@@ -692,30 +853,431 @@ class BinaryProtocol:
             raise IllegalStateException('Unknown table state ' + str(state))
 
     @staticmethod
-    def __get_type(value):
+    def __get_encoder(value):
+        """
+        Returns the field value type code and the encoder, which may be None,
+        for the type of the given value, checking subclasses in the order the
+        protocol gives them precedence, bool before int for example. The result
+        is cached by the exact type so later values of that type only need a
+        single lookup.
+        """
         if isinstance(value, list):
-            return BinaryProtocol.FIELD_VALUE_TYPE.ARRAY
+            entry = (BinaryProtocol.FIELD_VALUE_TYPE.ARRAY,
+                     BinaryProtocol.write_list)
         elif isinstance(value, bytearray):
-            return BinaryProtocol.FIELD_VALUE_TYPE.BINARY
+            entry = (BinaryProtocol.FIELD_VALUE_TYPE.BINARY,
+                     BinaryProtocol.write_bytearray)
         elif isinstance(value, bool):
-            return BinaryProtocol.FIELD_VALUE_TYPE.BOOLEAN
+            entry = (BinaryProtocol.FIELD_VALUE_TYPE.BOOLEAN,
+                     ByteOutputStream.write_boolean)
         elif isinstance(value, float):
-            return BinaryProtocol.FIELD_VALUE_TYPE.DOUBLE
+            entry = (BinaryProtocol.FIELD_VALUE_TYPE.DOUBLE,
+                     ByteOutputStream.write_float)
         elif CheckValue.is_int(value):
-            return BinaryProtocol.FIELD_VALUE_TYPE.LONG
+            entry = (BinaryProtocol.FIELD_VALUE_TYPE.LONG,
+                     BinaryProtocol.__write_long_value)
         elif isinstance(value, dict):
-            return BinaryProtocol.FIELD_VALUE_TYPE.MAP
+            entry = (BinaryProtocol.FIELD_VALUE_TYPE.MAP,
+                     BinaryProtocol.write_dict)
         elif CheckValue.is_str(value):
-            return BinaryProtocol.FIELD_VALUE_TYPE.STRING
+            entry = (BinaryProtocol.FIELD_VALUE_TYPE.STRING,
+                     BinaryProtocol.write_string)
         elif isinstance(value, datetime):
-            return BinaryProtocol.FIELD_VALUE_TYPE.STRING
+            entry = (BinaryProtocol.FIELD_VALUE_TYPE.STRING,
+                     BinaryProtocol.write_datetime)
         elif isinstance(value, Decimal):
-            return BinaryProtocol.FIELD_VALUE_TYPE.STRING
+            entry = (BinaryProtocol.FIELD_VALUE_TYPE.STRING,
+                     BinaryProtocol.write_decimal)
         elif value is None:
-            return BinaryProtocol.FIELD_VALUE_TYPE.NULL
+            entry = (BinaryProtocol.FIELD_VALUE_TYPE.NULL, None)
         else:
             raise IllegalStateException(
                 'Unknown value type ' + str(type(value)))
+        BinaryProtocol.__ENCODERS[type(value)] = entry
+        return entry
+
+    @staticmethod
+    def __write_long_value(bos, value):
+        # Serialize an integer field value, which must fit in a long.
+        if not -0x8000000000000000 <= value <= 0x7FFFFFFFFFFFFFFF:
+            raise IllegalStateException(
+                'Unknown value type ' + str(type(value)) +
+                ', the integer is out of the range of a long: ' + str(value))
+        BinaryProtocol.write_packed_long(bos, value)
+
+
+class ColumnBuilder(object):
+    """
+    Collects the values of one field of the rows of a query into a typed array,
+    for the columnar results of a :py:class:`QueryRequest`, without building a
+    dict for each row.
+
+    LONG and INTEGER values are collected as 64-bit integers, DOUBLE values as
+    floats and BOOLEAN values as booleans. A column that mixes integers and
+    doubles is collected as floats, any other mix of types and all other types
+    are collected as objects. A null value, or a row that doesn't have the
+    field, is recorded in the null mask of the column.
+    """
+
+    # The kinds of the column, the type codes of the stdlib arrays they are
+    # collected in and the NumPy types of the arrays they are returned as.
+    BOOLEAN = 'b'
+    FLOAT = 'd'
+    INTEGER = 'q'
+    OBJECT = 'O'
+    NUMPY_TYPES = {BOOLEAN: 'bool', FLOAT: 'float64', INTEGER: 'int64',
+                   OBJECT: 'object'}
+
+    def __init__(self, num_rows=0):
+        # The rows read before the column was first seen don't have the field.
+        self.__kind = None
+        self.__values = None
+        self.__mask = bytearray(b'\x01') * num_rows
+        self.__count = num_rows
+
+    def append(self, row, kind, value):
+        """
+        Appends the value of the field in the given row, the rows before it
+        that don't have the field are null.
+
+        :param row: the index of the row.
+        :param kind: the kind of the value, one of BOOLEAN, FLOAT, INTEGER or
+            OBJECT.
+        :param value: the value, not None.
+        """
+        if self.__count < row:
+            self.__append_nulls(row - self.__count)
+        if self.__kind != kind:
+            self.__convert(kind)
+        if self.__kind == ColumnBuilder.FLOAT:
+            value = float(value)
+        self.__values.append(value)
+        self.__mask.append(0)
+        self.__count += 1
+
+    def append_null(self, row):
+        """
+        Appends a null value of the field in the given row, the rows before it
+        that don't have the field are null as well.
+
+        :param row: the index of the row.
+        """
+        self.__append_nulls(row + 1 - self.__count)
+
+    def to_array(self, num_rows):
+        """
+        Returns the column as a NumPy masked array, the mask is True for the
+        rows where the value is null or the field is missing.
+
+        :param num_rows: the number of rows read.
+        :returns: the column.
+        :rtype: numpy.ma.MaskedArray
+        """
+        import numpy
+        if self.__count < num_rows:
+            self.__append_nulls(num_rows - self.__count)
+        mask = numpy.frombuffer(self.__mask, dtype='bool')
+        kind = self.__kind
+        if kind is None:
+            data = numpy.empty(num_rows, dtype='object')
+        elif kind == ColumnBuilder.OBJECT:
+            # Assigned one by one so that lists are not taken as dimensions.
+            data = numpy.empty(num_rows, dtype='object')
+            for i, value in enumerate(self.__values):
+                data[i] = value
+        else:
+            data = numpy.asarray(
+                self.__values, dtype=ColumnBuilder.NUMPY_TYPES[kind])
+        return numpy.ma.MaskedArray(data, mask=mask)
+
+    def __append_nulls(self, count):
+        if self.__kind is not None:
+            null = None if self.__kind == ColumnBuilder.OBJECT else 0
+            self.__values.extend([null] * count)
+        self.__mask.extend(b'\x01' * count)
+        self.__count += count
+
+    def __convert(self, kind):
+        # Converts the values collected so far to hold a value of the kind.
+        current = self.__kind
+        if current is None:
+            if kind == ColumnBuilder.OBJECT:
+                self.__values = [None] * self.__count
+            elif kind == ColumnBuilder.INTEGER and version_info.major == 2:
+                # There are no 64-bit arrays in Python 2, use a list instead.
+                self.__values = [0] * self.__count
+            else:
+                self.__values = array(kind, [0]) * self.__count
+            self.__kind = kind
+        elif (current == ColumnBuilder.INTEGER and
+              kind == ColumnBuilder.FLOAT):
+            self.__values = array(kind, self.__values)
+            self.__kind = kind
+        elif (current == ColumnBuilder.FLOAT and
+              kind == ColumnBuilder.INTEGER):
+            pass
+        elif current != ColumnBuilder.OBJECT:
+            values = self.__values
+            if current == ColumnBuilder.BOOLEAN:
+                values = [value != 0 for value in values]
+            self.__values = [None if null else value for value, null in
+                             zip(values, self.__mask)]
+            self.__kind = ColumnBuilder.OBJECT
+
+
+class LazyRecord(Mapping):
+    """
+    A read-only mapping over a map value in the content of a response, returned
+    in place of a dict for the rows of a :py:class:`GetRequest` or
+    :py:class:`QueryRequest` that has lazy values set.
+
+    Fields are scanned only as far as needed to find the key asked for. A field
+    value is decoded the first time it is accessed, nested maps are returned as
+    LazyRecord as well, and the values that are never accessed are skipped
+    over without being decoded. The record keeps the content of the response it
+    was read from. It is not meant to be accessed from multiple threads at the
+    same time.
+    """
+
+    def __init__(self, bis, raw_values=False):
+        # The byte input stream is positioned just after the type of the map.
+        length = bis.read_int()
+        self.__raw_values = raw_values
+        self.__buf = bis.get_buffer()
+        self.__size = bis.read_int()
+        # The offset of the next field to scan and the number scanned.
+        self.__offset = bis.get_offset()
+        self.__scanned = 0
+        bis.skip(length - 4)
+        # The offset of each scanned field value and the decoded values, by
+        # key.
+        self.__fields = dict()
+        self.__values = dict()
+
+    def __getitem__(self, key):
+        values = self.__values
+        if key in values:
+            return values[key]
+        offset = self.__fields.get(key)
+        if offset is None:
+            offset = self.__scan(key)
+        bis = ByteInputStream(self.__buf)
+        bis.skip(offset)
+        value = BinaryProtocol.read_lazy_field_value(bis, self.__raw_values)
+        values[key] = value
+        return value
+
+    def __iter__(self):
+        self.__scan(None)
+        return iter(self.__fields)
+
+    def __len__(self):
+        return self.__size
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+    def __scan(self, key):
+        """
+        Scans the fields not scanned yet, up to the given key, and returns the
+        offset of its value. With None all fields are scanned.
+
+        :raises KeyError: raises the exception if the key is not found.
+        """
+        fields = self.__fields
+        bis = ByteInputStream(self.__buf)
+        bis.skip(self.__offset)
+        while self.__scanned < self.__size:
+            name = BinaryProtocol.read_string(bis)
+            offset = bis.get_offset()
+            BinaryProtocol.skip_field_value(bis)
+            fields[name] = offset
+            self.__offset = bis.get_offset()
+            self.__scanned += 1
+            if name == key:
+                return offset
+        if key is not None:
+            raise KeyError(key)
+
+
+class RecordEncoder(object):
+    """
+    Writes the rows and keys of a table like
+    :py:meth:`BinaryProtocol.write_field_value` does, with a plan compiled for
+    the table. For each field name the plan keeps the name already encoded, the
+    value type expected and the encoder for it, so a field of the expected type
+    is written without checking and encoding the name or dispatching on the
+    value type again.
+
+    The plan is compiled from the table schema, see :py:class:`RecordEncoders`,
+    and is learned from the rows written. A field that is not in the plan, or
+    whose value is not of the expected type, is written by the generic path, so
+    the bytes written are always the same.
+    """
+    # The max number of fields per table to keep plans for.
+    MAX_FIELDS = 1024
+
+    # Sample values of the field types of a table schema, used to find the
+    # value type and encoder of a field. Types that can be given different
+    # value types, JSON for example, are left out.
+    SCHEMA_TYPE_VALUES = {
+        'ARRAY': list(),
+        'BINARY': bytearray(),
+        'BOOLEAN': False,
+        'DOUBLE': 0.0,
+        'ENUM': str(),
+        'FIXED_BINARY': bytearray(),
+        'FLOAT': 0.0,
+        'INTEGER': 0,
+        'LONG': 0,
+        'MAP': dict(),
+        'RECORD': dict(),
+        'STRING': str(),
+        'TIMESTAMP': datetime.min}
+
+    def __init__(self):
+        # The name with its value type code, the name alone, the value type and
+        # the encoder, by field name.
+        self.__fields = dict()
+
+    @staticmethod
+    def from_schema(schema):
+        """
+        Returns a plan compiled from the schema of a table, in the JSON format
+        returned by :py:meth:`TableResult.get_schema`, or None if the schema
+        can't be used.
+
+        :param schema: the table schema.
+        :returns: the plan.
+        """
+        try:
+            fields = loads(schema)['fields']
+            encoder = RecordEncoder()
+            for field in fields:
+                value = RecordEncoder.SCHEMA_TYPE_VALUES.get(field['type'])
+                encoder.__add_field(field['name'], value)
+        except (ValueError, KeyError, TypeError):
+            return None
+        return encoder
+
+    def write(self, bos, record):
+        """
+        Writes a dict as a map field value, including the type of the value.
+
+        :param bos: the byte output stream.
+        :param record: the dict.
+        """
+        if type(record) is not dict:
+            BinaryProtocol.write_field_value(bos, record)
+            return
+        bos.write_byte(BinaryProtocol.FIELD_VALUE_TYPE.MAP)
+        # Leave an integer-sized space for length.
+        offset = bos.get_offset()
+        bos.write_int(0)
+        start = bos.get_offset()
+        bos.write_int(len(record))
+        fields = self.__fields
+        for key, value in record.items():
+            entry = fields.get(key)
+            if entry is None:
+                entry = self.__add_field(key, value)
+                if entry is None:
+                    CheckValue.check_str(key, 'key')
+                    BinaryProtocol.write_string(bos, key)
+                    BinaryProtocol.write_field_value(bos, value)
+                    continue
+            name_and_type, name, value_type, encoder = entry
+            if type(value) is value_type:
+                bos.write_bytearray(name_and_type)
+                encoder(bos, value)
+            else:
+                bos.write_bytearray(name)
+                BinaryProtocol.write_field_value(bos, value)
+                if value_type is None and value is not None:
+                    # The field was only seen with None so far.
+                    self.__add_field(key, value, True)
+        # Update the length value.
+        bos.write_int_at_offset(offset, bos.get_offset() - start)
+
+    def __add_field(self, key, value, replace=False):
+        """
+        Adds the field to the plan, with the type of the value as the expected
+        type if it is not None, and returns its entry. Returns None if the key
+        is not a string, the value type is not supported or the plan is full.
+        """
+        fields = self.__fields
+        if (not CheckValue.is_str(key) or
+                not replace and len(fields) >= RecordEncoder.MAX_FIELDS):
+            return None
+        out = ByteOutputStream(bytearray())
+        BinaryProtocol.write_string(out, key)
+        name = out.get_content().tobytes()
+        if value is None:
+            entry = (None, name, None, None)
+        else:
+            try:
+                type_code, encoder = BinaryProtocol.get_field_value_encoder(
+                    value)
+            except IllegalStateException:
+                return None
+            out.write_byte(type_code)
+            entry = (out.get_content().tobytes(), name, type(value), encoder)
+        fields[key] = entry
+        return entry
+
+
+class RecordEncoders(object):
+    """
+    The plans of the tables written by a client, see :py:class:`RecordEncoder`,
+    by table name. The plan of a table is compiled from its schema when a
+    :py:class:`TableResult` for the table is received, and is only replaced
+    when the schema changes, so that the fields learned from the rows are kept.
+    """
+    # The max number of tables to keep plans for.
+    MAX_TABLES = 1024
+
+    def __init__(self):
+        # The plan and the schema it's compiled from, or None, by table name.
+        self.__tables = dict()
+
+    def for_table(self, table_name):
+        """
+        Returns the plan for the table, creating an empty one if there is none.
+
+        :param table_name: the table name.
+        :returns: the plan.
+        """
+        tables = self.__tables
+        key = table_name.lower()
+        entry = tables.get(key)
+        if entry is None:
+            if len(tables) >= RecordEncoders.MAX_TABLES:
+                tables.clear()
+            entry = tables.setdefault(key, (RecordEncoder(), None))
+        return entry[0]
+
+    def set_schema(self, table_name, schema):
+        """
+        Replaces the plan for the table with one compiled from the schema of
+        the table, unless the plan is compiled from the same schema. A schema
+        that can't be used is ignored, the plan is then learned from the rows.
+
+        :param table_name: the table name.
+        :param schema: the table schema.
+        """
+        if table_name is None or schema is None:
+            return
+        tables = self.__tables
+        key = table_name.lower()
+        entry = tables.get(key)
+        if entry is not None and entry[1] == schema:
+            return
+        encoder = RecordEncoder.from_schema(schema)
+        if encoder is None:
+            return
+        if entry is None and len(tables) >= RecordEncoders.MAX_TABLES:
+            tables.clear()
+        tables[key] = (encoder, schema)
 
 
 class DeleteRequestSerializer:
@@ -727,20 +1289,23 @@ class DeleteRequestSerializer:
     timeout, namespace and table_name will be skipped during serialization.
     """
 
-    def __init__(self, is_sub_request=False, cls_result=None):
+    def __init__(self, is_sub_request=False, cls_result=None, encoders=None):
         self.__is_sub_request = is_sub_request
         self.__cls_result = cls_result
+        self.__encoders = encoders
 
     def serialize(self, request, bos):
         match_version = request.get_match_version()
         op_code = (BinaryProtocol.OP_CODE.DELETE if match_version is None else
                    BinaryProtocol.OP_CODE.DELETE_IF_VERSION)
-        BinaryProtocol.write_op_code(bos, op_code)
         if self.__is_sub_request:
+            BinaryProtocol.write_op_code(bos, op_code)
             bos.write_boolean(request.get_return_row())
         else:
-            BinaryProtocol.serialize_write_request(request, bos)
-        BinaryProtocol.write_field_value(bos, request.get_key())
+            BinaryProtocol.write_request_prefix(bos, op_code, request)
+        BinaryProtocol.write_table_record(
+            bos, request.get_key(), self.__encoders,
+            request.get_table_name_internal())
         if match_version is not None:
             BinaryProtocol.write_version(bos, match_version)
 
@@ -790,20 +1355,31 @@ class GetIndexesRequestSerializer:
 
 
 class GetRequestSerializer:
-    def __init__(self, cls_result=None):
+    def __init__(self, cls_result=None, lazy_values=False, raw_values=False,
+                 encoders=None):
         self.__cls_result = cls_result
+        self.__lazy_values = lazy_values
+        self.__raw_values = raw_values
+        self.__encoders = encoders
 
     def serialize(self, request, bos):
-        BinaryProtocol.write_op_code(bos, BinaryProtocol.OP_CODE.GET)
-        BinaryProtocol.serialize_read_request(request, bos)
-        BinaryProtocol.write_field_value(bos, request.get_key())
+        BinaryProtocol.write_request_prefix(
+            bos, BinaryProtocol.OP_CODE.GET, request, True)
+        BinaryProtocol.write_table_record(
+            bos, request.get_key(), self.__encoders,
+            request.get_table_name_internal())
 
     def deserialize(self, bis):
         result = self.__cls_result()
         BinaryProtocol.deserialize_consumed_capacity(bis, result)
         has_row = bis.read_boolean()
         if has_row:
-            result.set_value(BinaryProtocol.read_field_value(bis))
+            if self.__lazy_values:
+                result.set_value(BinaryProtocol.read_lazy_field_value(
+                    bis, self.__raw_values))
+            else:
+                result.set_value(BinaryProtocol.read_field_value(
+                    bis, self.__raw_values))
             result.set_expiration_time(BinaryProtocol.read_packed_long(bis))
             result.set_version(BinaryProtocol.read_version(bis))
         return result
@@ -849,14 +1425,16 @@ class ListTablesRequestSerializer:
 
 
 class MultiDeleteRequestSerializer:
-    def __init__(self, cls_result=None):
+    def __init__(self, cls_result=None, encoders=None):
         self.__cls_result = cls_result
+        self.__encoders = encoders
 
     def serialize(self, request, bos):
         BinaryProtocol.write_op_code(bos, BinaryProtocol.OP_CODE.MULTI_DELETE)
         BinaryProtocol.serialize_request(request, bos)
         BinaryProtocol.write_string(bos, request.get_table_name())
-        BinaryProtocol.write_field_value(bos, request.get_key())
+        BinaryProtocol.write_table_record(
+            bos, request.get_key(), self.__encoders, request.get_table_name())
         BinaryProtocol.write_field_range(bos, request.get_range())
         BinaryProtocol.write_packed_int(bos, request.get_max_write_kb())
         BinaryProtocol.write_bytearray(bos, request.get_continuation_key())
@@ -871,8 +1449,9 @@ class MultiDeleteRequestSerializer:
 
 class PrepareRequestSerializer:
     # Prepare a query.
-    def __init__(self, cls_result=None):
+    def __init__(self, cls_result=None, statement=None):
         self.__cls_result = cls_result
+        self.__statement = statement
 
     def serialize(self, request, bos):
         BinaryProtocol.write_op_code(bos, BinaryProtocol.OP_CODE.PREPARE)
@@ -883,7 +1462,7 @@ class PrepareRequestSerializer:
         result = self.__cls_result()
         BinaryProtocol.deserialize_consumed_capacity(bis, result)
         result.set_prepared_statement(
-            BinaryProtocol.read_bytearray_with_int(bis))
+            BinaryProtocol.read_bytearray_with_int(bis), self.__statement)
         return result
 
 
@@ -896,18 +1475,21 @@ class PutRequestSerializer:
     timeout, namespace and table_name will be skipped during serialization.
     """
 
-    def __init__(self, is_sub_request=False, cls_result=None):
+    def __init__(self, is_sub_request=False, cls_result=None, encoders=None):
         self.__is_sub_request = is_sub_request
         self.__cls_result = cls_result
+        self.__encoders = encoders
 
     def serialize(self, request, bos):
         op = self.__get_op_code(request)
-        BinaryProtocol.write_op_code(bos, op)
         if self.__is_sub_request:
+            BinaryProtocol.write_op_code(bos, op)
             bos.write_boolean(request.get_return_row())
         else:
-            BinaryProtocol.serialize_write_request(request, bos)
-        BinaryProtocol.write_record(bos, request.get_value())
+            BinaryProtocol.write_request_prefix(bos, op, request)
+        BinaryProtocol.write_table_record(
+            bos, request.get_value(), self.__encoders,
+            request.get_table_name_internal())
         bos.write_boolean(request.get_update_ttl())
         BinaryProtocol.write_ttl(bos, request.get_ttl())
         if request.get_match_version() is not None:
@@ -942,8 +1524,12 @@ class PutRequestSerializer:
 
 
 class QueryRequestSerializer:
-    def __init__(self, cls_result=None):
+    def __init__(self, cls_result=None, lazy_values=False,
+                 columnar_results=False, raw_values=False):
         self.__cls_result = cls_result
+        self.__lazy_values = lazy_values
+        self.__columnar_results = columnar_results
+        self.__raw_values = raw_values
 
     def serialize(self, request, bos):
         # write unconditional state first.
@@ -973,16 +1559,167 @@ class QueryRequestSerializer:
         result = self.__cls_result()
         # the size is an uncompressed int so don't use utility method.
         num_rows = bis.read_int()
-        results = list()
-        count = 0
-        while count < num_rows:
-            results.append(BinaryProtocol.read_field_value(bis))
-            count += 1
-        result.set_results(results)
+        if self.__columnar_results:
+            result.set_columns(
+                self.__read_columns(bis, num_rows, self.__raw_values))
+        else:
+            read_row = (BinaryProtocol.read_lazy_field_value
+                        if self.__lazy_values
+                        else BinaryProtocol.read_field_value)
+            results = list()
+            count = 0
+            while count < num_rows:
+                results.append(read_row(bis, self.__raw_values))
+                count += 1
+            result.set_results(results)
         BinaryProtocol.deserialize_consumed_capacity(bis, result)
         result.set_continuation_key(BinaryProtocol.read_bytearray(bis))
         return result
 
+    def deserialize_stream(self, reader):
+        """
+        Deserializes a streamed response, read by a :py:class:`ChunkReader`
+        positioned after the response code. The results are a generator that
+        yields each row as soon as its bytes are received. The consumed
+        capacity and the continuation key follow the rows in the response, so
+        they are set once the generator is exhausted, and the reader is then
+        closed before the stream listeners of the result are called.
+        """
+        result = self.__cls_result()
+        # the size is an uncompressed int so don't use utility method.
+        num_rows = ByteInputStream(reader.read(4)).read_int()
+        result.set_results(self.__stream_rows(reader, num_rows, result))
+        return result
+
+    def __stream_rows(self, reader, num_rows, result):
+        read_row = (BinaryProtocol.read_lazy_field_value if self.__lazy_values
+                    else BinaryProtocol.read_field_value)
+        try:
+            count = 0
+            while count < num_rows:
+                bis = ByteInputStream(
+                    QueryRequestSerializer.__read_value(reader))
+                yield read_row(bis, self.__raw_values)
+                count += 1
+            bis = ByteInputStream(reader.read_all())
+            BinaryProtocol.deserialize_consumed_capacity(bis, result)
+            result.set_continuation_key(BinaryProtocol.read_bytearray(bis))
+        finally:
+            reader.close()
+        result._end_stream_internal()
+
+    @staticmethod
+    def __read_columns(bis, num_rows, raw_values):
+        # Reads the rows into a column for each field, in the order the fields
+        # are first seen. The field names and the common values are decoded in
+        # place, and the fields are expected in the same order as in the
+        # previous row, so that their names can be matched without decoding.
+        fvt = BinaryProtocol.FIELD_VALUE_TYPE
+        columns = OrderedDict()
+        layout = list()
+        buf = bis.get_buffer()
+        offset = bis.get_offset()
+        row = 0
+        while row < num_rows:
+            if buf[offset] != fvt.MAP:
+                raise IllegalStateException(
+                    'Columnar results require the query results to be maps.')
+            # Skip the type and length.
+            size, = unpack_from('>i', buf, offset + 5)
+            offset += 9
+            count = 0
+            while count < size:
+                # The length of the name, a packed int that is a single byte
+                # for short names.
+                length = buf[offset] - 127
+                if -119 <= length <= 120:
+                    start = offset + 1
+                else:
+                    length = PackedInteger.read_sorted_int(buf, offset)
+                    start = offset + PackedInteger.get_read_sorted_int_length(
+                        buf, offset)
+                offset = start + length
+                if (count < len(layout) and
+                        buf[start:offset] == layout[count][0]):
+                    column = layout[count][1]
+                else:
+                    raw = bytes(buf[start:offset])
+                    name = raw if version_info.major == 2 else str(raw, 'utf-8')
+                    column = columns.get(name)
+                    if column is None:
+                        column = ColumnBuilder(row)
+                        columns[name] = column
+                    if count < len(layout):
+                        layout[count] = (raw, column)
+                    else:
+                        layout.append((raw, column))
+                t = buf[offset]
+                if t == fvt.LONG or t == fvt.INTEGER:
+                    value = buf[offset + 1] - 127
+                    if -119 <= value <= 120:
+                        offset += 2
+                    else:
+                        value = PackedInteger.read_sorted_long(buf, offset + 1)
+                        offset += 1 + (
+                            PackedInteger.get_read_sorted_long_length(
+                                buf, offset + 1))
+                    column.append(row, ColumnBuilder.INTEGER, value)
+                elif t == fvt.STRING and 0 < buf[offset + 1] - 127 <= 120:
+                    start = offset + 2
+                    offset = start + buf[offset + 1] - 127
+                    value = buf[start:offset]
+                    column.append(
+                        row, ColumnBuilder.OBJECT,
+                        str(value) if version_info.major == 2
+                        else str(value, 'utf-8'))
+                elif t == fvt.DOUBLE:
+                    value, = unpack_from('>d', buf, offset + 1)
+                    offset += 9
+                    column.append(row, ColumnBuilder.FLOAT, value)
+                elif t == fvt.BOOLEAN:
+                    column.append(row, ColumnBuilder.BOOLEAN,
+                                  buf[offset + 1] != 0)
+                    offset += 2
+                elif t == fvt.NULL or t == fvt.JSON_NULL:
+                    column.append_null(row)
+                    offset += 1
+                else:
+                    bis.skip(offset - bis.get_offset())
+                    column.append(row, ColumnBuilder.OBJECT,
+                                  BinaryProtocol.read_field_value(
+                                      bis, raw_values))
+                    offset = bis.get_offset()
+                count += 1
+            row += 1
+        # Checks that all the rows were within the content.
+        bis.skip(offset - bis.get_offset())
+        for name in columns:
+            columns[name] = columns[name].to_array(num_rows)
+        return columns
+
+    @staticmethod
+    def __read_value(reader):
+        # Returns the bytes of the next field value, peeking at more bytes
+        # until the whole value can be skipped over.
+        size = 1024
+        while True:
+            content = reader.peek(size)
+            bis = ByteInputStream(content)
+            try:
+                BinaryProtocol.skip_field_value(bis)
+                return reader.read(bis.get_offset())
+            except (IndexError, StructError):
+                if len(content) < size:
+                    raise IOError('Unexpected end of the query results.')
+            bis = ByteInputStream(content)
+            t = bis.read_byte()
+            if (t == BinaryProtocol.FIELD_VALUE_TYPE.MAP or
+                    t == BinaryProtocol.FIELD_VALUE_TYPE.ARRAY):
+                # The byte length of maps and arrays follows their type.
+                size = max(size * 2, 5 + bis.read_int())
+            else:
+                size *= 2
+
 
 class TableRequestSerializer:
     def __init__(self, cls_result=None):
@@ -1056,13 +1793,15 @@ class TableUsageRequestSerializer:
 
 class WriteMultipleRequestSerializer:
     def __init__(self, cls_update_multiple_result=None,
-                 cls_operation_result=None):
+                 cls_operation_result=None, encoders=None):
         self.__cls_update_multiple_result = cls_update_multiple_result
         self.__cls_operation_result = cls_operation_result
+        self.__encoders = encoders
 
     def serialize(self, request, bos):
-        put_serializer = PutRequestSerializer(True)
-        delete_serializer = DeleteRequestSerializer(True)
+        put_serializer = PutRequestSerializer(True, encoders=self.__encoders)
+        delete_serializer = DeleteRequestSerializer(
+            True, encoders=self.__encoders)
         num = request.get_num_operations()
         BinaryProtocol.write_op_code(
             bos, BinaryProtocol.OP_CODE.WRITE_MULTIPLE)
@@ -0,0 +1,209 @@
+#
+# Copyright (C) 2018, 2019 Oracle and/or its affiliates. All rights reserved.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl
+#
+# Please see LICENSE.txt file included in the top-level directory of the
+# appropriate download for a copy of the license and additional information.
+#
+
+import unittest
+from time import sleep as blocking_sleep, time
+try:
+    from asyncio import gather, new_event_loop, sleep
+except ImportError:
+    pass
+
+import borneo
+from borneo import (
+    DeleteRequest, GetRequest, PutRequest, QueryRequest,
+    RequestTimeoutException, State, TableNotFoundException, TableRequest,
+    WriteMultipleRequest)
+from borneo.common import ByteOutputStream, HttpConstants
+from borneo.exception import IllegalArgumentException, IllegalStateException
+from borneo.serde import BinaryProtocol
+from stand_in_server import (
+    StandInTestCase, TestAuthorizationProvider, get_stand_in_config)
+
+
+@unittest.skipUnless(hasattr(borneo, 'AsyncNoSQLHandle'),
+                     'AsyncNoSQLHandle requires Python 3.5 or later.')
+class TestAsyncHandle(StandInTestCase):
+    def setUp(self):
+        self.loop = new_event_loop()
+        super(TestAsyncHandle, self).setUp()
+
+    def tearDown(self):
+        if self.handle is not None:
+            self.__run(self.handle.close())
+        self.loop.close()
+
+    def create_handle(self):
+        return self.__create_handle()
+
+    def testAsyncHandleIllegalInit(self):
+        self.assertRaises(IllegalArgumentException, borneo.AsyncNoSQLHandle,
+                          'IllegalConfig')
+        config = get_stand_in_config(self.server).set_proxy_host('proxy')
+        self.assertRaises(IllegalArgumentException, borneo.AsyncNoSQLHandle,
+                          config)
+        config = get_stand_in_config(self.server).set_rate_limiting_enabled(
+            True)
+        self.assertRaises(IllegalArgumentException, borneo.AsyncNoSQLHandle,
+                          config)
+        config = get_stand_in_config(
+            self.server).set_adaptive_concurrency_enabled(True)
+        self.assertRaises(IllegalArgumentException, borneo.AsyncNoSQLHandle,
+                          config)
+
+    def testAsyncHandleIllegalRequests(self):
+        self.assertRaises(IllegalArgumentException, self.__run,
+                          self.handle.get(PutRequest()))
+        request = QueryRequest().set_statement(
+            'SELECT * FROM users').set_stream_results(True)
+        self.assertRaises(IllegalArgumentException, self.__run,
+                          self.handle.query(request))
+
+    def testAsyncHandleClose(self):
+        self.__run(self.handle.close())
+        get_request = GetRequest().set_table_name('users').set_key({'id': 1})
+        self.assertRaises(IllegalStateException, self.__run,
+                          self.handle.get(get_request))
+        self.handle = None
+
+    def testAsyncHandleOperations(self):
+        put_request = PutRequest().set_table_name('users').set_value(
+            {'id': 1, 'name': 'Jack'})
+        result = self.__run(self.handle.put(put_request))
+        self.assertIsNotNone(result.get_version())
+        get_request = GetRequest().set_table_name('users').set_key({'id': 1})
+        result = self.__run(self.handle.get(get_request))
+        self.assertEqual(result.get_value(), {'id': 1, 'name': 'Jack'})
+        self.assertEqual(result.get_read_units(), 1)
+        request = WriteMultipleRequest()
+        for key in range(2, 5):
+            request.add(PutRequest().set_table_name('users').set_value(
+                {'id': key, 'name': 'Jill'}), True)
+        result = self.__run(self.handle.write_multiple(request))
+        self.assertTrue(result.get_success())
+        self.assertEqual(result.size(), 3)
+        delete_request = DeleteRequest().set_table_name('users').set_key(
+            {'id': 1})
+        self.assertTrue(self.__run(self.handle.delete(delete_request)).
+                        get_success())
+        self.assertIsNone(self.__run(self.handle.get(get_request)).get_value())
+        query_request = QueryRequest().set_statement('SELECT * FROM users')
+        result = self.__run(self.handle.query(query_request))
+        self.assertEqual([row['id'] for row in result.get_results()],
+                         [2, 3, 4])
+
+    def testAsyncHandleTableRequest(self):
+        request = TableRequest().set_statement(
+            'CREATE TABLE users(id INTEGER, PRIMARY KEY(id))')
+        result = self.__run(self.handle.table_request(request))
+        self.assertEqual(result.get_state(), State.CREATING)
+        result = self.__run(self.handle.wait_for_state(
+            'users', State.ACTIVE, 5000, 10))
+        self.assertEqual(result.get_state(), State.ACTIVE)
+        self.assertEqual(self.server.polls, 3)
+        self.assertRaises(TableNotFoundException, self.__run,
+                          self.handle.wait_for_state(
+                              'unknown', State.ACTIVE, 5000, 10))
+        result = self.__run(self.handle.wait_for_state(
+            'unknown', State.DROPPED, 5000, 10))
+        self.assertEqual(result.get_state(), State.DROPPED)
+        self.assertRaises(IllegalArgumentException, self.__run,
+                          self.handle.wait_for_state(
+                              'users', State.ACTIVE, 10, 100))
+
+    def testAsyncHandleRetry(self):
+        get_request = GetRequest().set_table_name('users').set_key({'id': 1})
+        throttling = BinaryProtocol.THROTTLING_ERROR.READ_LIMIT_EXCEEDED
+        self.server.errors = [throttling] * 2
+        self.assertIsNone(self.__run(self.handle.get(get_request)).get_value())
+        # the retry handler gives up after 2 retries.
+        self.server.errors = [throttling] * 3
+        self.assertRaises(borneo.ReadThrottlingException, self.__run,
+                          self.handle.get(get_request))
+        self.server.errors = [BinaryProtocol.USER_ERROR.TABLE_NOT_FOUND]
+        self.assertRaises(TableNotFoundException, self.__run,
+                          self.handle.get(get_request))
+
+    def testAsyncHandleTimeout(self):
+        self.server.delay = 1.5
+        get_request = GetRequest().set_table_name('users').set_key(
+            {'id': 1}).set_timeout(1000)
+        self.assertRaises(RequestTimeoutException, self.__run,
+                          self.handle.get(get_request))
+
+    def testAsyncHandleConcurrency(self):
+        self.__run(self.handle.close())
+        self.handle = self.__create_handle(2)
+        self.server.delay = 0.1
+        requests = [GetRequest().set_table_name('users').set_key({'id': key})
+                    for key in range(8)]
+        results = self.__run(gather(
+            *[self.loop.create_task(self.handle.get(request))
+              for request in requests]))
+        self.assertEqual(len(results), 8)
+        # at most 2 requests at a time, over 2 reused connections.
+        self.assertEqual(self.server.max_active, 2)
+        self.assertEqual(len(self.server.connections), 2)
+
+    def testAsyncHandleBlockingAuthorization(self):
+        class BlockingAuthorizationProvider(TestAuthorizationProvider):
+            def get_authorization_string(self, request=None):
+                blocking_sleep(0.2)
+                return 'Bearer test'
+
+        self.__run(self.handle.close())
+        self.handle = borneo.AsyncNoSQLHandle(get_stand_in_config(
+            self.server).set_authorization_provider(
+            BlockingAuthorizationProvider()))
+        requests = [GetRequest().set_table_name('users').set_key({'id': key})
+                    for key in range(4)]
+        start = time()
+        self.__run(gather(*[self.loop.create_task(self.handle.get(request))
+                            for request in requests]))
+        # the authorization strings are got off the loop, concurrently.
+        self.assertLess(time() - start, 0.6)
+
+    def testAsyncHandlePoolClose(self):
+        from borneo.aio import AsyncHttpPool
+        pool = AsyncHttpPool(
+            '127.0.0.1', self.server.server.server_address[1], False, 2)
+        request = GetRequest().set_table_name('users').set_key(
+            {'id': 1}).set_defaults(get_stand_in_config(self.server))
+        bos = ByteOutputStream(bytearray())
+        BinaryProtocol.write_serial_version(bos)
+        request.create_serializer().serialize(request, bos)
+        body = bos.get_content()
+        headers = {'Content-Length': str(len(body))}
+
+        def post():
+            return pool.post('/' + HttpConstants.NOSQL_DATA_PATH, headers,
+                             body, 5)
+
+        async def close_in_flight():
+            task = self.loop.create_task(post())
+            await sleep(0.05)
+            pool.close()
+            return await task
+
+        self.server.delay = 0.1
+        self.assertEqual(self.__run(close_in_flight())[0], 200)
+        # the connection released once the pool is closed is closed.
+        self.__run(sleep(0.1))
+        self.assertEqual(len(self.server.connections), 1)
+        self.assertEqual(self.server.open_connections, set())
+
+    def __create_handle(self, pool_maxsize=10):
+        return borneo.AsyncNoSQLHandle(
+            get_stand_in_config(self.server, pool_maxsize))
+
+    def __run(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+
+if __name__ == '__main__':
+    unittest.main()
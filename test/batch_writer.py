@@ -0,0 +1,121 @@
+#
+# Copyright (C) 2018, 2019 Oracle and/or its affiliates. All rights reserved.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl
+#
+# Please see LICENSE.txt file included in the top-level directory of the
+# appropriate download for a copy of the license and additional information.
+#
+
+import unittest
+from time import sleep
+
+from borneo import (
+    BatchWriter, DeleteRequest, GetRequest, IllegalArgumentException,
+    IllegalStateException, PutRequest, TableNotFoundException)
+from borneo.serde import BinaryProtocol
+from stand_in_server import StandInTestCase
+
+
+class TestBatchWriter(StandInTestCase):
+    def testBatchWriterIllegalInit(self):
+        self.assertRaises(IllegalArgumentException, BatchWriter, self.handle,
+                          None, ['shard'])
+        self.assertRaises(IllegalArgumentException, BatchWriter, self.handle,
+                          'users', 'IllegalShardKey')
+        self.assertRaises(IllegalArgumentException, BatchWriter, self.handle,
+                          'users', ['shard'], 0)
+        self.assertRaises(IllegalArgumentException, BatchWriter, self.handle,
+                          'users', ['shard'], 51)
+        self.assertRaises(IllegalArgumentException, BatchWriter, self.handle,
+                          'users', ['shard'], 50, 0)
+        self.assertRaises(IllegalArgumentException, BatchWriter, self.handle,
+                          'users', ['shard'], 50,
+                          BinaryProtocol.BATCH_REQUEST_SIZE_LIMIT)
+        self.assertRaises(IllegalArgumentException, BatchWriter, self.handle,
+                          'users', ['shard'], 50, 1024, -1)
+
+    def testBatchWriterIllegalAdd(self):
+        with BatchWriter(self.handle, 'users', ['shard']) as writer:
+            self.assertRaises(IllegalArgumentException, writer.add,
+                              GetRequest().set_key({'id': 1}))
+            self.assertRaises(IllegalArgumentException, writer.add,
+                              PutRequest().set_table_name('other').set_value(
+                                  {'id': 1}))
+            self.assertRaises(IllegalArgumentException, writer.add,
+                              PutRequest())
+        self.assertRaises(IllegalStateException, writer.add,
+                          self.__put_request(1, 0))
+
+    def testBatchWriterGroups(self):
+        futures = list()
+        with BatchWriter(self.handle, 'users', ['shard'], 4) as writer:
+            self.assertEqual(writer.get_table_name(), 'users')
+            for key in range(20):
+                futures.append(writer.add(self.__put_request(key, key % 2)))
+            # the full batches are sent before the writer is flushed.
+            self.assertEqual(self.__wait_for_batches(4), 4)
+        batches = self.server.batches
+        self.assertEqual(sorted(len(batch) for batch in batches),
+                         [2, 2, 4, 4, 4, 4])
+        for batch in batches:
+            self.assertEqual(len(set(row['shard'] for row in batch)), 1)
+        for future in futures:
+            self.assertTrue(future.result().get_success())
+            self.assertIsNotNone(future.result().get_version())
+        self.assertEqual(len(self.server.tables['users']), 20)
+
+    def testBatchWriterDelete(self):
+        self.server.tables['users'] = dict()
+        with BatchWriter(self.handle, 'users') as writer:
+            for key in range(3):
+                writer.add(self.__put_request(key, 0))
+        with BatchWriter(self.handle, 'users') as writer:
+            deleted = writer.add(DeleteRequest().set_key({'id': 1}))
+            not_found = writer.add(
+                DeleteRequest().set_table_name('USERS').set_key({'id': 5}))
+        self.assertTrue(deleted.result().get_success())
+        self.assertFalse(not_found.result().get_success())
+        self.assertEqual(sorted(self.server.tables['users']), [0, 2])
+        # the shard key of the table is the primary key of the stand-in.
+        self.assertEqual([len(batch) for batch in self.server.batches],
+                         [1, 1, 1, 1, 1])
+
+    def testBatchWriterMaxSize(self):
+        with BatchWriter(self.handle, 'users', ['shard'], 50, 1000) as writer:
+            for key in range(10):
+                writer.add(PutRequest().set_value(
+                    {'id': key, 'shard': 0, 'name': 'x' * 400}))
+        self.assertEqual([len(batch) for batch in self.server.batches],
+                         [2, 2, 2, 2, 2])
+
+    def testBatchWriterFlushInterval(self):
+        writer = BatchWriter(self.handle, 'users', ['shard'], 50,
+                             flush_interval_ms=100)
+        future = writer.add(self.__put_request(1, 0))
+        self.assertTrue(future.result(2).get_success())
+        self.assertEqual(len(self.server.batches), 1)
+        writer.close()
+
+    def testBatchWriterFailure(self):
+        self.server.errors = [BinaryProtocol.USER_ERROR.TABLE_NOT_FOUND]
+        with BatchWriter(self.handle, 'users', ['shard']) as writer:
+            futures = [writer.add(self.__put_request(key, 0))
+                       for key in range(3)]
+        for future in futures:
+            self.assertRaises(TableNotFoundException, future.result)
+
+    def __wait_for_batches(self, num_batches):
+        for count in range(100):
+            if len(self.server.batches) >= num_batches:
+                break
+            sleep(0.01)
+        return len(self.server.batches)
+
+    @staticmethod
+    def __put_request(key, shard):
+        return PutRequest().set_value({'id': key, 'shard': shard})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,383 @@
+#
+# Copyright (C) 2018, 2019 Oracle and/or its affiliates. All rights reserved.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl
+#
+# Please see LICENSE.txt file included in the top-level directory of the
+# appropriate download for a copy of the license and additional information.
+#
+
+import unittest
+from collections import OrderedDict
+from datetime import datetime
+from decimal import Decimal
+from struct import pack
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from borneo import (
+    Consistency, DeleteRequest, GetRequest, NoSQLHandleConfig, PutRequest)
+from borneo.common import (
+    ByteInputStream, ByteOutputStream, ChunkReader, PackedInteger)
+from borneo.exception import IllegalArgumentException, IllegalStateException
+from borneo.operations import QueryResult
+from borneo.serde import (
+    BinaryProtocol, LazyRecord, QueryRequestSerializer, RecordEncoders)
+
+
+class TestBinaryProtocol(unittest.TestCase):
+
+    def testByteInputStreamReads(self):
+        content = (pack('>B', 7) + pack('?', True) + pack('>i', -2) +
+                   pack('>d', 3.5) + b'abc')
+        bis = ByteInputStream(content)
+        self.assertEqual(bis.read_byte(), 7)
+        self.assertTrue(bis.read_boolean())
+        self.assertEqual(bis.read_int(), -2)
+        self.assertEqual(bis.read_float(), 3.5)
+        self.assertEqual(bis.get_offset(), 14)
+        buf = bytearray(3)
+        bis.read_fully(buf)
+        self.assertEqual(buf, bytearray(b'abc'))
+        self.assertRaises(IndexError, bis.read_byte)
+
+    def testByteInputStreamNoCopy(self):
+        content = bytearray(b'0123456789')
+        bis = ByteInputStream(content)
+        bis.skip(2)
+        view = bis.read_bytes(3)
+        self.assertEqual(bytes(view), b'234')
+        self.assertEqual(bis.get_offset(), 5)
+        # the content itself is left untouched by reading.
+        self.assertEqual(content, bytearray(b'0123456789'))
+        self.assertRaises(IndexError, bis.read_bytes, 6)
+        self.assertEqual(bis.get_offset(), 5)
+
+    def testByteOutputStreamWrites(self):
+        bos = ByteOutputStream(bytearray(4))
+        bos.write_byte(7)
+        bos.write_boolean(True)
+        bos.write_short_int(1)
+        bos.write_int(0)
+        bos.write_float(3.5)
+        bos.write_bytearray(bytearray(b'xabcx'), 1, 4)
+        bos.write_int_at_offset(4, -2)
+        self.assertEqual(bos.get_offset(), 19)
+        self.assertGreaterEqual(bos.get_capacity(), 19)
+        self.assertEqual(
+            bos.get_content().tobytes(),
+            pack('>B', 7) + pack('?', True) + pack('>h', 1) + pack('>i', -2) +
+            pack('>d', 3.5) + b'abc')
+
+    def testByteOutputStreamReuse(self):
+        bos = ByteOutputStream(bytearray(16))
+        bos.write_bytearray(b'0123456789')
+        view = bos.get_content()
+        bos.reset()
+        bos.write_bytearray(b'abc')
+        self.assertEqual(bos.get_content().tobytes(), b'abc')
+        self.assertEqual(bos.get_capacity(), 16)
+        # growing while an earlier view is alive moves to a new buffer.
+        bos.write_bytearray(bytearray(100))
+        self.assertEqual(bos.get_offset(), 103)
+        self.assertEqual(bos.get_content().tobytes()[:3], b'abc')
+        self.assertEqual(view.tobytes(), b'abc3456789')
+
+    def testPackedIntegerEncoding(self):
+        for value, encoded in ((0, b'\x7f'), (-119, b'\x08'), (120, b'\xf7'),
+                               (121, b'\xf8\x00'), (5000, b'\xf9\x13\x0f'),
+                               (-120, b'\x04\xff\xff\xff\xff')):
+            buf = bytearray(PackedInteger.MAX_LENGTH)
+            end = PackedInteger.write_sorted_int(buf, 0, value)
+            self.assertEqual(bytes(buf[:end]), encoded)
+            self.assertEqual(PackedInteger.read_sorted_int(buf, 0), value)
+            self.assertEqual(
+                PackedInteger.get_read_sorted_int_length(buf, 0), end)
+        # the shortest form of a negative value is read as well.
+        self.assertEqual(
+            PackedInteger.read_sorted_int(bytearray(b'\x07\x7f'), 0), -248)
+
+    def testPackedIntegerRoundTrip(self):
+        ints = [-2 ** 31, -70000, -513, -512, -121, -1, 1, 255, 8191, 8192,
+                65657, 2 ** 31 - 1]
+        longs = ints + [-2 ** 63, -2 ** 40 - 7, 2 ** 40 + 7, 2 ** 63 - 1]
+        bos = ByteOutputStream(bytearray(1))
+        for value in ints:
+            BinaryProtocol.write_packed_int(bos, value)
+        for value in longs:
+            BinaryProtocol.write_packed_long(bos, value)
+        bis = ByteInputStream(bos.get_content().tobytes())
+        self.assertEqual(
+            [BinaryProtocol.read_packed_int(bis) for _ in ints], ints)
+        self.assertEqual(
+            [BinaryProtocol.read_packed_long(bis) for _ in longs], longs)
+        self.assertEqual(bis.get_offset(), bos.get_offset())
+        self.assertRaises(IndexError, BinaryProtocol.read_packed_int,
+                          ByteInputStream(b'\xf9\x12'))
+
+    def testFieldValueTypes(self):
+        class Count(int):
+            pass
+
+        values = [
+            ([1], 0), (bytearray(b'a'), 1), (True, 2), (1.5, 3), (1, 5),
+            (Count(7), 5), ({'a': 1}, 6), (OrderedDict(a=1), 6), ('a', 7),
+            (datetime(2019, 1, 2), 7), (Decimal('1.5'), 7), (None, 11)]
+        for value, type_code in values:
+            bos = ByteOutputStream(bytearray())
+            BinaryProtocol.write_field_value(bos, value)
+            self.assertEqual(bytearray(bos.get_content())[0], type_code)
+        bos = ByteOutputStream(bytearray())
+        BinaryProtocol.write_field_value(bos, [False, 2 ** 40, 'x', None])
+        self.assertEqual(
+            bos.get_content().tobytes(),
+            pack('>Bii', 0, 17, 4) + b'\x02\x00' +
+            b'\x05\xfc\xff\xff\xff\xff\x87' + b'\x07\x80x' + b'\x0b')
+        self.assertRaises(IllegalStateException,
+                          BinaryProtocol.write_field_value, bos, object())
+        self.assertRaises(IllegalStateException,
+                          BinaryProtocol.write_field_value, bos, 2 ** 63)
+
+    def testLazyRecord(self):
+        record = OrderedDict([
+            ('id', 10), ('name', 'jack'), ('blob', bytearray(b'xyz')),
+            ('ok', True), ('score', 2.5), ('none', None),
+            ('tags', ['a', {'k': 1}, [2, 3]]),
+            ('info', {'city': 'SF', 'zip': {'code': 94000}}),
+            ('big', 2 ** 40), ('empty', '')])
+        bos = ByteOutputStream(bytearray())
+        BinaryProtocol.write_field_value(bos, record)
+        BinaryProtocol.write_field_value(bos, 'after')
+        content = bos.get_content().tobytes()
+
+        bis = ByteInputStream(content)
+        value = BinaryProtocol.read_lazy_field_value(bis)
+        # the whole map is skipped without decoding any field.
+        self.assertEqual(BinaryProtocol.read_field_value(bis), 'after')
+        self.assertIsInstance(value, LazyRecord)
+        self.assertEqual(len(value), len(record))
+        self.assertEqual(value['name'], 'jack')
+        self.assertIs(value['name'], value['name'])
+        self.assertIsInstance(value['info'], LazyRecord)
+        self.assertEqual(value['info']['zip']['code'], 94000)
+        self.assertIsInstance(value['tags'][1], LazyRecord)
+        self.assertEqual(value.get('missing', 1), 1)
+        self.assertRaises(KeyError, value.__getitem__, 'missing')
+        self.assertTrue('blob' in value)
+        self.assertEqual(value, dict(record))
+        self.assertEqual(
+            value, BinaryProtocol.read_field_value(ByteInputStream(content)))
+        self.assertFalse(hasattr(value, '__setitem__'))
+
+    def testReadTimestamp(self):
+        values = [('2019-05-02T10:23:42', datetime(2019, 5, 2, 10, 23, 42)),
+                  ('2019-05-02T10:23:42.5', datetime(2019, 5, 2, 10, 23, 42,
+                                                     500000)),
+                  ('2019-05-02T10:23:42.123', datetime(2019, 5, 2, 10, 23, 42,
+                                                       123000)),
+                  ('2019-05-02T10:23:42.123456789',
+                   datetime(2019, 5, 2, 10, 23, 42, 123457)),
+                  ('2019-05-02T10:23:42.9999994',
+                   datetime(2019, 5, 2, 10, 23, 42, 999999)),
+                  ('2019-12-31T23:59:59.9999995', datetime(2020, 1, 1)),
+                  ('2019-5-2T1:2:3', datetime(2019, 5, 2, 1, 2, 3))]
+        for value, expected in values:
+            bos = ByteOutputStream(bytearray())
+            BinaryProtocol.write_string(bos, value)
+            self.assertEqual(BinaryProtocol.read_datetime(
+                ByteInputStream(bos.get_content().tobytes())), expected)
+        for value in ('2019-05-02T10:23:42Z', '2019-05-02 10:23:42',
+                      '2019-05-02T10:23:42.', '2019-02-30T10:23:42'):
+            bos = ByteOutputStream(bytearray())
+            BinaryProtocol.write_string(bos, value)
+            self.assertRaises(ValueError, BinaryProtocol.read_datetime,
+                              ByteInputStream(bos.get_content().tobytes()))
+
+    def testReadRawValues(self):
+        bos = ByteOutputStream(bytearray())
+        bos.write_byte(BinaryProtocol.FIELD_VALUE_TYPE.ARRAY)
+        start = bos.get_offset()
+        bos.write_int(0)
+        bos.write_int(2)
+        bos.write_byte(BinaryProtocol.FIELD_VALUE_TYPE.TIMESTAMP)
+        BinaryProtocol.write_string(bos, '2019-05-02T10:23:42.123')
+        bos.write_byte(BinaryProtocol.FIELD_VALUE_TYPE.NUMBER)
+        BinaryProtocol.write_string(bos, '1.50')
+        bos.write_int_at_offset(start, bos.get_offset() - start - 4)
+        content = bos.get_content().tobytes()
+        self.assertEqual(
+            BinaryProtocol.read_field_value(ByteInputStream(content)),
+            [datetime(2019, 5, 2, 10, 23, 42, 123000), Decimal('1.50')])
+        self.assertEqual(
+            BinaryProtocol.read_field_value(ByteInputStream(content), True),
+            ['2019-05-02T10:23:42.123', '1.50'])
+        self.assertEqual(BinaryProtocol.read_lazy_field_value(
+            ByteInputStream(content), True),
+            ['2019-05-02T10:23:42.123', '1.50'])
+
+    def testSkipFieldValue(self):
+        values = [[1, [2]], bytearray(b'ab'), False, 1.5, 2 ** 50, -300,
+                  {'a': {'b': None}}, 'abc', datetime(2019, 1, 2),
+                  Decimal('1.5'), None]
+        bos = ByteOutputStream(bytearray())
+        for value in values:
+            BinaryProtocol.write_field_value(bos, value)
+            BinaryProtocol.write_field_value(bos, 'end')
+        bis = ByteInputStream(bos.get_content().tobytes())
+        for _ in values:
+            BinaryProtocol.skip_field_value(bis)
+            self.assertEqual(BinaryProtocol.read_field_value(bis), 'end')
+        self.assertEqual(bis.get_offset(), bos.get_offset())
+
+    def testRecordEncoder(self):
+        encoders = RecordEncoders()
+        schema = ('{"fields": [{"name": "id", "type": "INTEGER"}, ' +
+                  '{"name": "doc", "type": "JSON"}]}')
+        encoders.set_schema('recordEncoderTable', schema)
+        # a schema that can't be used is ignored.
+        encoders.set_schema('recordEncoderTable', '{"fields": 1}')
+        encoder = encoders.for_table('recordEncoderTable')
+        self.assertIs(encoders.for_table('RecordEncoderTable'), encoder)
+        # the plan is only replaced when the schema changes.
+        encoders.set_schema('recordEncoderTable', schema)
+        self.assertIs(encoders.for_table('recordEncoderTable'), encoder)
+        encoders.set_schema('recordEncoderTable', schema.replace(
+            'INTEGER', 'LONG'))
+        self.assertIsNot(encoders.for_table('recordEncoderTable'), encoder)
+        # the plans of other clients are their own.
+        self.assertIsNot(RecordEncoders().for_table('recordEncoderTable'),
+                         encoder)
+        rows = [{'id': 1, 'doc': None}, {'id': 2, 'doc': {'a': [1]}},
+                {'id': True, 'doc': 'text', 'name': 'x'},
+                {'id': 2 ** 40, 'name': None, 'other': 1.5},
+                OrderedDict([('name', 'y'), ('id', 3)]), {}]
+        for row in rows:
+            expected = ByteOutputStream(bytearray())
+            BinaryProtocol.write_field_value(expected, row)
+            bos = ByteOutputStream(bytearray())
+            encoder.write(bos, row)
+            self.assertEqual(bos.get_content().tobytes(),
+                             expected.get_content().tobytes())
+        bos = ByteOutputStream(bytearray())
+        self.assertRaises(IllegalArgumentException, encoder.write, bos,
+                          {'id': 1, 2: 'x'})
+        self.assertRaises(IllegalStateException, encoder.write, bos,
+                          {'id': 2 ** 64})
+
+    def testRequestPrefix(self):
+        config = NoSQLHandleConfig('localhost:8080')
+        requests = [
+            (GetRequest().set_table_name('prefixTable').set_consistency(
+                Consistency.ABSOLUTE), BinaryProtocol.OP_CODE.GET, True),
+            (GetRequest().set_table_name('prefixTable').set_timeout(
+                70000), BinaryProtocol.OP_CODE.GET, True),
+            (PutRequest().set_table_name('prefixTable').set_return_row(True),
+             BinaryProtocol.OP_CODE.PUT, False),
+            (DeleteRequest().set_table_name('prefixTable'),
+             BinaryProtocol.OP_CODE.DELETE, False)]
+        for request, op, read in requests * 2:
+            request.set_defaults(config)
+            expected = ByteOutputStream(bytearray())
+            BinaryProtocol.write_op_code(expected, op)
+            if read:
+                BinaryProtocol.serialize_read_request(request, expected)
+            else:
+                BinaryProtocol.serialize_write_request(request, expected)
+            bos = ByteOutputStream(bytearray())
+            BinaryProtocol.write_request_prefix(bos, op, request, read)
+            self.assertEqual(bos.get_content().tobytes(),
+                             expected.get_content().tobytes())
+
+    def testChunkReader(self):
+        closed = list()
+        reader = ChunkReader([b'ab', b'', b'cde', b'f'],
+                             lambda: closed.append(True))
+        self.assertEqual(reader.peek(3), b'abc')
+        self.assertEqual(reader.read(1), b'a')
+        self.assertEqual(reader.read(4), b'bcde')
+        self.assertEqual(reader.peek(5), b'f')
+        self.assertRaises(IOError, reader.read, 2)
+        self.assertEqual(reader.read_all(), b'f')
+        reader.close()
+        reader.close()
+        self.assertEqual(closed, [True])
+
+    def testStreamQueryResults(self):
+        rows = [{'id': i, 'name': 'x' * (i * 700), 'tags': [i, None]}
+                for i in range(10)] + [12]
+        bos = ByteOutputStream(bytearray())
+        bos.write_int(len(rows))
+        for row in rows:
+            BinaryProtocol.write_field_value(bos, row)
+        for units in (3, 2, 0):
+            BinaryProtocol.write_packed_int(bos, units)
+        BinaryProtocol.write_bytearray(bos, bytearray(b'next'))
+        content = bos.get_content().tobytes()
+        chunks = [content[i:i + 100] for i in range(0, len(content), 100)]
+        closed = list()
+        result = QueryRequestSerializer(QueryResult).deserialize_stream(
+            ChunkReader(chunks, lambda: closed.append(True)))
+        results = result.get_results()
+        self.assertEqual(next(results), rows[0])
+        self.assertIsNone(result.get_continuation_key())
+        self.assertEqual(list(results), rows[1:])
+        self.assertEqual(result.get_read_units(), 3)
+        self.assertEqual(result.get_read_kb(), 2)
+        self.assertEqual(result.get_continuation_key(), bytearray(b'next'))
+        self.assertEqual(closed, [True])
+        # a truncated response fails, and the reader is closed.
+        result = QueryRequestSerializer(QueryResult).deserialize_stream(
+            ChunkReader(chunks[:-5], lambda: closed.append(True)))
+        self.assertRaises(IOError, list, result.get_results())
+        self.assertEqual(closed, [True, True])
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed.')
+    def testColumnarQueryResults(self):
+        long_name = 'n' * 200
+        rows = [{'id': 1, 'score': 1, 'name': 'a', 'ok': True, 'mix': 1},
+                {'id': 2 ** 40, 'score': 2.5, 'name': None, 'ok': False,
+                 'mix': 'x', long_name: [1, 2]},
+                {'name': 'b' * 300, 'id': -300, 'ok': None, 'mix': True},
+                {'id': None, 'doc': {'a': 1}, 'name': ''}]
+        bos = ByteOutputStream(bytearray())
+        bos.write_int(len(rows))
+        for row in rows:
+            BinaryProtocol.write_field_value(bos, row)
+        for units in (3, 2, 0):
+            BinaryProtocol.write_packed_int(bos, units)
+        BinaryProtocol.write_bytearray(bos, None)
+        result = QueryRequestSerializer(
+            QueryResult, columnar_results=True).deserialize(
+            ByteInputStream(bos.get_content().tobytes()))
+        self.assertIsNone(result.get_results())
+        self.assertEqual(result.get_read_units(), 3)
+        columns = result.get_columns()
+        self.assertEqual(list(columns), ['id', 'score', 'name', 'ok', 'mix',
+                                         long_name, 'doc'])
+        expected = {'id': ('int64', [1, 2 ** 40, -300, None]),
+                    'score': ('float64', [1.0, 2.5, None, None]),
+                    'name': ('object', ['a', None, 'b' * 300, '']),
+                    'ok': ('bool', [True, False, None, None]),
+                    'mix': ('object', [1, 'x', True, None]),
+                    long_name: ('object', [None, [1, 2], None, None]),
+                    'doc': ('object', [None, None, None, {'a': 1}])}
+        for name, (dtype, values) in expected.items():
+            column = columns[name]
+            self.assertEqual(column.dtype, numpy.dtype(dtype))
+            self.assertEqual(list(column.mask),
+                             [value is None for value in values])
+            self.assertEqual(column.tolist(), values)
+        # a query that doesn't return maps can't return columns.
+        bos = ByteOutputStream(bytearray())
+        bos.write_int(1)
+        BinaryProtocol.write_field_value(bos, 1)
+        self.assertRaises(
+            IllegalStateException, QueryRequestSerializer(
+                QueryResult, columnar_results=True).deserialize,
+            ByteInputStream(bos.get_content().tobytes()))
+
+
+if __name__ == '__main__':
+    unittest.main()
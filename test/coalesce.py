@@ -0,0 +1,133 @@
+#
+# Copyright (C) 2018, 2019 Oracle and/or its affiliates. All rights reserved.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl
+#
+# Please see LICENSE.txt file included in the top-level directory of the
+# appropriate download for a copy of the license and additional information.
+#
+
+import unittest
+from threading import Lock, Thread
+
+from borneo import (
+    Consistency, GetRequest, IllegalArgumentException, NoSQLHandle,
+    PutRequest, QueryRequest, TableNotFoundException)
+from borneo.serde import BinaryProtocol
+from stand_in_server import StandInTestCase, get_stand_in_config
+
+
+class TestCoalesce(StandInTestCase):
+    def setUp(self):
+        super(TestCoalesce, self).setUp()
+        self.server.tables['users'] = dict(
+            (key, {'id': key, 'name': 'name' + str(key)}) for key in range(3))
+        self.server.delay = 0.2
+
+    def create_handle(self):
+        return NoSQLHandle(get_stand_in_config(
+            self.server).set_coalesce_reads(True).set_coalesce_queries(True))
+
+    def testCoalesceIllegalConfig(self):
+        config = get_stand_in_config(self.server)
+        self.assertRaises(IllegalArgumentException, config.set_coalesce_reads,
+                          'IllegalCoalesceReads')
+        self.assertRaises(IllegalArgumentException,
+                          config.set_coalesce_queries, 'IllegalCoalesceQueries')
+        self.assertFalse(config.get_coalesce_reads())
+        self.assertFalse(config.get_coalesce_queries())
+
+    def testCoalesceGets(self):
+        results = self.__run([self.__get(1) for count in range(5)])
+        self.assertEqual(self.server.num_requests, 1)
+        for result in results:
+            self.assertEqual(result.get_value(), {'id': 1, 'name': 'name1'})
+        # the results are copies, only one of them consumed throughput.
+        self.assertEqual(len(set(id(result.get_value())
+                                 for result in results)), 5)
+        self.assertEqual(sorted(result.get_read_units() for result in results),
+                         [0, 0, 0, 0, 1])
+        # the gets of other keys or with another consistency are not shared.
+        self.server.num_requests = 0
+        self.__run([self.__get(1), self.__get(2), self.__get(1).set_consistency(
+            Consistency.ABSOLUTE)])
+        self.assertEqual(self.server.num_requests, 3)
+        # nor those whose values are decoded differently.
+        self.server.num_requests = 0
+        self.__run([self.__get(1), self.__get(1).set_raw_values(True)])
+        self.assertEqual(self.server.num_requests, 2)
+        # the gets with lazy values are never shared.
+        self.server.num_requests = 0
+        results = self.__run([self.__get(1).set_lazy_values(True)
+                              for count in range(2)])
+        self.assertEqual(self.server.num_requests, 2)
+        self.assertIsNot(results[0].get_value(), results[1].get_value())
+
+    def testCoalesceQueries(self):
+        results = self.__run([self.__query() for count in range(4)])
+        self.assertEqual(self.server.num_requests, 1)
+        for result in results:
+            self.assertEqual([row['id'] for row in result.get_results()],
+                             [0, 1])
+            self.assertEqual(bytes(result.get_continuation_key()), b'2')
+        # the next pages are not shared with the first ones.
+        self.server.num_requests = 0
+        self.__run([self.__query(), self.__query().set_continuation_key(
+            bytearray(b'2'))])
+        self.assertEqual(self.server.num_requests, 2)
+
+    def testCoalesceDisabled(self):
+        self.handle.close()
+        self.handle = NoSQLHandle(get_stand_in_config(self.server))
+        self.__run([self.__get(1) for count in range(3)] +
+                   [self.__query() for count in range(3)])
+        self.assertEqual(self.server.num_requests, 6)
+
+    def testCoalesceWrites(self):
+        self.__run([PutRequest().set_table_name('users').set_value(
+            {'id': 1}) for count in range(3)])
+        self.assertEqual(self.server.num_requests, 3)
+
+    def testCoalesceFailure(self):
+        self.server.errors = [BinaryProtocol.USER_ERROR.TABLE_NOT_FOUND]
+        results = self.__run([self.__get(1) for count in range(3)])
+        self.assertEqual(self.server.num_requests, 1)
+        for result in results:
+            self.assertIsInstance(result, TableNotFoundException)
+
+    def __run(self, requests):
+        # Runs the requests concurrently, returning their results or
+        # exceptions.
+        results = list()
+        lock = Lock()
+
+        def run(request):
+            try:
+                result = (self.handle.query(request)
+                          if isinstance(request, QueryRequest) else
+                          self.handle.get(request)
+                          if isinstance(request, GetRequest) else
+                          self.handle.put(request))
+            except TableNotFoundException as e:
+                result = e
+            with lock:
+                results.append(result)
+
+        threads = [Thread(target=run, args=(request,)) for request in requests]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    @staticmethod
+    def __get(key):
+        return GetRequest().set_table_name('users').set_key({'id': key})
+
+    @staticmethod
+    def __query():
+        return QueryRequest().set_statement('SELECT * FROM users').set_limit(2)
+
+
+if __name__ == '__main__':
+    unittest.main()
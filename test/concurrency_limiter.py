@@ -0,0 +1,128 @@
+#
+# Copyright (C) 2018, 2019 Oracle and/or its affiliates. All rights reserved.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl
+#
+# Please see LICENSE.txt file included in the top-level directory of the
+# appropriate download for a copy of the license and additional information.
+#
+
+import unittest
+from threading import Lock, Thread
+from time import time
+
+from borneo import (
+    ConcurrencyLimitException, GetRequest, IllegalArgumentException,
+    NoSQLException, NoSQLHandle, QueryRequest, RequestTimeoutException)
+from borneo.limiter import ConcurrencyLimiter
+from borneo.serde import BinaryProtocol
+from stand_in_server import StandInTestCase, get_stand_in_config
+
+
+class TestConcurrencyLimiter(StandInTestCase):
+    def setUp(self):
+        super(TestConcurrencyLimiter, self).setUp()
+        self.server.tables['users'] = {0: {'id': 0}}
+
+    def create_handle(self):
+        return NoSQLHandle(get_stand_in_config(
+            self.server, 2).set_adaptive_concurrency_enabled(
+            True).set_concurrency_queue_timeout(50))
+
+    def testConcurrencyLimiterIllegalConfig(self):
+        config = get_stand_in_config(self.server)
+        self.assertRaises(IllegalArgumentException,
+                          config.set_adaptive_concurrency_enabled,
+                          'IllegalEnabled')
+        self.assertRaises(IllegalArgumentException,
+                          config.set_concurrency_queue_timeout, -1)
+        self.assertFalse(config.get_adaptive_concurrency_enabled())
+        self.assertEqual(config.get_concurrency_queue_timeout(), 0)
+        handle = NoSQLHandle(config)
+        self.assertIsNone(handle.get_concurrency_stats())
+        handle.close()
+
+    def testConcurrencyLimiterAdapts(self):
+        limiter = ConcurrencyLimiter(4)
+        starts = [limiter.acquire(1) for count in range(4)]
+        self.assertIsNone(limiter.acquire(0.05))
+        self.assertEqual(limiter.get_stats(),
+                         {'limit': 4, 'in_flight': 4, 'queue_depth': 0})
+        # the limit is decreased by an overloaded request, to 3.6.
+        limiter.release(starts.pop(), True)
+        self.assertIsNone(limiter.acquire(0.05))
+        self.assertEqual(limiter.get_stats()['limit'], 3)
+        # and increased again by the requests that aren't.
+        for start in starts:
+            limiter.release(start, False)
+        self.assertEqual(limiter.get_stats(),
+                         {'limit': 4, 'in_flight': 0, 'queue_depth': 0})
+
+    def testConcurrencyLimiterStreamedQuery(self):
+        result = self.handle.query(QueryRequest().set_statement(
+            'SELECT * FROM users').set_stream_results(True))
+        # the request is in flight until its results are read.
+        self.assertEqual(self.handle.get_concurrency_stats()['in_flight'], 1)
+        self.assertEqual(list(result.get_results()), [{'id': 0}])
+        self.assertEqual(self.handle.get_concurrency_stats()['in_flight'], 0)
+
+    def testConcurrencyLimiterStreamError(self):
+        # the response is larger than the chunks it is read in.
+        self.server.tables['users'] = {
+            key: {'id': key, 'name': 'name' * 100} for key in range(100)}
+        self.server.truncate = 1
+        result = self.handle.query(QueryRequest().set_statement(
+            'SELECT * FROM users').set_stream_results(True))
+        # the error reading the response is wrapped, and the request released.
+        self.assertRaises(NoSQLException, list, result.get_results())
+        self.assertEqual(self.handle.get_concurrency_stats()['in_flight'], 0)
+
+    def testConcurrencyLimiterQueueTimeout(self):
+        self.server.delay = 0.3
+        results = self.__run(4)
+        self.assertEqual(results.count({'id': 0}), 2)
+        self.assertEqual(len([result for result in results if isinstance(
+            result, ConcurrencyLimitException)]), 2)
+        self.assertEqual(self.server.num_requests, 2)
+        self.assertEqual(self.handle.get_concurrency_stats(),
+                         {'limit': 2, 'in_flight': 0, 'queue_depth': 0})
+
+    def testConcurrencyLimiterThrottling(self):
+        self.handle.close()
+        self.handle = NoSQLHandle(get_stand_in_config(
+            self.server).set_adaptive_concurrency_enabled(True))
+        self.server.errors = [
+            BinaryProtocol.THROTTLING_ERROR.READ_LIMIT_EXCEEDED] * 2
+        start = time()
+        self.assertEqual(self.__get().get_value(), {'id': 0})
+        self.assertLess(time() - start, 1)
+        # 10 is decreased to 8.1 and then increased to 8.2.
+        self.assertEqual(self.handle.get_concurrency_stats()['limit'], 8)
+
+    def __get(self):
+        return self.handle.get(GetRequest().set_table_name('users').set_key(
+            {'id': 0}))
+
+    def __run(self, count):
+        # Runs count concurrent gets, returning their values or exceptions.
+        results = list()
+        lock = Lock()
+
+        def run():
+            try:
+                result = self.__get().get_value()
+            except RequestTimeoutException as e:
+                result = e
+            with lock:
+                results.append(result)
+
+        threads = [Thread(target=run) for index in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -93,6 +93,10 @@ PRIMARY KEY(SHARD(fld_sid), fld_id)) USING TTL ' + str(table_ttl))
                           self.get_request.set_consistency,
                           'IllegalConsistency')
 
+    def testGetSetIllegalRawValues(self):
+        self.assertRaises(IllegalArgumentException,
+                          self.get_request.set_raw_values, 'IllegalRawValues')
+
     def testGetSetIllegalTimeout(self):
         self.assertRaises(IllegalArgumentException,
                           self.get_request.set_timeout, 'IllegalTimeout')
@@ -0,0 +1,85 @@
+#
+# Copyright (C) 2018, 2019 Oracle and/or its affiliates. All rights reserved.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl
+#
+# Please see LICENSE.txt file included in the top-level directory of the
+# appropriate download for a copy of the license and additional information.
+#
+
+import unittest
+from time import time
+
+from borneo import (
+    Consistency, GetManyResult, IllegalArgumentException, NoSQLHandle,
+    PutRequest, RequestTimeoutException, TableNotFoundException)
+from borneo.serde import BinaryProtocol
+from stand_in_server import StandInTestCase, get_stand_in_config
+
+
+class TestGetMany(StandInTestCase):
+    def setUp(self):
+        super(TestGetMany, self).setUp()
+        for key in range(5):
+            self.handle.put(PutRequest().set_table_name('users').set_value(
+                {'id': key, 'name': 'name' + str(key)}))
+
+    def create_handle(self):
+        return NoSQLHandle(get_stand_in_config(self.server, 4))
+
+    def testGetManyIllegalParameters(self):
+        self.assertRaises(IllegalArgumentException, self.handle.get_many,
+                          None, [{'id': 1}])
+        self.assertRaises(IllegalArgumentException, self.handle.get_many,
+                          'users', [{'id': 1}, 'IllegalKey'])
+        self.assertRaises(IllegalArgumentException, self.handle.get_many,
+                          'users', [{'id': 1}], 'IllegalConsistency')
+        self.assertRaises(IllegalArgumentException, self.handle.get_many,
+                          'users', [{'id': 1}], timeout_ms=0)
+
+    def testGetManyEmpty(self):
+        result = self.handle.get_many('users', [])
+        self.assertIsInstance(result, GetManyResult)
+        self.assertEqual(result.size(), 0)
+        self.assertEqual(result.get_read_units(), 0)
+
+    def testGetManyOrderAndDuplicates(self):
+        keys = [{'id': key} for key in [3, 7, 0, 3, 4, 0, 1]]
+        num_requests = self.server.num_requests
+        result = self.handle.get_many('users', keys, Consistency.ABSOLUTE)
+        self.assertEqual(self.server.num_requests - num_requests, 5)
+        self.assertEqual(result.size(), 5)
+        self.assertEqual(
+            [None if get_result.get_value() is None else
+             get_result.get_value()['id']
+             for get_result in result.get_results()], [3, None, 0, 4, 1])
+        self.assertEqual(result.get_read_units(), 5)
+        self.assertEqual(result.get_read_kb(), 5)
+        self.assertEqual(result.get_write_kb(), 0)
+
+    def testGetManyConcurrent(self):
+        self.server.delay = 0.1
+        start = time()
+        result = self.handle.get_many('users', [{'id': key}
+                                                for key in range(8)])
+        # the gets run 4 at a time rather than in turn.
+        self.assertLess(time() - start, 0.6)
+        self.assertEqual(result.size(), 8)
+        self.assertEqual(self.server.max_active, 4)
+
+    def testGetManyFailure(self):
+        self.server.errors = [BinaryProtocol.USER_ERROR.TABLE_NOT_FOUND]
+        self.assertRaises(TableNotFoundException, self.handle.get_many,
+                          'users', [{'id': key} for key in range(3)])
+
+    def testGetManyTimeout(self):
+        self.server.delay = 0.3
+        start = time()
+        self.assertRaises(RequestTimeoutException, self.handle.get_many,
+                          'users', [{'id': key} for key in range(16)], None,
+                          1000)
+        self.assertLess(time() - start, 1.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
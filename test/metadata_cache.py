@@ -0,0 +1,135 @@
+#
+# Copyright (C) 2018, 2019 Oracle and/or its affiliates. All rights reserved.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl
+#
+# Please see LICENSE.txt file included in the top-level directory of the
+# appropriate download for a copy of the license and additional information.
+#
+
+import unittest
+from threading import Thread
+from time import sleep
+
+from borneo import (
+    GetTableRequest, IllegalArgumentException, ListTablesRequest, NoSQLHandle,
+    State, TableLimits, TableNotFoundException, TableRequest)
+from borneo.serde import BinaryProtocol
+from stand_in_server import StandInTestCase, get_stand_in_config
+
+
+class TestMetadataCache(StandInTestCase):
+    def setUp(self):
+        super(TestMetadataCache, self).setUp()
+        self.server.tables['users'] = dict()
+        self.server.tables['other'] = dict()
+
+    def create_handle(self):
+        return NoSQLHandle(get_stand_in_config(
+            self.server).set_metadata_cache_ttl(10000))
+
+    def testMetadataCacheIllegalConfig(self):
+        config = get_stand_in_config(self.server)
+        self.assertRaises(IllegalArgumentException,
+                          config.set_metadata_cache_ttl, -1)
+        self.assertEqual(config.get_metadata_cache_ttl(), 0)
+
+    def testMetadataCacheGetTable(self):
+        # the tables that aren't active are not cached.
+        for count in range(3):
+            self.assertEqual(self.__get_table('users').get_state(),
+                             State.CREATING if count < 2 else State.ACTIVE)
+        self.assertEqual(self.__get_table('USERS').get_state(), State.ACTIVE)
+        self.assertEqual(self.server.num_requests, 3)
+        # the polls of operations are not cached.
+        self.handle.get_table(GetTableRequest().set_table_name(
+            'users').set_operation_id('op'))
+        self.assertEqual(self.server.num_requests, 4)
+        self.__get_table('other')
+        self.__get_table('other')
+        self.assertEqual(self.server.num_requests, 5)
+        # the exceptions are not cached.
+        for count in range(2):
+            self.assertRaises(TableNotFoundException, self.__get_table,
+                              'missing')
+        self.assertEqual(self.server.num_requests, 7)
+
+    def testMetadataCacheListTables(self):
+        for count in range(2):
+            self.assertEqual(self.handle.list_tables(
+                ListTablesRequest()).get_tables(), ['other', 'users'])
+            self.assertEqual(self.handle.list_tables(
+                ListTablesRequest().set_limit(1)).get_tables(), ['other'])
+        self.assertEqual(self.server.num_requests, 2)
+
+    def testMetadataCacheCopies(self):
+        self.handle.list_tables(ListTablesRequest()).get_tables().append(
+            'changed')
+        self.assertEqual(self.handle.list_tables(
+            ListTablesRequest()).get_tables(), ['other', 'users'])
+        self.handle.list_tables(ListTablesRequest()).get_tables().pop()
+        self.assertEqual(self.handle.list_tables(
+            ListTablesRequest()).get_tables(), ['other', 'users'])
+        self.assertEqual(self.server.num_requests, 1)
+
+    def testMetadataCacheTableRequest(self):
+        self.server.polls = 3
+        self.__get_table('users')
+        self.handle.list_tables(ListTablesRequest())
+        self.handle.table_request(TableRequest().set_statement(
+            'CREATE TABLE third(id INTEGER, PRIMARY KEY(id))').set_table_limits(
+            TableLimits(100, 100, 1)))
+        self.assertEqual(self.__get_table('users').get_state(),
+                         State.CREATING)
+        self.assertEqual(self.handle.list_tables(
+            ListTablesRequest()).get_tables(), ['other', 'third', 'users'])
+        self.assertEqual(self.server.num_requests, 5)
+
+    def testMetadataCacheExpiration(self):
+        self.handle.close()
+        self.handle = NoSQLHandle(get_stand_in_config(
+            self.server).set_metadata_cache_ttl(100))
+        self.handle.list_tables(ListTablesRequest())
+        self.handle.list_tables(ListTablesRequest())
+        self.assertEqual(self.server.num_requests, 1)
+        sleep(0.15)
+        self.handle.list_tables(ListTablesRequest())
+        self.assertEqual(self.server.num_requests, 2)
+
+    def testMetadataCacheSharedFetch(self):
+        self.server.delay = 0.2
+        results = list()
+        threads = [Thread(target=lambda: results.append(
+            self.__get_table('users'))) for count in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(results), 5)
+        # the table is creating so it's not cached, but the concurrent gets
+        # share one request.
+        self.assertEqual(self.server.num_requests, 1)
+        self.server.errors = [BinaryProtocol.USER_ERROR.TABLE_NOT_FOUND]
+        errors = list()
+
+        def get_table():
+            try:
+                self.__get_table('users')
+            except TableNotFoundException as e:
+                errors.append(e)
+
+        threads = [Thread(target=get_table) for count in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(errors), 5)
+        self.assertEqual(self.server.num_requests, 2)
+
+    def __get_table(self, table_name):
+        return self.handle.get_table(GetTableRequest().set_table_name(
+            table_name))
+
+
+if __name__ == '__main__':
+    unittest.main()
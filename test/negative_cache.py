@@ -0,0 +1,105 @@
+#
+# Copyright (C) 2018, 2019 Oracle and/or its affiliates. All rights reserved.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl
+#
+# Please see LICENSE.txt file included in the top-level directory of the
+# appropriate download for a copy of the license and additional information.
+#
+
+import unittest
+from time import sleep
+
+from borneo import (
+    Consistency, GetRequest, IllegalArgumentException, NoSQLHandle,
+    PutRequest, QueryRequest, WriteMultipleRequest)
+from stand_in_server import StandInTestCase, get_stand_in_config
+
+
+class TestNegativeCache(StandInTestCase):
+    def setUp(self):
+        super(TestNegativeCache, self).setUp()
+        self.server.tables['users'] = {0: {'id': 0}}
+
+    def create_handle(self):
+        return NoSQLHandle(get_stand_in_config(
+            self.server).set_negative_cache(2, 10000))
+
+    def testNegativeCacheIllegalConfig(self):
+        config = get_stand_in_config(self.server)
+        self.assertRaises(IllegalArgumentException, config.set_negative_cache,
+                          -1, 1000)
+        self.assertRaises(IllegalArgumentException, config.set_negative_cache,
+                          10, 0)
+        self.assertIsNone(config.get_negative_cache())
+        config.set_negative_cache(10, 1000)
+        self.assertEqual(config.get_negative_cache(), (10, 1000))
+        config.set_negative_cache(0, 1000)
+        self.assertIsNone(config.get_negative_cache())
+        self.assertIsNone(NoSQLHandle(config).get_negative_cache_stats())
+
+    def testNegativeCacheHits(self):
+        for count in range(3):
+            result = self.__get(1)
+            self.assertIsNone(result.get_value())
+            self.assertEqual(result.get_read_units(), 0 if count else 1)
+        self.assertEqual(self.server.num_requests, 1)
+        # the rows that exist are not cached.
+        self.__get(0)
+        self.__get(0)
+        self.assertEqual(self.server.num_requests, 3)
+        self.assertEqual(self.handle.get_negative_cache_stats(),
+                         {'hits': 2, 'misses': 3, 'size': 1})
+        # the keys are cached by table.
+        self.handle.get(GetRequest().set_table_name('other').set_key(
+            {'id': 1}))
+        self.assertEqual(self.server.num_requests, 4)
+        self.handle.get(GetRequest().set_table_name('users').set_key(
+            {'id': 1}).set_consistency(Consistency.ABSOLUTE))
+        self.assertEqual(self.server.num_requests, 5)
+
+    def testNegativeCacheEviction(self):
+        self.handle.close()
+        self.handle = NoSQLHandle(get_stand_in_config(
+            self.server).set_negative_cache(2, 100))
+        for key in range(1, 4):
+            self.__get(key)
+        # the least recently used key has been evicted.
+        self.__get(1)
+        self.assertEqual(self.server.num_requests, 4)
+        self.__get(3)
+        self.assertEqual(self.server.num_requests, 4)
+        sleep(0.15)
+        self.__get(3)
+        self.assertEqual(self.server.num_requests, 5)
+
+    def testNegativeCacheInvalidation(self):
+        self.__get(1)
+        self.__get(2)
+        self.handle.put(PutRequest().set_table_name('users').set_value(
+            {'id': 1, 'name': 'put'}))
+        self.assertEqual(self.__get(1).get_value()['name'], 'put')
+        request = WriteMultipleRequest()
+        request.add(PutRequest().set_table_name('users').set_value(
+            {'id': 2, 'name': 'batch'}), False)
+        self.handle.write_multiple(request)
+        self.assertEqual(self.__get(2).get_value()['name'], 'batch')
+        self.assertEqual(self.handle.get_negative_cache_stats()['hits'], 0)
+
+    def testNegativeCacheQueryInvalidation(self):
+        self.assertIsNone(self.__get(1).get_value())
+        self.handle.query(QueryRequest().set_statement('SELECT * FROM users'))
+        self.assertIsNone(self.__get(1).get_value())
+        self.assertEqual(self.server.num_requests, 2)
+        self.handle.query(QueryRequest().set_statement(
+            'UPSERT INTO users VALUES {"id": 1}'))
+        self.assertEqual(self.__get(1).get_value(), {'id': 1})
+        self.assertEqual(self.server.num_requests, 4)
+
+    def __get(self, key):
+        return self.handle.get(GetRequest().set_table_name('users').set_key(
+            {'id': key}))
+
+
+if __name__ == '__main__':
+    unittest.main()
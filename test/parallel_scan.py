@@ -0,0 +1,189 @@
+#
+# Copyright (C) 2018, 2019 Oracle and/or its affiliates. All rights reserved.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl
+#
+# Please see LICENSE.txt file included in the top-level directory of the
+# appropriate download for a copy of the license and additional information.
+#
+
+import unittest
+from decimal import Decimal
+from threading import Lock
+
+from borneo import (
+    IllegalArgumentException, IllegalStateException, NoSQLHandle,
+    ParallelScan, PutRequest, TableNotFoundException)
+from borneo.serde import BinaryProtocol
+from stand_in_server import StandInTestCase, get_stand_in_config
+
+
+class TestParallelScan(StandInTestCase):
+    def setUp(self):
+        super(TestParallelScan, self).setUp()
+        for key in range(20):
+            self.handle.put(PutRequest().set_table_name('users').set_value(
+                {'id': key}))
+
+    def create_handle(self):
+        return NoSQLHandle(get_stand_in_config(self.server, 4))
+
+    def testParallelScanIllegalParameters(self):
+        self.assertRaises(IllegalArgumentException, self.handle.parallel_scan,
+                          None, 'id')
+        self.assertRaises(IllegalArgumentException, self.handle.parallel_scan,
+                          'users', None)
+        self.assertRaises(IllegalArgumentException, self.handle.parallel_scan,
+                          'users WHERE id = 0', 'id')
+        self.assertRaises(IllegalArgumentException, self.handle.parallel_scan,
+                          'users', 'id FROM users;')
+        self.assertRaises(IllegalArgumentException, self.handle.parallel_scan,
+                          'users', 'id', 'IllegalSplitPoints')
+        self.assertRaises(IllegalArgumentException, self.handle.parallel_scan,
+                          'users', 'id', [1, None])
+        self.assertRaises(IllegalArgumentException, self.handle.parallel_scan,
+                          'users', 'id', [1, True])
+        self.assertRaises(IllegalArgumentException, self.handle.parallel_scan,
+                          'users', 'id', [1, 'a'])
+        self.assertRaises(IllegalArgumentException, self.handle.parallel_scan,
+                          'users', 'id', [1, float('nan')])
+        self.assertRaises(IllegalArgumentException, self.handle.parallel_scan,
+                          'users', 'id', [Decimal('Infinity')])
+        self.assertRaises(IllegalArgumentException, self.handle.parallel_scan,
+                          'users', 'id', None, -1)
+        self.assertRaises(IllegalArgumentException, self.handle.parallel_scan,
+                          'users', 'id', [1], 0, -1)
+        self.assertRaises(IllegalArgumentException, self.handle.parallel_scan,
+                          'users', 'id', [1], 0,
+                          BinaryProtocol.READ_KB_LIMIT + 1)
+        self.assertRaises(IllegalArgumentException, self.handle.parallel_scan,
+                          'users', 'id', [1], 0, 0, -1)
+
+    def testParallelScanSplitPoints(self):
+        scan = self.handle.parallel_scan('users', 'id', [15, 5, 10, 5])
+        self.assertIsInstance(scan, ParallelScan)
+        self.assertEqual(scan.get_split_points(), [5, 10, 15])
+        self.assertEqual(sorted(row['id'] for row in scan), list(range(20)))
+        # the split points are bound to the variables of the statements,
+        # prepared once for the scan.
+        self.assertEqual(sorted(statement for statement, max_read_kb in
+                                self.server.queries),
+                         ['DECLARE $hi LONG; SELECT * FROM users WHERE id < ' +
+                          '$hi'] +
+                         ['DECLARE $lo LONG; $hi LONG; SELECT * FROM users ' +
+                          'WHERE id >= $lo AND id < $hi'] * 2 +
+                         ['DECLARE $lo LONG; SELECT * FROM users WHERE id >= ' +
+                          '$lo'])
+        self.assertEqual(len(self.server.prepares), 3)
+        self.assertEqual(scan.get_read_units(), 20)
+        self.assertEqual(scan.get_read_kb(), 20)
+        self.assertEqual(scan.get_write_kb(), 0)
+        self.assertRaises(StopIteration, next, scan)
+        # a scan can only be run once.
+        self.assertRaises(IllegalStateException, scan.for_each, None)
+        # a single range without split points.
+        scan = self.handle.parallel_scan('users', 'id', [])
+        self.assertEqual(len(list(scan)), 20)
+        self.assertEqual(self.server.queries[-1][0], 'SELECT * FROM users')
+
+    def testParallelScanSampledSplitPoints(self):
+        scan = self.handle.parallel_scan('users', 'id')
+        self.assertEqual(self.server.queries[0][0], 'SELECT id FROM users')
+        self.assertEqual(scan.get_split_points(), [5, 10, 15])
+        self.assertEqual(
+            self.handle.parallel_scan('users', 'id', None,
+                                      2).get_split_points(), [10])
+        self.assertEqual(
+            self.handle.parallel_scan('users', 'id', None,
+                                      40).get_split_points(),
+            list(range(1, 20)))
+        self.server.tables['users'] = dict()
+        scan = self.handle.parallel_scan('users', 'id')
+        self.assertEqual(scan.get_split_points(), [])
+        self.assertEqual(list(scan), [])
+
+    def testParallelScanNumberSplitPoints(self):
+        for split_points, variable_type in (([Decimal('12.5'), 5], 'NUMBER'),
+                                            ([12.5, 5], 'DOUBLE')):
+            self.server.prepares = list()
+            scan = self.handle.parallel_scan('users', 'id', split_points)
+            self.assertEqual(sorted(row['id'] for row in scan),
+                             list(range(20)))
+            self.assertEqual(self.server.prepares[0].split()[2],
+                             variable_type + ';')
+
+    def testParallelScanStringSplitPoints(self):
+        names = ['a', 'a"\\', 'ab', 'b', 'c']
+        for key, name in enumerate(names):
+            self.handle.put(PutRequest().set_table_name('users').set_value(
+                {'id': key, 'name': name}))
+        self.server.tables['users'] = dict(
+            (key, row) for key, row in self.server.tables['users'].items()
+            if key < len(names))
+        self.server.queries = list()
+        scan = self.handle.parallel_scan('users', 'name', ['b', 'a"\\'])
+        self.assertEqual(scan.get_split_points(), ['a"\\', 'b'])
+        self.assertEqual(sorted(row['name'] for row in scan), names)
+        self.assertEqual(
+            sorted(self.server.prepares),
+            ['DECLARE $hi STRING; SELECT * FROM users WHERE name < $hi',
+             'DECLARE $lo STRING; $hi STRING; SELECT * FROM users WHERE ' +
+             'name >= $lo AND name < $hi',
+             'DECLARE $lo STRING; SELECT * FROM users WHERE name >= $lo'])
+
+    def testParallelScanForEach(self):
+        pages = dict()
+        lock = Lock()
+
+        def sink(split, results):
+            with lock:
+                pages.setdefault(split, list()).extend(
+                    row['id'] for row in results)
+
+        self.handle.parallel_scan('users', 'id', [8, 16], 0, 0, 2).for_each(
+            sink)
+        self.assertEqual(pages, {0: list(range(8)), 1: list(range(8, 16)),
+                                 2: list(range(16, 20))})
+
+    def testParallelScanMaxReadKB(self):
+        self.server.delay = 0.02
+        list(self.handle.parallel_scan('users', 'id', [5, 10, 15], 0, 10))
+        # the budget is shared by the queries of the 4 threads.
+        self.assertEqual(set(max_read_kb for statement, max_read_kb in
+                             self.server.queries), set([2]))
+        self.assertLessEqual(self.server.max_active, 4)
+        self.server.queries = list()
+        list(self.handle.parallel_scan('users', 'id', [5, 10, 15], 0, 10, 8))
+        # there are no more threads than ranges.
+        self.assertEqual(set(max_read_kb for statement, max_read_kb in
+                             self.server.queries), set([2]))
+        self.server.queries = list()
+        list(self.handle.parallel_scan('users', 'id', [5, 10, 15], 0, 3, 2))
+        self.assertEqual(set(max_read_kb for statement, max_read_kb in
+                             self.server.queries), set([1]))
+
+    def testParallelScanFailure(self):
+        scan = self.handle.parallel_scan('users', 'id', [5, 10, 15])
+        self.server.errors = [BinaryProtocol.USER_ERROR.TABLE_NOT_FOUND]
+        self.assertRaises(TableNotFoundException, list, scan)
+        self.assertRaises(StopIteration, next, scan)
+
+        def sink(split, results):
+            raise IllegalStateException('sink failed')
+
+        self.server.queries = list()
+        scan = self.handle.parallel_scan('users', 'id', [5, 10, 15], 0, 0, 1)
+        self.assertRaises(IllegalStateException, scan.for_each, sink)
+        # no more ranges are queried once the sink fails.
+        self.assertEqual(len(self.server.queries), 1)
+
+    def testParallelScanClose(self):
+        with self.handle.parallel_scan('users', 'id', list(range(1, 20)), 0, 0,
+                                       1) as scan:
+            self.assertEqual(next(scan)['id'], 0)
+        # at most twice parallelism pages are got ahead of the iteration.
+        self.assertLessEqual(len(self.server.queries), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
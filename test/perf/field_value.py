@@ -0,0 +1,75 @@
+#
+# Copyright (C) 2018, 2019 Oracle and/or its affiliates. All rights reserved.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl
+#
+# Please see LICENSE.txt file included in the top-level directory of the
+# appropriate download for a copy of the license and additional information.
+#
+
+"""
+Micro-benchmark of field value serialization, it needs no server.
+
+Run it with the development tree on PYTHONPATH:
+
+    $ python field_value.py [number of rows]
+"""
+
+from datetime import datetime
+from decimal import Decimal
+from sys import argv
+from timeit import repeat
+
+from borneo.common import ByteOutputStream
+from borneo.serde import BinaryProtocol, RecordEncoder
+
+
+def wide_row(width):
+    # A wide JSON-like row mixing the value types seen in practice.
+    row = dict()
+    for i in range(width):
+        kind = i % 8
+        if kind == 0:
+            row['id' + str(i)] = i * 1000003
+        elif kind == 1:
+            row['name' + str(i)] = 'value ' + str(i)
+        elif kind == 2:
+            row['score' + str(i)] = i / 7.0
+        elif kind == 3:
+            row['flag' + str(i)] = i % 3 == 0
+        elif kind == 4:
+            row['tags' + str(i)] = ['a', 'b', i]
+        elif kind == 5:
+            row['info' + str(i)] = {'x': i, 'y': None, 'z': 'zz'}
+        elif kind == 6:
+            row['at' + str(i)] = datetime(2019, 1, 2, 3, 4, 5)
+        else:
+            row['price' + str(i)] = Decimal('12.50')
+    return row
+
+
+def run(name, rows, bos, write):
+    def encode():
+        for _ in range(rows):
+            bos.reset()
+            write()
+
+    encode()
+    size = bos.get_offset()
+    best = min(repeat(encode, number=1, repeat=5))
+    print('%s: %d rows of %d bytes: %.1f rows/s, %.1f MB/s' %
+          (name, rows, size, rows / best, rows * size / best / 1e6))
+
+
+def main():
+    rows = int(argv[1]) if len(argv) > 1 else 2000
+    row = wide_row(64)
+    bos = ByteOutputStream(bytearray(64 * 1024))
+    encoder = RecordEncoder.for_table('users')
+    run('generic, 64 fields', rows, bos,
+        lambda: BinaryProtocol.write_record(bos, row))
+    run('table plan, 64 fields', rows, bos, lambda: encoder.write(bos, row))
+
+
+if __name__ == '__main__':
+    main()
@@ -12,6 +12,10 @@ from datetime import datetime
 from decimal import Decimal
 from struct import pack
 from time import time
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 from borneo import (
     Consistency, GetRequest, IllegalArgumentException, PrepareRequest,
@@ -148,6 +152,22 @@ PRIMARY KEY(SHARD(fld_sid), fld_id))')
         self.assertRaises(IllegalArgumentException,
                           self.query_request.set_defaults, 'IllegalDefaults')
 
+    def testQuerySetIllegalRawValues(self):
+        self.assertRaises(IllegalArgumentException,
+                          self.query_request.set_raw_values, 'IllegalRawValues')
+
+    def testQuerySetIllegalColumnarResults(self):
+        self.assertRaises(IllegalArgumentException,
+                          self.query_request.set_columnar_results,
+                          'IllegalColumnarResults')
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed.')
+    def testQueryColumnarResultsWithStreamResults(self):
+        self.query_request.set_statement(query_statement).set_columnar_results(
+            True).set_stream_results(True)
+        self.assertRaises(IllegalArgumentException, self.handle.query,
+                          self.query_request)
+
     def testQuerySetDefaults(self):
         self.query_request.set_defaults(self.handle_config)
         self.assertEqual(self.query_request.get_timeout(), timeout)
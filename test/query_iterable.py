@@ -0,0 +1,84 @@
+#
+# Copyright (C) 2018, 2019 Oracle and/or its affiliates. All rights reserved.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl
+#
+# Please see LICENSE.txt file included in the top-level directory of the
+# appropriate download for a copy of the license and additional information.
+#
+
+import unittest
+from time import sleep
+
+from borneo import (
+    GetRequest, IllegalArgumentException, PutRequest, QueryIterator,
+    QueryRequest, TableNotFoundException)
+from borneo.serde import BinaryProtocol
+from stand_in_server import StandInTestCase
+
+
+class TestQueryIterable(StandInTestCase):
+    def setUp(self):
+        super(TestQueryIterable, self).setUp()
+        for key in range(10):
+            self.handle.put(PutRequest().set_table_name('users').set_value(
+                {'id': key}))
+        self.server.num_requests = 0
+
+    def testQueryIterableIllegalParameters(self):
+        self.assertRaises(IllegalArgumentException,
+                          self.handle.query_iterable, GetRequest())
+        self.assertRaises(IllegalArgumentException,
+                          self.handle.query_iterable, self.__request(), -1)
+        self.assertRaises(IllegalArgumentException,
+                          self.handle.query_iterable, QueryRequest())
+        self.assertRaises(IllegalArgumentException,
+                          self.handle.query_iterable,
+                          self.__request().set_stream_results(True))
+
+    def testQueryIterableResults(self):
+        for prefetch in range(3):
+            self.server.num_requests = 0
+            results = self.handle.query_iterable(self.__request(), prefetch)
+            self.assertIsInstance(results, QueryIterator)
+            self.assertEqual([row['id'] for row in results], list(range(10)))
+            self.assertEqual(self.server.num_requests, 4)
+            self.assertEqual(results.get_read_units(), 10)
+            self.assertEqual(results.get_read_kb(), 10)
+            self.assertEqual(results.get_write_kb(), 0)
+            self.assertRaises(StopIteration, next, results)
+        # a single page.
+        results = self.handle.query_iterable(
+            QueryRequest().set_statement('SELECT * FROM users'))
+        self.assertEqual(len(list(results)), 10)
+
+    def testQueryIterablePrefetch(self):
+        for prefetch in range(3):
+            self.server.num_requests = 0
+            with self.handle.query_iterable(self.__request(),
+                                            prefetch) as results:
+                self.assertEqual(next(results)['id'], 0)
+                sleep(0.2)
+                # the pages got are those iterated and prefetch ahead.
+                self.assertEqual(self.server.num_requests, 1 + prefetch)
+                self.assertEqual(results.get_read_units(), 3 + 3 * prefetch)
+            sleep(0.1)
+            # no page is got once closed.
+            self.assertEqual(self.server.num_requests, 1 + prefetch)
+            # the results got can still be iterated.
+            self.assertEqual(len(list(results)), 2 + 3 * prefetch)
+
+    def testQueryIterableFailure(self):
+        for prefetch in range(2):
+            self.server.errors = [BinaryProtocol.USER_ERROR.TABLE_NOT_FOUND]
+            results = self.handle.query_iterable(self.__request(), prefetch)
+            self.assertRaises(TableNotFoundException, next, results)
+            self.assertRaises(StopIteration, next, results)
+
+    @staticmethod
+    def __request():
+        return QueryRequest().set_statement('SELECT * FROM users').set_limit(3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+#
+# Copyright (C) 2018, 2019 Oracle and/or its affiliates. All rights reserved.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl
+#
+# Please see LICENSE.txt file included in the top-level directory of the
+# appropriate download for a copy of the license and additional information.
+#
+
+import unittest
+from time import time
+
+from borneo import (
+    IllegalArgumentException, NoSQLHandle, PrepareRequest, PutRequest,
+    QueryRequest, RequestTimeoutException, TableRequest)
+from borneo.limiter import RateLimiter
+from stand_in_server import StandInTestCase, get_stand_in_config
+
+
+class TestRateLimiter(StandInTestCase):
+    def setUp(self):
+        super(TestRateLimiter, self).setUp()
+        self.server.tables['users'] = dict()
+
+    def create_handle(self):
+        # the stand-in tables have 50 write units, 5 a second are allocated.
+        return NoSQLHandle(get_stand_in_config(
+            self.server).set_rate_limiting_enabled(
+            True).set_rate_limiting_percentage(10))
+
+    def testRateLimiterIllegalConfig(self):
+        config = get_stand_in_config(self.server)
+        self.assertRaises(IllegalArgumentException,
+                          config.set_rate_limiting_enabled, 'IllegalEnabled')
+        for percentage in ('IllegalPercentage', True, 0, -1, 100.5):
+            self.assertRaises(IllegalArgumentException,
+                              config.set_rate_limiting_percentage, percentage)
+        self.assertFalse(config.get_rate_limiting_enabled())
+        self.assertEqual(config.get_rate_limiting_percentage(), 100)
+        config.set_rate_limiting_percentage(12.5)
+        self.assertEqual(config.get_rate_limiting_percentage(), 12.5)
+
+    def testRateLimiterBucket(self):
+        limiter = RateLimiter(10)
+        limiter.consume(3)
+        self.assertLess(limiter.wait(1), 0.05)
+        limiter.consume(10)
+        # the units owed are paid back in 0.3 seconds.
+        start = time()
+        self.assertIsNone(limiter.wait(0.1))
+        self.assertLess(time() - start, 0.05)
+        self.assertGreater(limiter.wait(1), 0.2)
+        limiter.set_limit(20)
+        self.assertEqual(limiter.get_limit(), 20)
+
+    def testRateLimiterWrites(self):
+        start = time()
+        for key in range(10):
+            self.__put(key)
+        # the first 5 units are available, the last 5 puts are limited.
+        self.assertGreater(time() - start, 0.6)
+        # the limits of the table are got once.
+        self.assertEqual(self.server.num_requests, 11)
+
+    def testRateLimiterStreamedQueries(self):
+        self.server.tables['users'] = {key: {'id': key} for key in range(5)}
+        start = time()
+        for count in range(5):
+            result = self.handle.query(QueryRequest().set_statement(
+                'SELECT * FROM users').set_stream_results(True))
+            self.assertEqual(len(list(result.get_results())), 5)
+        # the 5 units of each query are charged once its results are read, 10
+        # are available, the last 2 queries are limited.
+        self.assertGreater(time() - start, 0.8)
+
+    def testRateLimiterTimeout(self):
+        self.handle.close()
+        self.handle = NoSQLHandle(get_stand_in_config(
+            self.server).set_rate_limiting_enabled(
+            True).set_rate_limiting_percentage(2))
+        self.__put(0)
+        self.__put(1)
+        # the unit owed is paid back in a second.
+        start = time()
+        self.assertRaises(RequestTimeoutException, self.handle.put,
+                          PutRequest().set_table_name('users').set_value(
+                              {'id': 2}).set_timeout(100))
+        self.assertLess(time() - start, 0.05)
+
+    def testRateLimiterDisabled(self):
+        self.handle.close()
+        self.handle = NoSQLHandle(get_stand_in_config(self.server))
+        start = time()
+        for key in range(10):
+            self.__put(key)
+        self.assertLess(time() - start, 0.6)
+        self.assertEqual(self.server.num_requests, 10)
+
+    def testRateLimiterQueries(self):
+        for count in range(2):
+            self.handle.query(QueryRequest().set_statement(
+                'SELECT * FROM users'))
+        # the limits of the table after FROM are got once.
+        self.assertEqual(self.server.num_requests, 3)
+
+    def testRateLimiterPreparedQueries(self):
+        self.handle.close()
+        self.handle = NoSQLHandle(get_stand_in_config(
+            self.server).set_rate_limiting_enabled(
+            True).set_statement_cache_size(10).set_auto_prepare(True))
+        for count in range(2):
+            self.handle.query(QueryRequest().set_statement(
+                'SELECT * FROM users'))
+        # the prepared queries are limited too.
+        self.assertEqual(self.server.num_requests, 4)
+        self.server.tables['other'] = dict()
+        prepared = self.handle.prepare(PrepareRequest().set_statement(
+            'SELECT * FROM other')).get_prepared_statement()
+        self.handle.query(QueryRequest().set_prepared_statement(prepared))
+        self.assertEqual(self.server.num_requests, 7)
+
+    def testRateLimiterQueryTable(self):
+        for statement, table_name in (
+                ('SELECT * FROM users', 'users'),
+                ('select * from users u where u.name = \'from other\'',
+                 'users'),
+                ('SELECT * FROM users WHERE id IN (SELECT id FROM other)',
+                 'users'),
+                ('DECLARE $id INTEGER; SELECT * FROM parent.child ' +
+                 'WHERE id = $id', 'parent.child'),
+                ('INSERT INTO users VALUES (1)', 'users'),
+                ('UPDATE users u SET u.name = \'from\' WHERE id = 0',
+                 'users'),
+                ('DELETE FROM users WHERE id = 0', 'users'),
+                ('SELECT 1', None)):
+            self.assertEqual(QueryRequest().set_statement(
+                statement).get_table_name_internal(), table_name)
+
+    def testRateLimiterTableRequest(self):
+        self.__put(0)
+        self.handle.table_request(TableRequest().set_statement(
+            'ALTER TABLE users (ADD name STRING)'))
+        self.__put(1)
+        # the limits of the table are got again.
+        self.assertEqual(self.server.num_requests, 5)
+
+    def __put(self, key):
+        self.handle.put(PutRequest().set_table_name('users').set_value(
+            {'id': key}))
+
+
+if __name__ == '__main__':
+    unittest.main()
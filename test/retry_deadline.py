@@ -0,0 +1,104 @@
+#
+# Copyright (C) 2018, 2019 Oracle and/or its affiliates. All rights reserved.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl
+#
+# Please see LICENSE.txt file included in the top-level directory of the
+# appropriate download for a copy of the license and additional information.
+#
+
+import unittest
+from time import time
+
+from borneo import (
+    DefaultRetryHandler, GetRequest, IllegalArgumentException, NoSQLHandle,
+    RequestTimeoutException, RetryableException, SecurityInfoNotReadyException)
+from borneo.serde import BinaryProtocol
+from stand_in_server import StandInTestCase, get_stand_in_config
+
+
+class TestRetryDeadline(StandInTestCase):
+    def setUp(self):
+        super(TestRetryDeadline, self).setUp()
+        self.server.tables['users'] = {0: {'id': 0}}
+
+    def create_handle(self):
+        return None
+
+    def testRetryDeadlineDelays(self):
+        self.assertRaises(IllegalArgumentException, DefaultRetryHandler, 5,
+                          True)
+        handler = DefaultRetryHandler(5, 0.05)
+        self.assertEqual(handler.get_delay(1, RetryableException('Test')), 0.05)
+        handler = DefaultRetryHandler(5, 0)
+        for num_retried in range(1, 4):
+            delay = handler.get_delay(num_retried, RetryableException('Test'))
+            self.assertGreaterEqual(delay, 1 << (num_retried - 1))
+            self.assertLess(delay, (1 << (num_retried - 1)) + 1)
+        # the delays of security info not ready are not rounded down to 0.
+        self.assertEqual(handler.get_delay(
+            1, SecurityInfoNotReadyException('Test')), 0.1)
+        delay = handler.get_delay(11, SecurityInfoNotReadyException('Test'))
+        self.assertTrue(0.1 <= delay < 0.2)
+
+    def testRetryDeadlineSocketTimeout(self):
+        self.__handle(DefaultRetryHandler(5, 0.05))
+        self.server.delay = 0.5
+        start = time()
+        self.assertRaises(RequestTimeoutException, self.__get, 200)
+        # the timeout isn't rounded up to a second.
+        self.assertLess(time() - start, 0.45)
+
+    def testRetryDeadlineFractionalDelay(self):
+        self.__handle(DefaultRetryHandler(5, 0.05))
+        self.server.errors = [
+            BinaryProtocol.THROTTLING_ERROR.READ_LIMIT_EXCEEDED] * 2
+        start = time()
+        self.assertEqual(self.__get(1000).get_value(), {'id': 0})
+        self.assertLess(time() - start, 0.5)
+        self.assertEqual(self.server.num_requests, 3)
+
+    def testRetryDeadlineNotPassed(self):
+        # the backoff of the first retry is at least a second.
+        self.__handle(DefaultRetryHandler(5, 0))
+        self.server.errors = [
+            BinaryProtocol.THROTTLING_ERROR.READ_LIMIT_EXCEEDED]
+        start = time()
+        try:
+            self.__get(500)
+            self.fail('RequestTimeoutException expected.')
+        except RequestTimeoutException as e:
+            self.assertIn('Caused by: ReadThrottlingException', str(e))
+        self.assertLess(time() - start, 0.2)
+        self.assertEqual(self.server.num_requests, 1)
+
+    def testRetryDeadlineOverriddenDelay(self):
+        delays = list()
+
+        class DelayRetryHandler(DefaultRetryHandler):
+            def delay(self, num_retried, re):
+                delays.append(num_retried)
+
+        handler = DelayRetryHandler(5, 1)
+        self.assertIsNone(handler._get_delay_internal(
+            1, RetryableException('Test')))
+        self.__handle(handler)
+        self.server.errors = [
+            BinaryProtocol.THROTTLING_ERROR.READ_LIMIT_EXCEEDED] * 2
+        start = time()
+        self.assertEqual(self.__get(1000).get_value(), {'id': 0})
+        # the overridden delay is called rather than the delay of 1 second.
+        self.assertEqual(delays, [1, 2])
+        self.assertLess(time() - start, 0.5)
+
+    def __get(self, timeout_ms):
+        return self.handle.get(GetRequest().set_table_name('users').set_key(
+            {'id': 0}).set_timeout(timeout_ms))
+
+    def __handle(self, retry_handler):
+        self.handle = NoSQLHandle(get_stand_in_config(
+            self.server).set_retry_handler(retry_handler))
+
+
+if __name__ == '__main__':
+    unittest.main()
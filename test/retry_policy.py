@@ -0,0 +1,142 @@
+#
+# Copyright (C) 2018, 2019 Oracle and/or its affiliates. All rights reserved.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl
+#
+# Please see LICENSE.txt file included in the top-level directory of the
+# appropriate download for a copy of the license and additional information.
+#
+
+import unittest
+
+from borneo import (
+    DecorrelatedJitterRetryHandler, DefaultRetryHandler, GetRequest,
+    IllegalArgumentException, NoSQLHandle, PolicyRetryHandler,
+    ReadThrottlingException, RequestTimeoutException, RetryBudget,
+    RetryableException, SystemException, ThrottlingException)
+from borneo.serde import BinaryProtocol
+from stand_in_server import StandInTestCase, get_stand_in_config
+
+
+class TestRetryPolicy(StandInTestCase):
+    def setUp(self):
+        super(TestRetryPolicy, self).setUp()
+        self.server.tables['users'] = {0: {'id': 0}}
+
+    def create_handle(self):
+        return None
+
+    def testRetryPolicyIllegalArguments(self):
+        self.assertRaises(IllegalArgumentException,
+                          DecorrelatedJitterRetryHandler, 5, 0)
+        self.assertRaises(IllegalArgumentException,
+                          DecorrelatedJitterRetryHandler, 5, 1, 0.5)
+        self.assertRaises(IllegalArgumentException, PolicyRetryHandler,
+                          'IllegalDefaultHandler')
+        self.assertRaises(IllegalArgumentException, PolicyRetryHandler,
+                          None, {ValueError: DefaultRetryHandler()})
+        self.assertRaises(IllegalArgumentException, PolicyRetryHandler,
+                          None, {ThrottlingException: 'IllegalHandler'})
+        self.assertRaises(IllegalArgumentException, PolicyRetryHandler,
+                          None, None, 'IllegalBudget')
+        self.assertRaises(IllegalArgumentException, RetryBudget, 0)
+        self.assertRaises(IllegalArgumentException, RetryBudget, 10, -1)
+
+    def testRetryPolicyDecorrelatedJitter(self):
+        handler = DecorrelatedJitterRetryHandler(5, 0.1, 2)
+        delays = [handler.get_delay(1, RetryableException('Test'))
+                  for count in range(100)]
+        self.assertTrue(all(0.1 <= delay <= 0.3 for delay in delays))
+        self.assertGreater(len(set(delays)), 1)
+        delays = [handler.get_delay(5, RetryableException('Test'))
+                  for count in range(100)]
+        self.assertTrue(all(0.1 <= delay <= 2 for delay in delays))
+        self.assertEqual(handler.get_num_retries(), 5)
+
+    def testRetryPolicyByException(self):
+        handler = PolicyRetryHandler(DefaultRetryHandler(5, 0.05), {
+            ThrottlingException: DefaultRetryHandler(2, 0.01)})
+        self.assertEqual(handler.get_delay(
+            1, ReadThrottlingException('Test')), 0.01)
+        self.assertEqual(handler.get_delay(1, SystemException('Test')), 0.05)
+        request = GetRequest()
+        self.assertFalse(handler.do_retry(
+            request, 2, ReadThrottlingException('Test')))
+        self.assertTrue(handler.do_retry(request, 2, SystemException('Test')))
+        self.assertEqual(handler.get_num_retries(), 5)
+
+    def testRetryPolicyOverriddenDelay(self):
+        delays = list()
+
+        class DelayRetryHandler(DefaultRetryHandler):
+            def delay(self, num_retried, re):
+                delays.append(num_retried)
+
+        self.__handle(PolicyRetryHandler(DefaultRetryHandler(5, 1), {
+            ThrottlingException: DelayRetryHandler(5, 1)}))
+        self.server.errors = [
+            BinaryProtocol.THROTTLING_ERROR.READ_LIMIT_EXCEEDED]
+        self.assertEqual(self.__get(1000).get_value(), {'id': 0})
+        self.assertEqual(delays, [1])
+
+    def testRetryPolicyBudget(self):
+        budget = RetryBudget(50, 1)
+        # the retry allowed each second whatever the traffic.
+        self.assertTrue(budget.try_retry())
+        self.assertFalse(budget.try_retry())
+        # the retries added decay, 3 of them are slightly less than 3.
+        for count in range(6):
+            budget.on_request()
+        self.assertTrue(budget.try_retry())
+        self.assertTrue(budget.try_retry())
+        self.assertFalse(budget.try_retry())
+        self.assertEqual(budget.get_stats(),
+                         {'requests': 6, 'retries': 3, 'rejected': 2})
+
+    def testRetryPolicyStats(self):
+        budget = RetryBudget(10, 1)
+        self.__handle(PolicyRetryHandler(
+            DefaultRetryHandler(5, 0.01), budget=budget))
+        self.server.errors = [
+            BinaryProtocol.THROTTLING_ERROR.READ_LIMIT_EXCEEDED] * 2
+        # the second retry is not in the budget.
+        self.assertRaises(ReadThrottlingException, self.__get, 1000)
+        self.assertEqual(self.server.num_requests, 2)
+        self.assertEqual(budget.get_stats(),
+                         {'requests': 1, 'retries': 1, 'rejected': 1})
+        self.assertEqual(self.handle.get_retry_stats(), {
+            'retries': 1, 'exceptions': {'ReadThrottlingException': 1},
+            'rejected': 1, 'deadline_exceeded': 0})
+
+    def testRetryPolicyStatsDeadline(self):
+        self.__handle(DefaultRetryHandler(5, 1))
+        self.server.errors = [BinaryProtocol.SERVER_RETRY_ERROR.SERVER_ERROR]
+        self.assertRaises(RequestTimeoutException, self.__get, 200)
+        self.assertEqual(self.handle.get_retry_stats(), {
+            'retries': 0, 'exceptions': {}, 'rejected': 0,
+            'deadline_exceeded': 1})
+
+    def testRetryPolicyBudgetDeadline(self):
+        budget = RetryBudget(10, 1)
+        self.__handle(PolicyRetryHandler(
+            DefaultRetryHandler(5, 1), budget=budget))
+        self.server.errors = [BinaryProtocol.SERVER_RETRY_ERROR.SERVER_ERROR]
+        # the retry past the deadline is given back to the budget.
+        self.assertRaises(RequestTimeoutException, self.__get, 200)
+        self.assertEqual(budget.get_stats(),
+                         {'requests': 1, 'retries': 0, 'rejected': 0})
+        self.assertEqual(self.handle.get_retry_stats()['deadline_exceeded'],
+                         1)
+        self.assertTrue(budget.try_retry())
+
+    def __get(self, timeout_ms):
+        return self.handle.get(GetRequest().set_table_name('users').set_key(
+            {'id': 0}).set_timeout(timeout_ms))
+
+    def __handle(self, retry_handler):
+        self.handle = NoSQLHandle(get_stand_in_config(
+            self.server).set_retry_handler(retry_handler))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+#
+# Copyright (C) 2018, 2019 Oracle and/or its affiliates. All rights reserved.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl
+#
+# Please see LICENSE.txt file included in the top-level directory of the
+# appropriate download for a copy of the license and additional information.
+#
+
+import unittest
+from time import sleep
+
+from borneo import (
+    Consistency, DeleteRequest, GetRequest, IllegalArgumentException,
+    NoSQLHandle, PutRequest, QueryRequest, WriteMultipleRequest)
+from stand_in_server import StandInTestCase, get_stand_in_config
+
+
+class TestRowCache(StandInTestCase):
+    def setUp(self):
+        super(TestRowCache, self).setUp()
+        for key in range(3):
+            self.__put(key, 'name' + str(key))
+        self.server.num_requests = 0
+
+    def create_handle(self):
+        return NoSQLHandle(get_stand_in_config(
+            self.server).set_row_cache('Users', 2, 10000))
+
+    def testRowCacheIllegalConfig(self):
+        config = get_stand_in_config(self.server)
+        self.assertRaises(IllegalArgumentException, config.set_row_cache,
+                          None, 10, 1000)
+        self.assertRaises(IllegalArgumentException, config.set_row_cache,
+                          'users', -1, 1000)
+        self.assertRaises(IllegalArgumentException, config.set_row_cache,
+                          'users', 10, 0)
+        self.assertEqual(config.get_row_caches(), {})
+        config.set_row_cache('Users', 10, 1000)
+        self.assertEqual(config.get_row_caches(), {'users': (10, 1000)})
+        config.set_row_cache('users', 0, 1000)
+        self.assertEqual(config.get_row_caches(), {})
+        self.assertRaises(IllegalArgumentException,
+                          self.handle.get_row_cache_stats, None)
+        self.assertIsNone(self.handle.get_row_cache_stats('other'))
+
+    def testRowCacheHits(self):
+        result = self.__get(1)
+        self.assertEqual(result.get_value(), {'id': 1, 'name': 'name1'})
+        result.get_value()['name'] = 'modified'
+        for count in range(3):
+            result = self.__get(1)
+            self.assertEqual(result.get_value(), {'id': 1, 'name': 'name1'})
+            self.assertIsNotNone(result.get_version())
+            self.assertEqual(result.get_read_units(), 0)
+        self.assertEqual(self.server.num_requests, 1)
+        self.assertEqual(self.handle.get_row_cache_stats('USERS'),
+                         {'hits': 3, 'misses': 1, 'size': 1})
+        # the gets of submit use the cache.
+        self.assertEqual(self.handle.submit(GetRequest().set_table_name(
+            'users').set_key({'id': 1})).result().get_value()['name'], 'name1')
+        self.assertEqual(self.server.num_requests, 1)
+        # rows that don't exist are not cached.
+        self.assertIsNone(self.__get(5).get_value())
+        self.assertIsNone(self.__get(5).get_value())
+        self.assertEqual(self.server.num_requests, 3)
+
+    def testRowCacheNotCached(self):
+        self.__put(1, 'other', 'other')
+        self.server.num_requests = 0
+        for count in range(2):
+            self.handle.get(GetRequest().set_table_name('other').set_key(
+                {'id': 1}))
+            self.handle.get(GetRequest().set_table_name('users').set_key(
+                {'id': 1}).set_consistency(Consistency.ABSOLUTE))
+            self.handle.get(GetRequest().set_table_name('users').set_key(
+                {'id': 1}).set_lazy_values(True))
+        self.assertEqual(self.server.num_requests, 6)
+        self.assertEqual(self.handle.get_row_cache_stats('users'),
+                         {'hits': 0, 'misses': 0, 'size': 0})
+
+    def testRowCacheEviction(self):
+        for key in range(3):
+            self.__get(key)
+        self.__get(2)
+        self.__get(1)
+        self.assertEqual(self.server.num_requests, 3)
+        # the least recently used row has been evicted.
+        self.__get(0)
+        self.assertEqual(self.server.num_requests, 4)
+        self.assertEqual(self.handle.get_row_cache_stats('users')['size'], 2)
+
+    def testRowCacheStaleness(self):
+        self.handle.close()
+        self.handle = NoSQLHandle(get_stand_in_config(
+            self.server).set_row_cache('users', 10, 100))
+        self.__get(1)
+        self.__get(1)
+        self.assertEqual(self.server.num_requests, 1)
+        sleep(0.15)
+        self.__get(1)
+        self.assertEqual(self.server.num_requests, 2)
+
+    def testRowCacheInvalidation(self):
+        self.__get(1)
+        self.__put(1, 'put')
+        self.assertEqual(self.__get(1).get_value()['name'], 'put')
+        self.handle.delete(DeleteRequest().set_table_name('users').set_key(
+            {'id': 1}))
+        self.assertIsNone(self.__get(1).get_value())
+        self.__get(2)
+        request = WriteMultipleRequest()
+        request.add(PutRequest().set_table_name('users').set_value(
+            {'id': 2, 'name': 'batch'}), False)
+        self.handle.write_multiple(request)
+        self.assertEqual(self.__get(2).get_value()['name'], 'batch')
+        self.assertEqual(self.handle.get_row_cache_stats('users')['hits'], 0)
+
+    def testRowCacheQueryInvalidation(self):
+        self.__get(1)
+        self.__get(2)
+        # the queries that don't write rows don't evict them.
+        self.handle.query(QueryRequest().set_statement('SELECT * FROM users'))
+        self.__get(1)
+        self.assertEqual(self.server.num_requests, 3)
+        self.handle.query(QueryRequest().set_statement(
+            'UPSERT INTO users VALUES {"id": 1, "name": "query"}'))
+        self.assertEqual(self.__get(1).get_value()['name'], 'query')
+        self.assertEqual(self.__get(2).get_value()['name'], 'name2')
+        self.assertEqual(self.server.num_requests, 6)
+
+    def testRowCacheStreamedQueryInvalidation(self):
+        self.__get(1)
+        result = self.handle.query(QueryRequest().set_statement(
+            'UPSERT INTO users VALUES {"id": 1, "name": "query"}'
+        ).set_stream_results(True))
+        # the rows are evicted once the results of the query are read.
+        self.assertEqual(list(result.get_results()), [{'written': 1}])
+        self.assertEqual(self.__get(1).get_value()['name'], 'query')
+        self.assertEqual(self.server.num_requests, 3)
+
+    def __get(self, key):
+        return self.handle.get(GetRequest().set_table_name('users').set_key(
+            {'id': key}))
+
+    def __put(self, key, name, table_name='users'):
+        self.handle.put(PutRequest().set_table_name(table_name).set_value(
+            {'id': key, 'name': name}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,366 @@
+#
+# Copyright (C) 2018, 2019 Oracle and/or its affiliates. All rights reserved.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl
+#
+# Please see LICENSE.txt file included in the top-level directory of the
+# appropriate download for a copy of the license and additional information.
+#
+
+import unittest
+from decimal import Decimal
+from json import loads
+from logging import getLogger
+from threading import Lock, Thread
+from time import sleep
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+from borneo import (
+    AuthorizationProvider, NoSQLHandle, NoSQLHandleConfig, RetryHandler)
+from borneo.common import ByteInputStream, ByteOutputStream
+from borneo.serde import BinaryProtocol
+
+OP_CODE = BinaryProtocol.OP_CODE
+
+
+class StandInServer(object):
+    """
+    A stand-in for the proxy, that keeps the rows of its tables in memory and
+    answers the requests used by the tests. It can fail requests with an error
+    code, delay them, cut their responses short, and counts the connections
+    its requests arrive on.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.reset()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                content = self.rfile.read(int(self.headers['Content-Length']))
+                with server.lock:
+                    server.connections.add(self.client_address)
+                    server.open_connections.add(self.client_address)
+                    server.num_requests += 1
+                    server.active += 1
+                    server.max_active = max(server.max_active, server.active)
+                try:
+                    if server.delay:
+                        sleep(server.delay)
+                    response = server.handle(ByteInputStream(content))
+                finally:
+                    with server.lock:
+                        server.active -= 1
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(response)))
+                self.end_headers()
+                if server.truncate:
+                    # the connection is closed in the middle of the response.
+                    response = response[:-server.truncate]
+                    self.close_connection = True
+                self.wfile.write(response)
+
+            def finish(self):
+                BaseHTTPRequestHandler.finish(self)
+                with server.lock:
+                    server.open_connections.discard(self.client_address)
+
+        class Server(ThreadingMixIn, HTTPServer):
+            daemon_threads = True
+
+            def handle_error(self, request, client_address):
+                # the client closes the connection of a request that timed out.
+                pass
+
+        self.server = Server(('127.0.0.1', 0), Handler)
+        Thread(target=self.server.serve_forever).start()
+
+    def get_endpoint(self):
+        return 'http://127.0.0.1:' + str(self.server.server_address[1])
+
+    def handle(self, bis):
+        # the serial version.
+        bis.read_byte()
+        bis.read_byte()
+        op = bis.read_byte()
+        bos = ByteOutputStream(bytearray())
+        with self.lock:
+            if self.errors:
+                bos.write_byte(self.errors.pop(0))
+                BinaryProtocol.write_string(bos, 'injected error')
+                return bytes(bos.get_content())
+        BinaryProtocol.read_packed_int(bis)
+        bos.write_byte(0)
+        if op == OP_CODE.GET:
+            table = self.__table(BinaryProtocol.read_string(bis))
+            bis.read_byte()
+            row = table.get(BinaryProtocol.read_field_value(bis)['id'])
+            self.__write_capacity(bos, 1, 1, 0)
+            bos.write_boolean(row is not None)
+            if row is not None:
+                BinaryProtocol.write_field_value(bos, row)
+                BinaryProtocol.write_packed_long(bos, 0)
+                BinaryProtocol.write_bytearray(bos, bytearray(b'version'))
+        elif op == OP_CODE.PUT:
+            table = self.__table(BinaryProtocol.read_string(bis))
+            bis.read_boolean()
+            row = BinaryProtocol.read_field_value(bis)
+            table[row['id']] = row
+            self.__write_put_result(bos)
+        elif op == OP_CODE.DELETE:
+            table = self.__table(BinaryProtocol.read_string(bis))
+            bis.read_boolean()
+            key = BinaryProtocol.read_field_value(bis)
+            self.__write_capacity(bos, 0, 0, 1)
+            bos.write_boolean(table.pop(key['id'], None) is not None)
+            bos.write_boolean(False)
+        elif op == OP_CODE.WRITE_MULTIPLE:
+            table = self.__table(BinaryProtocol.read_string(bis))
+            num_ops = BinaryProtocol.read_packed_int(bis)
+            rows = list()
+            results = list()
+            for index in range(num_ops):
+                bis.read_boolean()
+                sub_op = bis.read_byte()
+                bis.read_boolean()
+                row = BinaryProtocol.read_field_value(bis)
+                rows.append(row)
+                if sub_op == OP_CODE.DELETE:
+                    results.append(table.pop(row['id'], None) is not None)
+                    continue
+                bis.read_boolean()
+                if BinaryProtocol.read_packed_long(bis) != -1:
+                    bis.read_byte()
+                table[row['id']] = row
+                results.append(None)
+            with self.lock:
+                self.batches.append(rows)
+            bos.write_boolean(True)
+            self.__write_capacity(bos, 0, 0, num_ops)
+            BinaryProtocol.write_packed_int(bos, num_ops)
+            for result in results:
+                if result is None:
+                    self.__write_put_result(bos, True)
+                else:
+                    # the result of a delete.
+                    bos.write_boolean(result)
+                    bos.write_boolean(False)
+                    bos.write_boolean(False)
+        elif op == OP_CODE.QUERY:
+            bis.read_byte()
+            limit = BinaryProtocol.read_packed_int(bis)
+            max_read_kb = BinaryProtocol.read_packed_int(bis)
+            continuation_key = BinaryProtocol.read_bytearray(bis)
+            variables = dict()
+            if bis.read_boolean():
+                # the prepared statement is its statement after a prefix.
+                statement = bytes(BinaryProtocol.read_bytearray_with_int(
+                    bis))[len(b'prepared:'):].decode('utf-8')
+                for variable in range(BinaryProtocol.read_packed_int(bis)):
+                    name = BinaryProtocol.read_string(bis)
+                    variables[name] = BinaryProtocol.read_field_value(bis)
+            else:
+                statement = BinaryProtocol.read_string(bis)
+            with self.lock:
+                self.queries.append((statement, max_read_kb))
+            words = statement.split()
+            if words[0] == 'DECLARE':
+                # Decimals are sent as strings, cast to the NUMBER variables
+                # of 'DECLARE $lo NUMBER; $hi NUMBER; SELECT ...'.
+                for index in range(1, words.index('SELECT'), 2):
+                    if words[index + 1] == 'NUMBER;':
+                        variables[words[index]] = Decimal(
+                            variables[words[index]])
+            if words[0] in ('UPSERT', 'DELETE'):
+                # the writes of 'UPSERT INTO users VALUES {"id": 0}' and
+                # 'DELETE FROM users WHERE id = 0'.
+                table = self.__table(words[2])
+                if words[0] == 'UPSERT':
+                    row = loads(statement.split(' VALUES ', 1)[1])
+                    table[row['id']] = row
+                    written = 1
+                else:
+                    written = int(table.pop(loads(words[-1]), None) is not None)
+                bos.write_int(1)
+                BinaryProtocol.write_field_value(bos, {'written': written})
+                self.__write_capacity(bos, 0, 0, written)
+                BinaryProtocol.write_bytearray(bos, None)
+                return bytes(bos.get_content())
+            table = self.__table(words[words.index('FROM') + 1])
+            rows = [table[key] for key in sorted(table)]
+            # the conditions of a range, as in 'id >= 1 AND id < 5' or
+            # 'id >= $lo AND id < $hi'.
+            for index, word in enumerate(words):
+                if word in ('>=', '<'):
+                    field = words[index - 1]
+                    value = words[index + 1]
+                    value = (variables[value] if value.startswith('$') else
+                             loads(value))
+                    rows = [row for row in rows
+                            if (row[field] >= value) == (word == '>=')]
+            # the continuation key is the index of the next row.
+            start = int(bytes(continuation_key)) if continuation_key else 0
+            end = len(rows) if limit == 0 else min(start + limit, len(rows))
+            bos.write_int(end - start)
+            for row in rows[start:end]:
+                BinaryProtocol.write_field_value(bos, row)
+            self.__write_capacity(bos, end - start, end - start, 0)
+            BinaryProtocol.write_bytearray(
+                bos, None if end == len(rows) else
+                bytearray(str(end).encode('ascii')))
+        elif op == OP_CODE.LIST_TABLES:
+            start = bis.read_int()
+            limit = bis.read_int()
+            names = sorted(self.tables)[start:]
+            if limit > 0:
+                names = names[:limit]
+            BinaryProtocol.write_packed_int(bos, len(names))
+            for name in names:
+                BinaryProtocol.write_string(bos, name)
+            BinaryProtocol.write_packed_int(bos, start + len(names))
+        elif op == OP_CODE.PREPARE:
+            statement = BinaryProtocol.read_string(bis)
+            with self.lock:
+                self.prepares.append(statement)
+            self.__write_capacity(bos, 2, 2, 0)
+            BinaryProtocol.write_bytearray_with_int(
+                bos, bytearray(b'prepared:' + statement.encode('utf-8')))
+        elif op == OP_CODE.TABLE_REQUEST:
+            name = BinaryProtocol.read_string(bis).split()[2].split('(')[0]
+            self.polls = 0
+            self.__write_table_result(bos, name, 'CREATING')
+        elif op == OP_CODE.GET_TABLE:
+            name = BinaryProtocol.read_string(bis)
+            if name not in self.tables:
+                bos = ByteOutputStream(bytearray())
+                bos.write_byte(BinaryProtocol.USER_ERROR.TABLE_NOT_FOUND)
+                BinaryProtocol.write_string(bos, name)
+                return bytes(bos.get_content())
+            self.polls += 1
+            self.__write_table_result(
+                bos, name, 'CREATING' if self.polls < 3 else 'ACTIVE')
+        return bytes(bos.get_content())
+
+    def reset(self):
+        # Forgets the tables, errors and statistics of the previous tests.
+        self.tables = dict()
+        self.errors = list()
+        self.delay = 0
+        # The number of bytes of the responses that aren't sent.
+        self.truncate = 0
+        self.polls = 0
+        self.num_requests = 0
+        # The rows and keys of the write_multiple requests.
+        self.batches = list()
+        # The statements and max_read_kb of the queries.
+        self.queries = list()
+        # The statements of the prepare requests.
+        self.prepares = list()
+        self.active = 0
+        self.max_active = 0
+        self.connections = set()
+        # The connections that the client hasn't closed yet.
+        self.open_connections = set()
+
+    def shut_down(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __table(self, name):
+        return self.tables.setdefault(name, dict())
+
+    def __write_table_result(self, bos, name, state):
+        self.__table(name)
+        bos.write_boolean(True)
+        BinaryProtocol.write_string(bos, 'tenant')
+        BinaryProtocol.write_string(bos, name)
+        bos.write_byte(getattr(BinaryProtocol.TABLE_STATE, state))
+        bos.write_boolean(True)
+        for limit in (100, 50, 1):
+            BinaryProtocol.write_packed_int(bos, limit)
+        BinaryProtocol.write_string(
+            bos, '{"shardKey" : ["id"], "primaryKey" : ["id"]}')
+        BinaryProtocol.write_string(bos, 'op')
+
+    @staticmethod
+    def __write_capacity(bos, read_units, read_kb, write_kb):
+        for value in (read_units, read_kb, write_kb):
+            BinaryProtocol.write_packed_int(bos, value)
+
+    @staticmethod
+    def __write_put_result(bos, in_batch=False):
+        if in_batch:
+            # the success flag comes with the version flag of each operation.
+            bos.write_boolean(True)
+        else:
+            StandInServer.__write_capacity(bos, 0, 0, 1)
+        bos.write_boolean(True)
+        BinaryProtocol.write_bytearray(bos, bytearray(b'version'))
+        bos.write_boolean(False)
+
+
+class TestAuthorizationProvider(AuthorizationProvider):
+    def close(self):
+        pass
+
+    def get_authorization_string(self, request=None):
+        return 'Bearer test'
+
+
+class TestRetryHandler(RetryHandler):
+    def delay(self, num_retried, re):
+        sleep(0.01)
+
+    def do_retry(self, request, num_retried, re):
+        return num_retried < 3
+
+    def get_num_retries(self):
+        return 3
+
+
+def get_stand_in_config(server, pool_maxsize=10):
+    # Creates a NoSQLHandleConfig for the handles of the server.
+    return NoSQLHandleConfig(server.get_endpoint()).set_authorization_provider(
+        TestAuthorizationProvider()).set_retry_handler(
+        TestRetryHandler()).set_pool_maxsize(pool_maxsize).set_logger(
+        getLogger('stand_in_server'))
+
+
+class StandInTestCase(unittest.TestCase):
+    """
+    A base class of the tests run against a stand-in server. The server is
+    started for the tests of each class and reset before each test, which is
+    given the handle returned by create_handle, closed after it.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = StandInServer()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shut_down()
+
+    def setUp(self):
+        self.server.reset()
+        self.handle = self.create_handle()
+
+    def tearDown(self):
+        if self.handle is not None:
+            self.handle.close()
+
+    def create_handle(self):
+        # Returns the handle of each test, or None for the tests that create
+        # their own.
+        return NoSQLHandle(get_stand_in_config(self.server))
@@ -0,0 +1,108 @@
+#
+# Copyright (C) 2018, 2019 Oracle and/or its affiliates. All rights reserved.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl
+#
+# Please see LICENSE.txt file included in the top-level directory of the
+# appropriate download for a copy of the license and additional information.
+#
+
+import unittest
+
+from borneo import (
+    IllegalArgumentException, NoSQLHandle, PrepareRequest, PutRequest,
+    QueryRequest, TableLimits, TableRequest)
+from stand_in_server import StandInTestCase, get_stand_in_config
+
+
+class TestStatementCache(StandInTestCase):
+    def create_handle(self):
+        return None
+
+    def testStatementCacheIllegalConfig(self):
+        config = get_stand_in_config(self.server)
+        self.assertRaises(IllegalArgumentException,
+                          config.set_statement_cache_size, -1)
+        self.assertRaises(IllegalArgumentException,
+                          config.set_statement_cache_size, 'IllegalSize')
+        self.assertRaises(IllegalArgumentException, config.set_auto_prepare,
+                          'IllegalAutoPrepare')
+        self.assertEqual(config.get_statement_cache_size(), 0)
+        self.assertFalse(config.get_auto_prepare())
+
+    def testStatementCacheDisabled(self):
+        self.__create_handle(0)
+        for count in range(2):
+            result = self.handle.prepare(self.__prepare_request('users'))
+            self.assertEqual(result.get_read_units(), 2)
+        self.assertEqual(len(self.server.prepares), 2)
+
+    def testStatementCachePrepare(self):
+        self.__create_handle(2)
+        result = self.handle.prepare(self.__prepare_request('users'))
+        self.assertEqual(result.get_read_units(), 2)
+        result.get_prepared_statement().set_variable('$id', 1)
+        cached = self.handle.prepare(self.__prepare_request('users'))
+        self.assertEqual(len(self.server.prepares), 1)
+        self.assertEqual(cached.get_read_units(), 0)
+        # the cached statement is a copy, without variables.
+        self.assertIsNot(cached.get_prepared_statement(),
+                         result.get_prepared_statement())
+        self.assertEqual(cached.get_prepared_statement().get_statement(),
+                         result.get_prepared_statement().get_statement())
+        self.assertEqual(cached.get_prepared_statement().get_variables(), {})
+        # the least recently used statement is evicted.
+        self.handle.prepare(self.__prepare_request('other'))
+        self.handle.prepare(self.__prepare_request('users'))
+        self.handle.prepare(self.__prepare_request('third'))
+        self.assertEqual(len(self.server.prepares), 3)
+        self.handle.prepare(self.__prepare_request('users'))
+        self.assertEqual(len(self.server.prepares), 3)
+        self.handle.prepare(self.__prepare_request('other'))
+        self.assertEqual(len(self.server.prepares), 4)
+
+    def testStatementCacheTableRequest(self):
+        self.__create_handle(2)
+        self.handle.prepare(self.__prepare_request('users'))
+        self.handle.table_request(TableRequest().set_statement(
+            'CREATE TABLE users(id INTEGER, PRIMARY KEY(id))').set_table_limits(
+            TableLimits(100, 100, 1)))
+        # DDL invalidates the cached statements.
+        self.handle.prepare(self.__prepare_request('users'))
+        self.assertEqual(len(self.server.prepares), 2)
+
+    def testStatementCacheAutoPrepare(self):
+        self.__create_handle(2, True)
+        for key in range(5):
+            self.handle.put(PutRequest().set_table_name('users').set_value(
+                {'id': key}))
+        request = QueryRequest().set_statement('SELECT * FROM users').set_limit(
+            2)
+        results = [row['id'] for row in self.handle.query_iterable(request)]
+        self.assertEqual(results, list(range(5)))
+        self.assertEqual(self.server.prepares, ['SELECT * FROM users'])
+        self.assertEqual(len(self.server.queries), 3)
+        # the request isn't modified.
+        self.assertIsNone(request.get_prepared_statement())
+        self.handle.query(QueryRequest().set_statement('SELECT * FROM users'))
+        self.assertEqual(len(self.server.prepares), 1)
+        # no statement is prepared without a cache.
+        self.handle.close()
+        self.__create_handle(0, True)
+        self.handle.query(QueryRequest().set_statement('SELECT * FROM users'))
+        self.assertEqual(len(self.server.prepares), 1)
+
+    def __create_handle(self, statement_cache_size, auto_prepare=False):
+        self.handle = NoSQLHandle(get_stand_in_config(
+            self.server).set_statement_cache_size(
+            statement_cache_size).set_auto_prepare(auto_prepare))
+
+    @staticmethod
+    def __prepare_request(table_name):
+        return PrepareRequest().set_statement(
+            'DECLARE $id INTEGER; SELECT * FROM ' + table_name +
+            ' WHERE id = $id')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+#
+# Copyright (C) 2018, 2019 Oracle and/or its affiliates. All rights reserved.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl
+#
+# Please see LICENSE.txt file included in the top-level directory of the
+# appropriate download for a copy of the license and additional information.
+#
+
+import unittest
+from concurrent.futures import Future
+
+from borneo import (
+    GetRequest, IllegalArgumentException, IllegalStateException, NoSQLHandle,
+    PutRequest, TableNotFoundException)
+from borneo.serde import BinaryProtocol
+from stand_in_server import StandInTestCase, get_stand_in_config
+
+
+class TestSubmit(StandInTestCase):
+    def create_handle(self):
+        return NoSQLHandle(get_stand_in_config(self.server, 2))
+
+    def testSubmitIllegalRequest(self):
+        self.assertRaises(IllegalArgumentException, self.handle.submit,
+                          'IllegalRequest')
+        self.assertRaises(IllegalArgumentException, self.handle.submit, None)
+        # none of the requests is submitted if one of them is illegal.
+        self.assertRaises(IllegalArgumentException, self.handle.map,
+                          [self.__get_request(1), 'IllegalRequest'])
+        self.assertEqual(self.server.num_requests, 0)
+
+    def testSubmitAfterClose(self):
+        future = self.handle.submit(self.__put_request(1))
+        self.handle.close()
+        # close waits for the submitted operations.
+        self.assertTrue(future.done())
+        self.assertRaises(IllegalStateException, self.handle.submit,
+                          self.__get_request(1))
+        self.handle = None
+
+    def testSubmitOperations(self):
+        future = self.handle.submit(self.__put_request(1))
+        self.assertIsInstance(future, Future)
+        self.assertIsNotNone(future.result().get_version())
+        result = self.handle.submit(self.__get_request(1)).result()
+        self.assertEqual(result.get_value(), {'id': 1, 'name': 'name1'})
+        self.server.errors = [BinaryProtocol.USER_ERROR.TABLE_NOT_FOUND]
+        future = self.handle.submit(self.__get_request(1))
+        self.assertRaises(TableNotFoundException, future.result)
+
+    def testSubmitMap(self):
+        futures = self.handle.map(self.__put_request(key)
+                                  for key in range(10))
+        self.assertEqual(len(futures), 10)
+        for future in futures:
+            self.assertIsNotNone(future.result().get_version())
+        futures = self.handle.map(
+            [self.__get_request(key) for key in range(9, -1, -1)])
+        self.assertEqual([future.result().get_value()['id']
+                          for future in futures], list(range(9, -1, -1)))
+        self.assertEqual(self.handle.map([]), [])
+
+    def testSubmitBounded(self):
+        self.server.delay = 0.05
+        futures = list()
+        for key in range(12):
+            futures.append(self.handle.submit(self.__get_request(key)))
+            # at most twice pool_maxsize operations are pending.
+            self.assertLessEqual(
+                len([future for future in futures if not future.done()]), 4)
+        for future in futures:
+            self.assertIsNone(future.result().get_value())
+        # the threads match the connections of the pool.
+        self.assertEqual(self.server.max_active, 2)
+        self.assertEqual(len(self.server.connections), 2)
+
+    @staticmethod
+    def __get_request(key):
+        return GetRequest().set_table_name('users').set_key({'id': key})
+
+    @staticmethod
+    def __put_request(key):
+        return PutRequest().set_table_name('users').set_value(
+            {'id': key, 'name': 'name' + str(key)})
+
+
+if __name__ == '__main__':
+    unittest.main()